@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+⏱️ Agent Scheduler - событийный планировщик задач агента
+Очередь с приоритетом по времени следующего запуска: поток просыпается
+ровно к ближайшему дедлайну, а не опрашивает расписание каждые 30 секунд
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+class ScheduledJob:
+    def __init__(self, name: str, func: Callable, interval: Optional[float] = None,
+                 at: Optional[str] = None, weekday: Optional[str] = None,
+                 jitter: float = 0, misfire: str = "coalesce"):
+        """Описание задачи планировщика
+
+        interval - период в секундах; at ("HH:MM") и weekday задают
+        ежедневный или еженедельный запуск. misfire определяет поведение
+        при опоздании больше чем на период: "skip" пропускает запуск,
+        "coalesce" выполняет его один раз за все пропущенные.
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.at = at
+        self.weekday = weekday
+        self.jitter = jitter
+        self.misfire = misfire
+
+        # Номинальное время запуска (без джиттера) - от него считается следующий,
+        # поэтому задержки выполнения не накапливаются в дрейф
+        self.nominal_time = None
+        self.next_run = None
+
+        self.stats = {
+            "runs": 0,
+            "failures": 0,
+            "last_run": None,
+            "last_duration": 0.0,
+            "max_duration": 0.0,
+            "total_duration": 0.0,
+            "max_lateness": 0.0,
+            "overruns": 0,
+            "skipped": 0,
+            "coalesced": 0
+        }
+
+    def period(self) -> float:
+        """Номинальный период задачи в секундах"""
+        if self.interval:
+            return self.interval
+        return 7 * 86400 if self.weekday else 86400
+
+    def first_nominal(self, now: float) -> float:
+        """Первое номинальное время запуска"""
+        if self.interval:
+            return now + self.interval
+        return self._next_calendar_time(now)
+
+    def _next_calendar_time(self, now: float) -> float:
+        """Ближайшее время HH:MM (с учетом дня недели) после now"""
+        hour, minute = (int(part) for part in self.at.split(':'))
+        current = datetime.fromtimestamp(now)
+        candidate = current.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+        if self.weekday:
+            days_ahead = (WEEKDAYS.index(self.weekday) - current.weekday()) % 7
+            candidate += timedelta(days=days_ahead)
+            if candidate.timestamp() <= now:
+                candidate += timedelta(days=7)
+        elif candidate.timestamp() <= now:
+            candidate += timedelta(days=1)
+
+        return candidate.timestamp()
+
+    def advance(self, now: float) -> float:
+        """Следующее номинальное время после выполнения задачи"""
+        if not self.interval:
+            return self._next_calendar_time(max(now, self.nominal_time))
+
+        next_nominal = self.nominal_time + self.interval
+        if next_nominal > now:
+            return next_nominal
+
+        # Запуски, пришедшиеся на время выполнения: при coalesce они слиты
+        # с только что завершенным, при skip - просто пропущены
+        missed = int((now - next_nominal) // self.interval) + 1
+        self.stats["skipped" if self.misfire == "skip" else "coalesced"] += missed
+        return next_nominal + missed * self.interval
+
+    def is_stale(self, now: float) -> bool:
+        """Запуск опоздал больше чем на период и должен быть пропущен"""
+        return bool(self.interval) and self.misfire == "skip" and now - self.nominal_time >= self.interval
+
+    def schedule(self, nominal: float):
+        """Назначение времени запуска с джиттером"""
+        self.nominal_time = nominal
+        self.next_run = nominal + (random.uniform(0, self.jitter) if self.jitter else 0)
+
+
+class AgentScheduler:
+    def __init__(self, default_jitter: float = 0):
+        """Инициализация планировщика"""
+        self.default_jitter = default_jitter
+        self.jobs = {}
+
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+
+    def every(self, seconds: float, func: Callable, name: Optional[str] = None,
+              jitter: Optional[float] = None, misfire: str = "coalesce") -> ScheduledJob:
+        """Периодическая задача"""
+        job = ScheduledJob(name or func.__name__, func, interval=seconds,
+                           jitter=self.default_jitter if jitter is None else jitter, misfire=misfire)
+        return self._add(job)
+
+    def daily_at(self, at: str, func: Callable, name: Optional[str] = None) -> ScheduledJob:
+        """Ежедневная задача в HH:MM"""
+        return self._add(ScheduledJob(name or func.__name__, func, at=at))
+
+    def weekly_at(self, weekday: str, at: str, func: Callable, name: Optional[str] = None) -> ScheduledJob:
+        """Еженедельная задача в день недели и HH:MM"""
+        return self._add(ScheduledJob(name or func.__name__, func, at=at, weekday=weekday.lower()))
+
+    def _add(self, job: ScheduledJob) -> ScheduledJob:
+        """Регистрация задачи в очереди"""
+        if job.name in self.jobs:
+            raise ValueError(f"Задача {job.name} уже зарегистрирована")
+
+        job.schedule(job.first_nominal(time.time()))
+        with self._condition:
+            self.jobs[job.name] = job
+            self._push(job)
+            # Новая задача может оказаться ближе текущего дедлайна
+            self._condition.notify()
+        return job
+
+    def _push(self, job: ScheduledJob):
+        """Добавление задачи в кучу"""
+        heapq.heappush(self._queue, (job.next_run, next(self._counter), job))
+
+    def run_forever(self):
+        """Основной цикл: сон до ближайшего дедлайна и запуск задачи"""
+        self._running = True
+
+        while self._running:
+            with self._condition:
+                if not self._queue:
+                    self._condition.wait()
+                    continue
+
+                next_run, _, job = self._queue[0]
+                delay = next_run - time.time()
+                if delay > 0:
+                    # Пробуждение ровно к дедлайну или раньше, если добавлена задача
+                    self._condition.wait(timeout=delay)
+                    continue
+
+                heapq.heappop(self._queue)
+
+            if job.is_stale(time.time()):
+                job.stats["skipped"] += 1
+                logging.warning(f"⏭️ Задача {job.name} пропущена: опоздание больше периода")
+            else:
+                self._run_job(job)
+
+            with self._condition:
+                if self._running:
+                    job.schedule(job.advance(time.time()))
+                    self._push(job)
+
+    def _run_job(self, job: ScheduledJob):
+        """Выполнение задачи с замером времени"""
+        started = time.time()
+        lateness = max(0.0, started - job.next_run)
+
+        try:
+            job.func()
+        except Exception as e:
+            job.stats["failures"] += 1
+            logging.error(f"❌ Ошибка задачи {job.name}: {e}")
+
+        duration = time.time() - started
+        stats = job.stats
+        stats["runs"] += 1
+        stats["last_run"] = datetime.fromtimestamp(started).isoformat()
+        stats["last_duration"] = round(duration, 3)
+        stats["max_duration"] = round(max(stats["max_duration"], duration), 3)
+        stats["total_duration"] += duration
+        stats["max_lateness"] = round(max(stats["max_lateness"], lateness), 3)
+
+        if duration > job.period():
+            stats["overruns"] += 1
+            logging.warning(f"⏰ Задача {job.name} выполнялась {duration:.1f}с - дольше своего периода {job.period():.1f}с")
+
+    def stop(self):
+        """Остановка планировщика"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Статистика выполнения по задачам"""
+        stats = {}
+        for name, job in self.jobs.items():
+            job_stats = dict(job.stats)
+            runs = job_stats["runs"]
+            job_stats["avg_duration"] = round(job_stats["total_duration"] / runs, 3) if runs else 0.0
+            job_stats["total_duration"] = round(job_stats["total_duration"], 3)
+            job_stats["next_run"] = datetime.fromtimestamp(job.next_run).isoformat() if job.next_run else None
+            stats[name] = job_stats
+        return stats
+
+    def pending(self) -> List[str]:
+        """Задачи в порядке ближайшего запуска"""
+        with self._condition:
+            return [job.name for _, _, job in sorted(self._queue)]
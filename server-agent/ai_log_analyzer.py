@@ -9,16 +9,57 @@ import re
 import subprocess
 import logging
 import os
+from collections import deque
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import requests
 
+from journal_follower import JournalFollower
+from log_classifier import SEVERITY_RANK, LogClassifier
+from log_index import AGENT_LOG_FILE, AGENT_LOG_MARKERS, LogIndex
+from log_templates import TemplateMiner
+from prompt_builder import PromptBuilder
+from tail_reader import tail_lines
+
+NGINX_ERROR_LOG = "/var/log/nginx/error.log"
+NGINX_ERROR_PATTERN = re.compile(r"\[(error|crit|alert|emerg)\]")
+
 class AILogAnalyzer:
     def __init__(self, config_path="agent-config.json"):
         """Инициализация AI анализатора логов"""
         self.config = self.load_config(config_path)
         self.setup_logging()
         
+        # Инкрементальный индекс лога агента (агент подменяет на общий)
+        self.log_index = LogIndex(
+            self.config.get('logging', {}).get('log_file', AGENT_LOG_FILE),
+            markers=AGENT_LOG_MARKERS
+        )
+        
+        # Правила классификации компилируются один раз
+        self.classifier = LogClassifier(
+            self.config.get('ai_integration', {}).get('classifier_rules'),
+            upstream_services=self.config.get('ai_integration', {}).get('upstream_services')
+        )
+        
+        # Промпт собирается в пределах бюджета токенов, остаток сворачивается в сводку
+        self.prompt_builder = PromptBuilder(self.config.get('ai_integration', {}).get('prompt_max_tokens', 6000))
+        
+        # Шаблоны ошибок накапливаются между запусками и сохраняются: отпечаток кластера
+        # не меняется ни от порядка строк, ни после перезапуска
+        log_dir = os.path.dirname(self.config.get('logging', {}).get('log_file', AGENT_LOG_FILE))
+        self.templates = TemplateMiner(
+            similarity_threshold=self.config.get('ai_integration', {}).get('template_similarity', 0.5),
+            path=os.path.join(log_dir, 'log-templates.json')
+        )
+        
+        # Новые ошибки Nginx от общего сервиса чтения логов (подключается агентом)
+        self.nginx_tailer = None
+        self.nginx_errors = None
+        
+        # Журнал gita-api читается по курсору: каждая ошибка анализируется один раз
+        self.journal = JournalFollower("gita-api", cursor_file=os.path.join(log_dir, 'journal-gita-api.cursor'))
+        
     def load_config(self, config_path):
         """Загрузка конфигурации"""
         try:
@@ -67,32 +108,27 @@ class AILogAnalyzer:
         )
         
     def extract_critical_errors(self, hours=1) -> List[Dict]:
-        """Извлечение критических ошибок из логов за последние N часов"""
+        """Извлечение новых критических ошибок (журнал - после курсора, остальные логи - за N часов)"""
         critical_errors = []
         
         try:
-            # Логи systemd для gita-api
-            cmd = f"journalctl -u gita-api -p err -S '{hours} hours ago' --no-pager"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            
-            if result.stdout:
-                errors = self.parse_systemd_logs(result.stdout)
-                critical_errors.extend(errors)
+            # Логи systemd для gita-api: только новые записи после курсора
+            critical_errors.extend(self.classify_error(entry) for entry in self.journal.read_new())
                 
-            # Логи Nginx
-            cmd = f"sudo tail -n 100 /var/log/nginx/error.log"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            
-            if result.stdout:
-                errors = self.parse_nginx_logs(result.stdout)
-                critical_errors.extend(errors)
+            # Логи Nginx: новые ошибки от сервиса чтения логов, без него или без прав - последние строки файла
+            if self.nginx_errors is not None and self.nginx_tailer.readable("error"):
+                critical_errors.extend(self.drain_nginx_errors())
+            else:
+                nginx_logs = self.read_nginx_errors(limit=100)
+                if nginx_logs:
+                    errors = self.parse_nginx_logs(nginx_logs)
+                    critical_errors.extend(errors)
                 
-            # Логи агента
-            cmd = f"tail -n 50 /home/yc-user/gita-1972/logs/server-agent.log | grep ERROR"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            
-            if result.stdout:
-                errors = self.parse_agent_logs(result.stdout)
+            # Логи агента: последние ошибки за N часов из индекса
+            recent = self.log_index.recent_errors(limit=50, since=datetime.now() - timedelta(hours=hours))
+            if recent:
+                lines = [f"{entry['time']} - {entry['level']} - {entry['message']}" for entry in recent]
+                errors = self.parse_agent_logs('\n'.join(lines))
                 critical_errors.extend(errors)
                 
             self.log_info(f"🔍 Найдено {len(critical_errors)} критических ошибок")
@@ -102,59 +138,130 @@ class AILogAnalyzer:
             self.log_error(f"❌ Ошибка извлечения логов: {e}")
             return []
     
-    def parse_systemd_logs(self, logs: str) -> List[Dict]:
-        """Парсинг логов systemd"""
+    def follow_nginx_errors(self, tailer, buffer_size: int = 1000):
+        """Подписка на новые строки error.log Nginx"""
+        self.nginx_tailer = tailer
+        self.nginx_errors = deque(maxlen=buffer_size)
+        self.nginx_errors_dropped = 0
+        
+        def collect(record: Dict):
+            if record['level'] in ('error', 'crit', 'alert', 'emerg'):
+                if len(self.nginx_errors) == self.nginx_errors.maxlen:
+                    self.nginx_errors_dropped += 1
+                self.nginx_errors.append(record)
+                
+        tailer.subscribe("error", collect)
+    
+    def drain_nginx_errors(self) -> List[Dict]:
+        """Ошибки Nginx, накопленные с прошлого анализа - каждая выдается один раз"""
         errors = []
-        for line in logs.split('\n'):
-            if 'ERROR' in line or 'CRITICAL' in line or 'Failed' in line:
-                errors.append({
-                    'source': 'systemd/gita-api',
-                    'timestamp': datetime.now().isoformat(),
-                    'level': 'ERROR',
-                    'message': line.strip(),
-                    'category': 'service_failure'
-                })
+        while self.nginx_errors:
+            record = self.nginx_errors.popleft()
+            errors.append(self.classify_error({
+                'source': 'nginx',
+                'timestamp': record['timestamp'],
+                'level': 'ERROR',
+                'message': record['line'].strip(),
+                'category': 'web_server_error'
+            }))
+            
+        if self.nginx_errors_dropped:
+            self.log_error(f"⚠️ Буфер ошибок Nginx переполнен, пропущено {self.nginx_errors_dropped} строк")
+            self.nginx_errors_dropped = 0
         return errors
     
+    def read_nginx_errors(self, limit: int = 100) -> str:
+        """Последние ошибки из error.log Nginx"""
+        try:
+            return '\n'.join(tail_lines(NGINX_ERROR_LOG, limit, NGINX_ERROR_PATTERN))
+        except PermissionError:
+            # Без прав на чтение лога остается прежний путь через sudo
+            result = subprocess.run(f"sudo tail -n {limit} {NGINX_ERROR_LOG}", shell=True, capture_output=True, text=True)
+            return result.stdout
+        except FileNotFoundError:
+            return ""
+    
+    def classify_error(self, error: Dict, classification: Optional[Dict] = None) -> Dict:
+        """Дополнение ошибки категорией, серьезностью, сервисом и полями"""
+        service = error['source'].split('/')[-1]
+        classification = classification or self.classifier.classify(error['message'], service)
+        error['category'] = classification['category'] or error['category']
+        error['severity'] = classification['severity'] or 'error'
+        error['service'] = classification['service']
+        error['fields'] = classification['fields']
+        return error
+    
     def parse_nginx_logs(self, logs: str) -> List[Dict]:
         """Парсинг логов Nginx"""
         errors = []
         for line in logs.split('\n'):
-            if '[error]' in line or '[crit]' in line:
-                errors.append({
+            classification = self.classifier.classify(line, 'nginx')
+            if self.classifier.is_at_least(classification, 'error'):
+                errors.append(self.classify_error({
                     'source': 'nginx',
                     'timestamp': datetime.now().isoformat(),
                     'level': 'ERROR',
                     'message': line.strip(),
                     'category': 'web_server_error'
-                })
+                }, classification))
         return errors
     
     def parse_agent_logs(self, logs: str) -> List[Dict]:
         """Парсинг логов агента"""
         errors = []
         for line in logs.split('\n'):
-            if 'ERROR' in line:
-                errors.append({
+            classification = self.classifier.classify(line, 'server-agent')
+            if self.classifier.is_at_least(classification, 'error'):
+                errors.append(self.classify_error({
                     'source': 'server-agent',
-                    'timestamp': datetime.now().isoformat(),
+                    'timestamp': line[:19].replace(' ', 'T') if line[:4].isdigit() else datetime.now().isoformat(),
                     'level': 'ERROR',
                     'message': line.strip(),
                     'category': 'agent_error'
-                })
+                }, classification))
         return errors
     
-    def analyze_with_yandexgpt(self, errors: List[Dict]) -> Dict:
-        """Анализ ошибок с помощью YandexGPT"""
+    def cluster_errors(self, errors: List[Dict]) -> List[Dict]:
+        """Группировка ошибок по шаблонам: один кластер вместо тысяч одинаковых строк
+        
+        count, first_seen и last_seen - за все время, batch_count и batch_services
+        (строк по сервисам) - в этом запуске. Самые серьезные и частые кластеры первыми.
+        """
+        batch = {}
+        batch_services = {}
+        for error in errors:
+            cluster = self.templates.add(error['message'], error['timestamp'], {
+                'source': error['source'],
+                'category': error.get('category'),
+                'severity': error.get('severity', 'error'),
+                'service': error.get('service')
+            })
+            batch[cluster['fingerprint']] = batch.get(cluster['fingerprint'], 0) + 1
+            services = batch_services.setdefault(cluster['fingerprint'], {})
+            services[error.get('service')] = services.get(error.get('service'), 0) + 1
+            
+        if batch:
+            self.templates.save()
+        clusters = self.templates.summarize(list(batch))
+        for cluster in clusters:
+            cluster['batch_count'] = batch[cluster['fingerprint']]
+            cluster['batch_services'] = batch_services[cluster['fingerprint']]
+            
+        clusters.sort(key=lambda cluster: (SEVERITY_RANK.get(cluster['severity'], 0), cluster['batch_count']), reverse=True)
+        self.log_info(f"🧩 {len(errors)} ошибок сгруппировано в {len(clusters)} шаблонов")
+        return clusters
+    
+    def analyze_with_yandexgpt(self, clusters: List[Dict]) -> Dict:
+        """Анализ кластеров ошибок с помощью YandexGPT"""
         if not self.config.get('ai_integration', {}).get('enabled', False):
             return {"status": "disabled", "analysis": "AI анализ отключен"}
             
         try:
             # Формируем запрос для YandexGPT
-            prompt = self.create_analysis_prompt(errors)
+            prompt = self.create_analysis_prompt(clusters)
             
             # Симуляция запроса к YandexGPT (реальный API требует авторизации)
-            analysis = self.simulate_yandexgpt_analysis(errors)
+            analysis = self.simulate_yandexgpt_analysis(clusters)
             
             self.log_info("🤖 AI анализ выполнен")
             return analysis
@@ -163,66 +270,86 @@ class AILogAnalyzer:
             self.log_error(f"❌ Ошибка AI анализа: {e}")
             return {"status": "error", "error": str(e)}
     
-    def create_analysis_prompt(self, errors: List[Dict]) -> str:
-        """Создание промпта для анализа"""
-        prompt = """Проанализируй следующие критические ошибки сервера и предоставь:
+    def create_analysis_prompt(self, clusters: List[Dict]) -> str:
+        """Создание промпта для анализа: самые важные шаблоны в пределах бюджета, остальные - сводкой"""
+        header = """Проанализируй следующие критические ошибки сервера и предоставь:
 1. Краткое описание проблемы
 2. Возможные причины
 3. Рекомендации по исправлению
 4. Уровень критичности (1-10)
 5. Можно ли исправить автоматически
 
-Ошибки:
+Ошибки (шаблон, <*> и <NUM>/<IP>/<TIME> - переменные части):
 """
-        for error in errors[:5]:  # Анализируем только первые 5 ошибок
-            prompt += f"- {error['source']}: {error['message']}\n"
-            
-        return prompt
+        built = self.prompt_builder.build(header, clusters)
+        if built['rest']:
+            self.log_info(f"📝 В промпт вошло {len(built['included'])} шаблонов, {len(built['rest'])} свернуто в сводку")
+        return built['prompt']
     
-    def simulate_yandexgpt_analysis(self, errors: List[Dict]) -> Dict:
+    def simulate_yandexgpt_analysis(self, clusters: List[Dict]) -> Dict:
         """Симуляция анализа YandexGPT (для демонстрации)"""
         # Простой анализ на основе ключевых слов
         analysis = {
             "status": "success",
+            "simulated": True,
             "timestamp": datetime.now().isoformat(),
-            "errors_analyzed": len(errors),
+            "errors_analyzed": sum(cluster['batch_count'] for cluster in clusters),
+            "clusters_analyzed": len(clusters),
             "recommendations": [],
             "critical_level": 1,
             "auto_fixable": False
         }
         
-        for error in errors:
-            if 'gita-api' in error.get('source', ''):
-                analysis["recommendations"].append({
-                    "issue": "Проблема с API сервисом",
-                    "solution": "Проверить зависимости Node.js (npm install), перезапустить сервис",
-                    "auto_fix": "sudo systemctl restart gita-api",
-                    "priority": "high"
-                })
-                analysis["critical_level"] = max(analysis["critical_level"], 8)
-                analysis["auto_fixable"] = True
-                
-            elif 'ssl' in error.get('message', '').lower():
-                analysis["recommendations"].append({
-                    "issue": "Проблема с SSL сертификатом",
-                    "solution": "Обновить SSL сертификат с помощью certbot",
-                    "auto_fix": "sudo certbot renew",
-                    "priority": "medium"
-                })
-                analysis["critical_level"] = max(analysis["critical_level"], 6)
-                
-            elif 'nginx' in error.get('source', ''):
-                analysis["recommendations"].append({
-                    "issue": "Ошибка веб-сервера",
-                    "solution": "Проверить конфигурацию Nginx, перезапустить сервис",
-                    "auto_fix": "sudo nginx -t && sudo systemctl restart nginx",
-                    "priority": "high"
-                })
-                analysis["critical_level"] = max(analysis["critical_level"], 7)
-                analysis["auto_fixable"] = True
+        # Рекомендации выбираются по уже классифицированным категории и сервису каждой
+        # строки кластера (один шаблон бывает и в nginx, и в journal gita-api),
+        # одна рекомендация на проблему - исправление не повторяется для каждой строки
+        recommendations = {}
+        for cluster in clusters:
+            for service, count in cluster.get('batch_services', {cluster.get('service'): cluster['batch_count']}).items():
+                self.recommend(analysis, recommendations, cluster, service, count)
         
+        analysis["recommendations"] = list(recommendations.values())
         return analysis
     
+    def recommend(self, analysis: Dict, recommendations: Dict, cluster: Dict, service: Optional[str], count: int):
+        """Рекомендация для count строк кластера, пришедших от сервиса service"""
+        if service == 'gita-api':
+            recommendation = {
+                "issue": "Проблема с API сервисом",
+                "solution": "Проверить зависимости Node.js (npm install), перезапустить сервис",
+                "auto_fix": "sudo systemctl restart gita-api",
+                "priority": "high"
+            }
+            analysis["critical_level"] = max(analysis["critical_level"], 8)
+            analysis["auto_fixable"] = True
+            
+        elif cluster.get('category') == 'ssl':
+            recommendation = {
+                "issue": "Проблема с SSL сертификатом",
+                "solution": "Обновить SSL сертификат с помощью certbot",
+                "auto_fix": "sudo certbot renew",
+                "priority": "medium"
+            }
+            analysis["critical_level"] = max(analysis["critical_level"], 6)
+            
+        elif service == 'nginx':
+            recommendation = {
+                "issue": "Ошибка веб-сервера",
+                "solution": "Проверить конфигурацию Nginx, перезапустить сервис",
+                "auto_fix": "sudo nginx -t && sudo systemctl restart nginx",
+                "priority": "high"
+            }
+            analysis["critical_level"] = max(analysis["critical_level"], 7)
+            analysis["auto_fixable"] = True
+            
+        else:
+            return
+            
+        recommendation = recommendations.setdefault(recommendation["issue"], {**recommendation, "occurrences": 0, "clusters": []})
+        recommendation["occurrences"] += count
+        if cluster['fingerprint'] not in recommendation["clusters"]:
+            recommendation["clusters"].append(cluster['fingerprint'])
+    
     def apply_safe_fixes(self, analysis: Dict) -> Dict:
         """Применение безопасных автоматических исправлений"""
         if not self.config.get('ai_integration', {}).get('auto_apply_safe_fixes', False):
@@ -253,24 +380,31 @@ class AILogAnalyzer:
             self.log_error(f"❌ Ошибка применения исправлений: {e}")
             return {"status": "error", "error": str(e)}
     
-    def generate_ai_report(self, analysis: Dict) -> str:
+    def generate_ai_report(self, analysis: Dict, clusters: Optional[List[Dict]] = None) -> str:
         """Генерация отчета AI анализа"""
         report = f"""
 🤖 AI АНАЛИЗ ЛОГОВ - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 📊 СТАТИСТИКА:
 - Проанализировано ошибок: {analysis.get('errors_analyzed', 0)}
+- Уникальных шаблонов: {analysis.get('clusters_analyzed', 0)}
 - Уровень критичности: {analysis.get('critical_level', 0)}/10
 - Автоматические исправления: {'Доступны' if analysis.get('auto_fixable') else 'Недоступны'}
 
-🔍 РЕКОМЕНДАЦИИ:
+🧩 ЧАСТЫЕ ОШИБКИ:
 """
         
+        for cluster in (clusters or [])[:5]:
+            report += f"- ×{cluster['batch_count']} [{cluster['fingerprint']}] {cluster['source']}: {cluster['template'][:200]}\n"
+            
+        report += "\n🔍 РЕКОМЕНДАЦИИ:\n"
+        
         for i, rec in enumerate(analysis.get('recommendations', []), 1):
             report += f"""
 {i}. ПРОБЛЕМА: {rec.get('issue', 'Неизвестно')}
    РЕШЕНИЕ: {rec.get('solution', 'Не определено')}
    ПРИОРИТЕТ: {rec.get('priority', 'средний').upper()}
+   ПОВТОРОВ: {rec.get('occurrences', 1)}
    АВТОИСПРАВЛЕНИЕ: {rec.get('auto_fix', 'Недоступно')}
 """
         
@@ -284,22 +418,29 @@ class AILogAnalyzer:
         errors = self.extract_critical_errors(hours=1)
         
         if not errors:
+            self.journal.commit()
             self.log_info("✅ Критических ошибок не найдено")
             return {"status": "no_errors", "message": "Критических ошибок нет"}
         
-        # 2. Анализируем с помощью AI
-        analysis = self.analyze_with_yandexgpt(errors)
+        # 2. Группируем одинаковые ошибки в шаблоны
+        clusters = self.cluster_errors(errors)
+        
+        # 3. Анализируем с помощью AI
+        analysis = self.analyze_with_yandexgpt(clusters)
         
-        # 3. Применяем безопасные исправления
+        # 4. Применяем безопасные исправления
         fixes_result = self.apply_safe_fixes(analysis)
         
-        # 4. Генерируем отчет
-        report = self.generate_ai_report(analysis)
+        # 5. Генерируем отчет
+        report = self.generate_ai_report(analysis, clusters)
         
-        # 5. Сохраняем результаты
+        # 6. Сохраняем результаты
         result = {
+            "status": "success",
             "timestamp": datetime.now().isoformat(),
             "errors_found": len(errors),
+            "clusters_found": len(clusters),
+            "clusters": clusters,
             "analysis": analysis,
             "fixes_applied": fixes_result,
             "report": report
@@ -307,6 +448,9 @@ class AILogAnalyzer:
         
         self.save_analysis_result(result)
         
+        # Курсор журнала сдвигается только после завершенного анализа
+        self.journal.commit()
+        
         self.log_info("✅ AI анализ завершен")
         return result
     
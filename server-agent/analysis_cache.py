@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+🗃️ Analysis Cache - дисковый LRU-кэш ответов YandexGPT с временем жизни
+Ключ - отпечаток нормализованного набора ошибок или промпта: повторный
+инцидент с теми же шаблонами получает готовый анализ без обращения к API.
+Кэш ограничен по числу записей, сохраняется атомарно и переживает перезапуск
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from log_templates import MASKS
+
+WHITESPACE = re.compile(r'\s+')
+
+# Для ключа кэша маскируются только время, адреса с портами и идентификаторы:
+# коды статуса, выхода и сигналов меняют смысл ошибки (HTTP 500 - не HTTP 404)
+NORMALIZE_MASKS = [(pattern, token) for pattern, token in MASKS if token != '<NUM>'] + [
+    (re.compile(r'(?<=:)\d{2,5}\b'), '<PORT>'),
+    (re.compile(r'(?<![\w.])\d{5,}\b'), '<ID>'),
+    (re.compile(r'(?<![\w.])\d+(?:\.\d+)?(?:ms|s)\b', re.IGNORECASE), '<DURATION>')
+]
+
+
+def normalize(text: str) -> str:
+    """Текст без переменных частей (время, адреса, идентификаторы) и лишних пробелов"""
+    for pattern, token in NORMALIZE_MASKS:
+        text = pattern.sub(token, text)
+    return WHITESPACE.sub(' ', text).strip().lower()
+
+
+def make_key(namespace: str, parts: Iterable[str]) -> str:
+    """Ключ кэша: пространство имен + отпечаток частей (порядок не важен)
+
+    Части - отпечатки кластеров или уже нормализованный текст (normalize).
+    """
+    digest = hashlib.sha256('\n'.join(sorted(parts)).encode('utf-8')).hexdigest()
+    return f"{namespace}:{digest[:32]}"
+
+
+class AnalysisCache:
+    def __init__(self, path: str, max_entries: int = 500, ttl_seconds: float = 6 * 3600):
+        """Инициализация кэша, записи загружаются с диска"""
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # Ключ -> {"value", "created_at", "expires_at"}; порядок - от давно использованных к недавним
+        self.entries = OrderedDict()
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0
+        }
+        self._lock = threading.Lock()
+
+        self.load()
+
+    def load(self):
+        """Загрузка записей, просроченные отбрасываются"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logging.error(f"❌ Ошибка чтения кэша анализов {self.path}: {e}")
+            return
+
+        now = time.time()
+        for key, entry in stored.get('entries', []):
+            if entry.get('expires_at', 0) > now:
+                self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        """Атомарное сохранение в порядке использования"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"entries": list(self.entries.items())}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"❌ Ошибка сохранения кэша анализов {self.path}: {e}")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Значение по ключу или None (промах или истекший срок)"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            if entry["expires_at"] <= time.time():
+                del self.entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            # Порядок использования на диск не пишется при каждом попадании - только при set()
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            # Копия: вызывающий может дополнять значение, не портя запись кэша
+            return copy.deepcopy(entry["value"])
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Сохранение значения; при переполнении вытесняются давно использованные записи"""
+        now = time.time()
+        with self._lock:
+            self.entries[key] = {
+                "value": value,
+                "created_at": now,
+                "expires_at": now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self.save()
+
+    def set_many(self, items: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        """Сохранение нескольких значений с одной записью на диск"""
+        if not items:
+            return
+        now = time.time()
+        expires_at = now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            for key, value in items.items():
+                self.entries[key] = {"value": value, "created_at": now, "expires_at": expires_at}
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self.save()
+
+    def invalidate(self, key: str):
+        """Удаление записи (например, анализ оказался ошибочным)"""
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self.save()
+
+    def get_stats(self) -> Dict:
+        """Счетчики попаданий и промахов"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self.entries),
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+            }
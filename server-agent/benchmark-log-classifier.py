@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+⏱️ Бенчмарк классификатора логов
+Сравнивает префиксное дерево фраз с проверкой подстрок по очереди и с
+простым перечислением через | на синтетических строках журнала,
+error.log Nginx и лога агента: отдельно только поиск фраз и полная
+классификация с извлечением полей при одном и том же наборе фраз
+
+Запуск: python3 benchmark-log-classifier.py [число строк]
+"""
+
+import random
+import re
+import sys
+import time
+
+from log_classifier import DEFAULT_RULES, SEVERITY_RANK, LogClassifier
+
+SAMPLE_LINES = [
+    '2025/08/26 03:00:00 [error] 812#812: *4411 connect() failed (111: Connection refused) while connecting to upstream, '
+    'client: 93.184.216.34, server: api.gita-1972-reprint.ru, request: "GET /api/status HTTP/1.1", '
+    'upstream: "http://127.0.0.1:3000/api/status", host: "api.gita-1972-reprint.ru"',
+    '2025/08/26 03:00:01 [error] 812#812: *4412 upstream timed out (110: Connection timed out) while reading response header '
+    'from upstream, client: 10.0.0.7, request: "POST /api/orders HTTP/1.1", upstream: "http://127.0.0.1:3000/api/orders"',
+    '2025/08/26 03:00:02 [crit] 812#812: *4413 SSL_do_handshake() failed (SSL: error:0A00006C:SSL routines::bad key share)',
+    '2025/08/26 03:00:03 [warn] 812#812: *4414 an upstream response is buffered to a temporary file',
+    'Aug 26 03:00:04 gita-server node[2231]: Error: Cannot find module \'express\'',
+    'Aug 26 03:00:05 gita-server systemd[1]: gita-api.service: Main process exited, code=exited, status=1/FAILURE',
+    'Aug 26 03:00:06 gita-server node[2231]: GET /api/status 200 4.213 ms - 57',
+    '2025-08-26 03:00:07,123 - ERROR - ❌ API недоступен: HTTPSConnectionPool(host=\'api.gita-1972-reprint.ru\'): Read timed out',
+    '2025-08-26 03:00:08,456 - INFO - ✅ Сервис nginx работает',
+    '2025-08-26 03:00:09,789 - ERROR - ❌ Ошибка записи: [Errno 28] No space left on device'
+]
+
+
+def sequential_classify(line):
+    """Прежний подход: подстроки каждого правила проверяются по очереди"""
+    lowered = line.lower()
+    best = None
+    for rule in DEFAULT_RULES:
+        if any(keyword in lowered for keyword in rule["keywords"]):
+            if best is None or SEVERITY_RANK[rule["severity"]] > SEVERITY_RANK[best["severity"]]:
+                best = rule
+    return best
+
+
+def alternation_classifier() -> LogClassifier:
+    """Тот же классификатор, но фразы перечислены через | (длинные первыми), без префиксного дерева"""
+    classifier = LogClassifier()
+    phrases = sorted(classifier.phrases, key=len, reverse=True)
+    classifier.pattern = re.compile("|".join(re.escape(phrase) for phrase in phrases))
+    return classifier
+
+
+def measure(name, func, lines):
+    """Время обработки и строк в секунду"""
+    started = time.perf_counter()
+    for line in lines:
+        func(line)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<28} {elapsed:8.2f}с  {len(lines) / elapsed:12,.0f} строк/с")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+
+    random.seed(42)
+    lines = [random.choice(SAMPLE_LINES) for _ in range(count)]
+    print(f"📊 Строк: {count:,}, правил: {len(DEFAULT_RULES)}")
+
+    classifier = LogClassifier()
+    alternation = alternation_classifier()
+    lowered = [line.lower() for line in lines]
+
+    print("\n🔎 Только поиск фраз:")
+    measure("Перечисление через |", alternation.pattern.findall, lowered)
+    measure("Префиксное дерево", classifier.pattern.findall, lowered)
+
+    print("\n🏷️ Полная классификация:")
+    measure("Подстроки по очереди", sequential_classify, lines)
+    measure("Перечисление через | + поля", alternation.classify, lines)
+    measure("Префиксное дерево + поля", classifier.classify, lines)
+
+    print("\n🏷️ Примеры классификации:")
+    for line in SAMPLE_LINES[:3]:
+        result = classifier.classify(line)
+        print(f"  {result['category']}/{result['severity']}/{result['service']}: {result['fields']}")
+
+
+if __name__ == "__main__":
+    main()
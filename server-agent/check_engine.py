@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+⚡ Check Engine - параллельное выполнение критических проверок
+Независимые проверки выполняются одновременно в ограниченном пуле потоков,
+у каждой проверки свой дедлайн, результат объединяется в один отчет
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional
+
+
+class CheckEngine:
+    def __init__(self, max_workers: int = 4, default_timeout: float = 30):
+        """Инициализация движка проверок"""
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='check')
+
+        # Проверки, которые еще выполняются после истечения дедлайна
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def run(self, checks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Запуск набора проверок
+
+        Каждая проверка - словарь {'name', 'func', 'timeout'}.
+        Возвращает объединенный результат по всем проверкам.
+        """
+        started = time.monotonic()
+        results = {}
+        pending = {}
+
+        for check in checks:
+            name = check['name']
+            timeout = check.get('timeout', self.default_timeout)
+
+            with self._lock:
+                previous = self._in_flight.get(name)
+                if previous is not None and not previous.done():
+                    # Предыдущий запуск еще висит - не создаем очередь из зависших проверок
+                    results[name] = self._make_result(False, None, "Предыдущая проверка еще выполняется", 0.0)
+                    continue
+
+                future = self.executor.submit(self._execute, check['func'])
+                self._in_flight[name] = future
+
+            pending[future] = (name, started + timeout)
+
+        while pending:
+            now = time.monotonic()
+            nearest_deadline = min(deadline for _, deadline in pending.values())
+            done, _ = wait(list(pending), timeout=max(0.0, nearest_deadline - now), return_when=FIRST_COMPLETED)
+
+            now = time.monotonic()
+            for future in list(pending):
+                name, deadline = pending[future]
+
+                if future in done:
+                    value, error, duration = future.result()
+                    results[name] = self._make_result(error is None, value, error, duration)
+                    del pending[future]
+                elif now >= deadline:
+                    logging.warning(f"⏰ Проверка {name} превысила дедлайн {deadline - started:.1f}с")
+                    results[name] = self._make_result(False, None, "Timeout", now - started)
+                    del pending[future]
+
+        return {
+            "results": results,
+            "duration": time.monotonic() - started,
+            "timed_out": [name for name, result in results.items() if result['error'] == "Timeout"]
+        }
+
+    def _execute(self, func: Callable[[], Any]):
+        """Выполнение одной проверки с замером времени"""
+        started = time.monotonic()
+        try:
+            return func(), None, time.monotonic() - started
+        except Exception as e:
+            return None, str(e), time.monotonic() - started
+
+    def _make_result(self, ok: bool, value: Any, error: Optional[str], duration: float) -> Dict[str, Any]:
+        """Формирование результата проверки"""
+        return {
+            "ok": ok,
+            "value": value,
+            "error": error,
+            "duration": round(duration, 3)
+        }
+
+    def shutdown(self):
+        """Остановка пула потоков"""
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+🌐 HTTP Client - общий HTTP клиент агента с пулом keep-alive соединений
+Одна сессия requests на все модули: пул соединений на каждый хост,
+повторы с backoff, таймауты по умолчанию и учет переиспользования соединений
+"""
+
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HttpClient:
+    def __init__(self, timeout: float = 10, retries: int = 2, backoff_factor: float = 0.5,
+                 pool_connections: int = 10, pool_maxsize: int = 4):
+        """Инициализация общего HTTP клиента"""
+        self.timeout = timeout
+
+        # POST не повторяется автоматически, чтобы не дублировать сообщения
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 502, 503, 504],
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._errors = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'HttpClient':
+        """Создание клиента из секции http_client конфигурации"""
+        http_config = config.get('http_client', {})
+        return cls(
+            timeout=http_config.get('timeout_seconds', 10),
+            retries=http_config.get('retries', 2),
+            backoff_factor=http_config.get('backoff_factor', 0.5),
+            pool_connections=http_config.get('pool_connections', 10),
+            pool_maxsize=http_config.get('pool_maxsize', 4)
+        )
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """HTTP запрос через общий пул соединений"""
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+
+        with self._lock:
+            self._requests[host] = self._requests.get(host, 0) + 1
+
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors[host] = self._errors.get(host, 0) + 1
+            raise
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET запрос"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """POST запрос"""
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self) -> Dict:
+        """Статистика пула: запросы, новые соединения и сэкономленные рукопожатия"""
+        hosts = {}
+        pools = self.adapter.poolmanager.pools
+
+        # urllib3 считает в каждом пуле открытые соединения и выполненные запросы
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+            stats = hosts.setdefault(host, {"requests": 0, "connections": 0})
+            stats["requests"] += pool.num_requests
+            stats["connections"] += pool.num_connections
+
+        with self._lock:
+            for host, count in self._requests.items():
+                stats = hosts.setdefault(host, {"requests": 0, "connections": 0})
+                stats["calls"] = count
+                stats["errors"] = self._errors.get(host, 0)
+
+        total_requests = sum(stats["requests"] for stats in hosts.values())
+        total_connections = sum(stats["connections"] for stats in hosts.values())
+        reused = max(0, total_requests - total_connections)
+        hours = max((time.time() - self.started_at) / 3600, 1 / 60)
+
+        return {
+            "hosts": hosts,
+            "requests": total_requests,
+            "connections_opened": total_connections,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / total_requests, 3) if total_requests else 0.0,
+            "handshakes_saved_per_hour": round(reused / hours, 1)
+        }
+
+    def close(self):
+        """Закрытие всех соединений пула"""
+        self.session.close()
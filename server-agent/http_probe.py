@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+🛰️ HTTP Probe Engine - асинхронные пробы HTTP(S) эндпоинтов
+Все эндпоинты проверяются одновременно, для каждой пробы замеряются
+DNS, TCP connect, TLS handshake, время до первого байта и общее время.
+Задержки копятся в гистограммах со скользящим окном (p50/p95/p99)
+"""
+
+import asyncio
+import math
+import socket
+import ssl
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+# Фазы запроса, для которых ведутся гистограммы
+PHASES = ["dns", "connect", "tls", "ttfb", "total"]
+
+# Сколько байт тела ответа читать максимум - пробе не нужно скачивать большие файлы
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class LatencyHistogram:
+    def __init__(self, window_seconds: float = 900, slot_seconds: float = 60, precision: float = 0.02):
+        """Гистограмма задержек в стиле HDR со скользящим окном
+
+        Значения раскладываются по логарифмическим корзинам с относительной
+        точностью precision, окно состоит из слотов по slot_seconds.
+        """
+        self.window_seconds = window_seconds
+        self.slot_seconds = slot_seconds
+        self._log_base = math.log1p(precision)
+        self._slots = deque()
+        self._lock = threading.Lock()
+
+    def _bucket(self, value_ms: float) -> int:
+        """Номер логарифмической корзины (значения в микросекундах)"""
+        value_us = max(1.0, value_ms * 1000)
+        return int(math.ceil(math.log(value_us) / self._log_base))
+
+    def _bucket_value(self, bucket: int) -> float:
+        """Верхняя граница корзины в миллисекундах"""
+        return math.exp(bucket * self._log_base) / 1000
+
+    def record(self, value_ms: float, now: Optional[float] = None):
+        """Добавление замера"""
+        now = now or time.time()
+        slot_start = now - now % self.slot_seconds
+
+        with self._lock:
+            if not self._slots or self._slots[-1][0] != slot_start:
+                self._slots.append((slot_start, {}))
+            counts = self._slots[-1][1]
+            bucket = self._bucket(value_ms)
+            counts[bucket] = counts.get(bucket, 0) + 1
+            self._expire(now)
+
+    def _expire(self, now: float):
+        """Удаление слотов за пределами окна"""
+        while self._slots and self._slots[0][0] + self.slot_seconds <= now - self.window_seconds:
+            self._slots.popleft()
+
+    def snapshot(self, now: Optional[float] = None) -> Dict:
+        """Перцентили за окно"""
+        now = now or time.time()
+        merged = {}
+        with self._lock:
+            self._expire(now)
+            for _, counts in self._slots:
+                for bucket, count in counts.items():
+                    merged[bucket] = merged.get(bucket, 0) + count
+
+        total = sum(merged.values())
+        if not total:
+            return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+
+        result = {"count": total}
+        ordered = sorted(merged.items())
+        for name, quantile in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            rank = max(1, math.ceil(quantile * total))
+            seen = 0
+            for bucket, count in ordered:
+                seen += count
+                if seen >= rank:
+                    result[name] = round(self._bucket_value(bucket), 2)
+                    break
+        result["max"] = round(self._bucket_value(ordered[-1][0]), 2)
+        return result
+
+
+class HttpProbeEngine:
+    def __init__(self, endpoints: List[Dict], timeout: float = 10, window_seconds: float = 900):
+        """Инициализация движка проб
+
+        endpoints - список {'name', 'url', 'expect_status'}.
+        """
+        self.endpoints = {endpoint['name']: endpoint for endpoint in endpoints}
+        self.timeout = timeout
+        self.ssl_context = ssl.create_default_context()
+
+        self.histograms = {
+            name: {phase: LatencyHistogram(window_seconds=window_seconds) for phase in PHASES}
+            for name in self.endpoints
+        }
+        self.results = {}
+        self.counters = {name: {"probes": 0, "failures": 0} for name in self.endpoints}
+        self._lock = threading.Lock()
+
+    async def probe(self, endpoint: Dict) -> Dict:
+        """Одна проба эндпоинта с разбивкой времени по фазам"""
+        url = urlsplit(endpoint['url'])
+        https = url.scheme == 'https'
+        host = url.hostname
+        port = url.port or (443 if https else 80)
+        path = url.path or '/'
+        if url.query:
+            path += f"?{url.query}"
+
+        timings = {}
+        writer = None
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        try:
+            # DNS
+            addresses = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            family, _, _, _, address = addresses[0]
+            timings["dns"] = (time.perf_counter() - started) * 1000
+
+            # TCP connect
+            phase_start = time.perf_counter()
+            reader, writer = await asyncio.open_connection(address[0], port, family=family)
+            timings["connect"] = (time.perf_counter() - phase_start) * 1000
+
+            # TLS handshake
+            if https:
+                phase_start = time.perf_counter()
+                await writer.start_tls(self.ssl_context, server_hostname=host)
+                timings["tls"] = (time.perf_counter() - phase_start) * 1000
+
+            # Запрос и время до первого байта
+            request_start = time.perf_counter()
+            writer.write(
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {url.netloc}\r\n"
+                f"User-Agent: yandex-server-agent-probe\r\n"
+                f"Accept: */*\r\n"
+                f"Connection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+
+            status_line = await reader.readline()
+            timings["ttfb"] = (time.perf_counter() - request_start) * 1000
+
+            # Тело ответа дочитывается до закрытия соединения (с ограничением)
+            received = 0
+            while received < MAX_BODY_BYTES:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                received += len(chunk)
+
+            timings["total"] = (time.perf_counter() - started) * 1000
+
+            parts = status_line.decode('latin-1').split()
+            status_code = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+            expected = endpoint.get('expect_status', 200)
+
+            return {
+                "ok": status_code == expected,
+                "status_code": status_code,
+                "timings_ms": {phase: round(value, 2) for phase, value in timings.items()},
+                "error": None if status_code == expected else f"HTTP {status_code}"
+            }
+
+        except Exception as e:
+            return {
+                "ok": False,
+                "status_code": 0,
+                "timings_ms": {phase: round(value, 2) for phase, value in timings.items()},
+                "error": str(e) or type(e).__name__
+            }
+        finally:
+            if writer is not None:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except Exception:
+                    pass
+
+    async def _probe_with_timeout(self, name: str) -> Dict:
+        """Проба с общим дедлайном"""
+        endpoint = self.endpoints[name]
+        try:
+            result = await asyncio.wait_for(self.probe(endpoint), timeout=endpoint.get('timeout', self.timeout))
+        except asyncio.TimeoutError:
+            result = {"ok": False, "status_code": 0, "timings_ms": {}, "error": "Timeout"}
+
+        result["name"] = name
+        result["url"] = endpoint['url']
+        result["checked_at"] = datetime.now().isoformat()
+        self._record(name, result)
+        return result
+
+    def _record(self, name: str, result: Dict):
+        """Сохранение результата и замеров в гистограммы"""
+        now = time.time()
+        with self._lock:
+            self.results[name] = result
+            self.counters[name]["probes"] += 1
+            if not result["ok"]:
+                self.counters[name]["failures"] += 1
+
+        # В гистограммы попадают только фазы, которые успели завершиться
+        for phase, value in result["timings_ms"].items():
+            self.histograms[name][phase].record(value, now)
+
+    async def probe_all_async(self, names: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Одновременная проба всех (или выбранных) эндпоинтов"""
+        names = names or list(self.endpoints)
+        results = await asyncio.gather(*(self._probe_with_timeout(name) for name in names))
+        return {result["name"]: result for result in results}
+
+    def probe_all(self, names: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Синхронная обертка для вызова из потоков агента"""
+        return asyncio.run(self.probe_all_async(names))
+
+    def probe_endpoint(self, name: str) -> Dict:
+        """Синхронная проба одного эндпоинта"""
+        return self.probe_all([name])[name]
+
+    def latest(self, name: str) -> Optional[Dict]:
+        """Последний результат пробы эндпоинта"""
+        with self._lock:
+            return self.results.get(name)
+
+    def latency(self, name: str) -> Dict[str, Dict]:
+        """Перцентили задержек эндпоинта по фазам"""
+        return {phase: histogram.snapshot() for phase, histogram in self.histograms[name].items()}
+
+    def get_summary(self) -> Dict[str, Dict]:
+        """Сводка по всем эндпоинтам"""
+        summary = {}
+        for name in self.endpoints:
+            with self._lock:
+                counters = dict(self.counters[name])
+                latest = self.results.get(name)
+            summary[name] = {
+                **counters,
+                "last": latest,
+                "latency_ms": self.latency(name)
+            }
+        return summary
@@ -114,6 +114,9 @@ create_directories() {
     sudo chown -R yc-user:yc-user "/home/yc-user/gita-1972/"
     sudo chmod -R 755 "/home/yc-user/gita-1972/"
     
+    # Логи Nginx принадлежат www-data:adm (640): агент читает их как член группы adm
+    sudo usermod -aG adm yc-user
+    
     log_success "✅ Директории созданы"
 }
 
@@ -130,6 +133,14 @@ copy_agent_files() {
         exit 1
     fi
     
+    # Копируем модули агента
+    for module in *.py; do
+        if [[ "$module" != "yandex-server-agent.py" ]]; then
+            sudo cp "$module" "$AGENT_DIR/"
+        fi
+    done
+    log_success "✅ Модули агента скопированы"
+    
     if [[ -f "agent-config.json" ]]; then
         sudo cp agent-config.json "$AGENT_DIR/"
         log_success "✅ Конфигурация скопирована"
@@ -156,6 +167,7 @@ Wants=network.target
 Type=simple
 User=yc-user
 Group=yc-user
+SupplementaryGroups=adm
 WorkingDirectory=$AGENT_DIR
 ExecStart=/usr/bin/python3 $AGENT_DIR/yandex-server-agent.py
 Restart=always
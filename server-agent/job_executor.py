@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+🏗️ Job Executor - выполнение тяжелых задач вне потока планировщика
+У каждого класса задач свой пул потоков, одна и та же задача
+никогда не запускается повторно, пока предыдущий запуск не завершен
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# Классы задач по умолчанию: число одновременно выполняемых задач в классе
+DEFAULT_CLASSES = {
+    "checks": 1,
+    "maintenance": 1,
+    "analysis": 1,
+    "io": 2
+}
+
+
+class JobExecutor:
+    def __init__(self, classes: Optional[Dict[str, int]] = None):
+        """Инициализация исполнителя задач"""
+        self.classes = dict(DEFAULT_CLASSES, **(classes or {}))
+        self.pools = {
+            name: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"job-{name}")
+            for name, workers in self.classes.items()
+        }
+
+        self._running = {}
+        self._lock = threading.Lock()
+
+        self.stats = {}
+
+    def submit(self, name: str, func: Callable, job_class: str = "io") -> Optional[Future]:
+        """Запуск задачи в пуле ее класса
+
+        Возвращает None, если предыдущий запуск этой задачи еще выполняется.
+        """
+        if job_class not in self.pools:
+            raise ValueError(f"Неизвестный класс задач: {job_class}")
+
+        with self._lock:
+            stats = self.stats.setdefault(name, {
+                "job_class": job_class,
+                "submitted": 0,
+                "completed": 0,
+                "failures": 0,
+                "rejected_overlap": 0,
+                "last_duration": 0.0,
+                "max_duration": 0.0,
+                "running_since": None
+            })
+
+            running = self._running.get(name)
+            if running is not None and not running.done():
+                stats["rejected_overlap"] += 1
+                logging.warning(f"⏭️ Задача {name} еще выполняется - повторный запуск пропущен")
+                return None
+
+            stats["submitted"] += 1
+            future = self.pools[job_class].submit(self._execute, name, func)
+            self._running[name] = future
+            return future
+
+    def wrap(self, name: str, func: Callable, job_class: str = "io") -> Callable[[], None]:
+        """Обертка для планировщика: задача только ставится в пул и сразу возвращает управление"""
+        def submit_job():
+            self.submit(name, func, job_class)
+        return submit_job
+
+    def _execute(self, name: str, func: Callable):
+        """Выполнение задачи с учетом статистики"""
+        started = time.monotonic()
+        with self._lock:
+            self.stats[name]["running_since"] = time.time()
+
+        try:
+            return func()
+        except Exception as e:
+            with self._lock:
+                self.stats[name]["failures"] += 1
+            logging.error(f"❌ Ошибка фоновой задачи {name}: {e}")
+        finally:
+            duration = time.monotonic() - started
+            with self._lock:
+                stats = self.stats[name]
+                stats["completed"] += 1
+                stats["running_since"] = None
+                stats["last_duration"] = round(duration, 3)
+                stats["max_duration"] = round(max(stats["max_duration"], duration), 3)
+
+    def is_running(self, name: str) -> bool:
+        """Выполняется ли задача сейчас"""
+        with self._lock:
+            running = self._running.get(name)
+            return running is not None and not running.done()
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Число задач в очереди каждого класса (поставлены, но еще не начаты)"""
+        depths = {name: 0 for name in self.classes}
+        with self._lock:
+            for name, future in self._running.items():
+                stats = self.stats[name]
+                if not future.done() and stats["running_since"] is None:
+                    depths[stats["job_class"]] += 1
+        return depths
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Статистика по задачам"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self.stats.items()}
+
+    def shutdown(self, wait: bool = False):
+        """Остановка всех пулов"""
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
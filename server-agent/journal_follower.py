@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+📜 Journal Follower - инкрементальное чтение журнала systemd по курсору
+Записи читаются из `journalctl -o json` начиная с сохраненного курсора,
+каждая запись разбирается с реальным временем и приоритетом и
+обрабатывается ровно один раз
+"""
+
+import json
+import logging
+import os
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Имена приоритетов syslog
+PRIORITY_NAMES = {
+    0: "EMERGENCY",
+    1: "ALERT",
+    2: "CRITICAL",
+    3: "ERROR",
+    4: "WARNING",
+    5: "NOTICE",
+    6: "INFO",
+    7: "DEBUG"
+}
+
+
+class JournalFollower:
+    def __init__(self, unit: str, cursor_file: str, priority: str = "err",
+                 initial_since: str = "1 hours ago", max_entries: int = 1000, timeout: float = 30):
+        """Инициализация чтения журнала юнита
+
+        При первом запуске (курсора еще нет) читается окно initial_since.
+        За один вызов читается не больше max_entries записей, остаток - в следующий раз.
+        """
+        self.unit = unit
+        self.cursor_file = cursor_file
+        self.priority = priority
+        self.initial_since = initial_since
+        self.max_entries = max_entries
+        self.timeout = timeout
+
+        self.cursor = self.load_cursor()
+        self._pending_cursor = None
+
+        self.stats = {
+            "reads": 0,
+            "entries": 0,
+            "committed": 0
+        }
+
+    def load_cursor(self) -> Optional[str]:
+        """Загрузка сохраненного курсора"""
+        try:
+            with open(self.cursor_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('cursor')
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"❌ Ошибка чтения курсора журнала {self.unit}: {e}")
+            return None
+
+    def save_cursor(self):
+        """Атомарное сохранение курсора"""
+        try:
+            os.makedirs(os.path.dirname(self.cursor_file) or '.', exist_ok=True)
+            tmp_path = f"{self.cursor_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"unit": self.unit, "cursor": self.cursor}, f)
+            os.replace(tmp_path, self.cursor_file)
+        except Exception as e:
+            logging.error(f"❌ Ошибка сохранения курсора журнала {self.unit}: {e}")
+
+    def _command(self) -> List[str]:
+        """Команда journalctl от текущей позиции"""
+        command = ["journalctl", "-u", self.unit, "-p", self.priority, "-o", "json", "--no-pager"]
+        if self.cursor:
+            command.append(f"--after-cursor={self.cursor}")
+        else:
+            command.extend(["-S", self.initial_since])
+        return command
+
+    def read_new(self) -> List[Dict]:
+        """Новые записи после курсора
+
+        Курсор сдвигается только вызовом commit() - после успешной обработки записей.
+        """
+        entries = []
+        self.stats["reads"] += 1
+
+        try:
+            process = subprocess.Popen(self._command(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except FileNotFoundError:
+            return []
+
+        try:
+            # Вывод читается потоком и обрывается на max_entries
+            for line in process.stdout:
+                entry = self._parse_entry(line)
+                if entry is None:
+                    continue
+                entries.append(entry)
+                if len(entries) >= self.max_entries:
+                    break
+        finally:
+            if process.poll() is None:
+                process.terminate()
+            try:
+                process.wait(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+        if entries:
+            self._pending_cursor = entries[-1]["cursor"]
+        self.stats["entries"] += len(entries)
+        return entries
+
+    def commit(self):
+        """Подтверждение обработки прочитанных записей"""
+        if self._pending_cursor and self._pending_cursor != self.cursor:
+            self.cursor = self._pending_cursor
+            self.stats["committed"] += 1
+            self.save_cursor()
+        self._pending_cursor = None
+
+    def _parse_entry(self, line: str) -> Optional[Dict]:
+        """Запись журнала с реальным временем"""
+        try:
+            raw = json.loads(line)
+        except ValueError:
+            return None
+
+        cursor = raw.get("__CURSOR")
+        if not cursor:
+            return None
+
+        # MESSAGE с непечатаемыми символами journald отдает массивом байт
+        message = raw.get("MESSAGE", "")
+        if isinstance(message, list):
+            message = bytes(message).decode('utf-8', errors='replace')
+
+        priority = int(raw.get("PRIORITY", 3))
+        realtime_us = int(raw.get("__REALTIME_TIMESTAMP", 0))
+
+        return {
+            "source": f"systemd/{self.unit}",
+            "timestamp": datetime.fromtimestamp(realtime_us / 1_000_000).isoformat(),
+            "level": PRIORITY_NAMES.get(priority, "ERROR"),
+            "priority": priority,
+            "message": (message or "").strip(),
+            "pid": int(raw["_PID"]) if raw.get("_PID", "").isdigit() else None,
+            "category": "service_failure",
+            "cursor": cursor
+        }
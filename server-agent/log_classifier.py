@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+🏷️ Log Classifier - классификация строк логов одним проходом
+Ключевые фразы всех правил компилируются один раз в префиксное дерево:
+строка просматривается один раз, по сработавшим правилам определяются
+категория, серьезность и сервис, отдельно извлекаются поля (upstream,
+client, status, request)
+"""
+
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+# Порядок серьезности: при нескольких совпадениях побеждает более серьезное правило
+SEVERITY_RANK = {
+    "info": 0,
+    "warning": 1,
+    "error": 2,
+    "critical": 3
+}
+
+# Upstream Nginx (host:port) -> сервис; gita-api слушает порт 3000
+DEFAULT_UPSTREAM_SERVICES = {
+    "127.0.0.1:3000": "gita-api",
+    "localhost:3000": "gita-api"
+}
+
+# Правила по умолчанию: ключевые фразы (без учета регистра), категория, серьезность, сервис.
+# service_from_upstream - сервис определяется по upstream строки; неизвестный upstream
+# или его отсутствие дают None, чтобы не перезапускать не тот сервис
+DEFAULT_RULES = [
+    {"name": "out_of_memory", "keywords": ["out of memory", "oom-kill", "enomem"],
+     "category": "out_of_memory", "severity": "critical"},
+    {"name": "disk_full", "keywords": ["no space left on device", "enospc"],
+     "category": "disk_full", "severity": "critical"},
+    {"name": "dependency", "keywords": ["cannot find module", "module_not_found"],
+     "category": "dependency", "severity": "critical", "service": "gita-api"},
+    {"name": "port_conflict", "keywords": ["eaddrinuse", "address already in use"],
+     "category": "port_conflict", "severity": "critical"},
+    {"name": "service_failure", "keywords": ["failed to start", "main process exited", "start request repeated too quickly"],
+     "category": "service_failure", "severity": "critical"},
+    {"name": "nginx_critical", "keywords": ["[emerg]", "[alert]", "[crit]"],
+     "category": "web_server_error", "severity": "critical", "service": "nginx"},
+    {"name": "upstream_failure", "keywords": ["upstream timed out", "upstream prematurely closed", "no live upstreams"],
+     "category": "upstream_failure", "severity": "error", "service_from_upstream": True},
+    {"name": "connection_refused", "keywords": ["connect() failed", "connection refused", "econnrefused"],
+     "category": "connection_refused", "severity": "error", "service_from_upstream": True},
+    {"name": "resource_limit", "keywords": ["too many open files", "emfile"],
+     "category": "resource_limit", "severity": "error"},
+    {"name": "permission", "keywords": ["permission denied", "eacces"],
+     "category": "permission", "severity": "error"},
+    {"name": "ssl", "keywords": ["ssl", "certificate", "handshake"],
+     "category": "ssl", "severity": "error"},
+    {"name": "timeout", "keywords": ["timed out", "timeout", "etimedout"],
+     "category": "timeout", "severity": "warning"},
+    {"name": "nginx_error", "keywords": ["[error]"],
+     "category": "web_server_error", "severity": "error", "service": "nginx"},
+    {"name": "application_error", "keywords": ["error", "critical", "traceback", "exception"],
+     "category": "application_error", "severity": "error"}
+]
+
+# Поля, которые извлекаются из строки: (имя, подстрока-признак, выражение)
+# Выражение запускается только если в строке есть признак - для большинства строк это одна проверка подстроки
+FIELD_PATTERNS = [
+    ("upstream", 'upstream: "', re.compile(r'upstream: "([^"]+)"')),
+    ("client", 'client: ', re.compile(r'client: ([0-9a-fA-F.:]+)')),
+    ("request", 'request: "', re.compile(r'request: "([^"]+)"')),
+    ("status", 'status', re.compile(r'\bstatus(?: code)?[ =:]+([1-5]\d\d)\b'))
+]
+
+
+def build_trie_pattern(phrases: List[str]) -> str:
+    """Регулярное выражение-префиксное дерево из фраз
+
+    В отличие от простого перечисления через |, движок regex в каждой позиции
+    проверяет только ветки с подходящим первым символом - по сути Aho-Corasick
+    на встроенном re.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        ends_here = '' in node
+        if len(branches) == 1 and not ends_here:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if ends_here else group
+
+    return build(trie)
+
+
+class LogClassifier:
+    def __init__(self, rules: Optional[List[Dict]] = None, upstream_services: Optional[Dict[str, str]] = None):
+        """Компиляция набора правил
+
+        Пользовательские правила добавляются к правилам по умолчанию
+        и при равной серьезности имеют приоритет.
+        """
+        self.rules = list(rules or []) + DEFAULT_RULES
+        self.upstream_services = {**DEFAULT_UPSTREAM_SERVICES, **(upstream_services or {})}
+
+        # Фраза -> номер правила; при повторе фразы остается первое правило
+        self.phrases = {}
+        for index, rule in enumerate(self.rules):
+            for keyword in rule["keywords"]:
+                self.phrases.setdefault(keyword.lower(), index)
+        self.pattern = re.compile(build_trie_pattern(list(self.phrases)))
+
+    def classify(self, line: str, service: Optional[str] = None) -> Dict:
+        """Категория, серьезность, сервис и поля строки
+
+        Если ни одно правило не сработало, category и severity равны None.
+        """
+        best = None
+        best_rank = -1
+        lowered = line.lower()
+        for phrase in self.pattern.findall(lowered):
+            index = self.phrases[phrase]
+            rank = SEVERITY_RANK[self.rules[index]["severity"]]
+            if rank > best_rank or rank == best_rank and index < best:
+                best, best_rank = index, rank
+        fields = {}
+        for name, marker, pattern in FIELD_PATTERNS:
+            if marker in lowered:
+                match = pattern.search(lowered if name == "status" else line)
+                if match:
+                    fields[name] = match.group(1)
+        if "status" in fields:
+            fields["status"] = int(fields["status"])
+
+        if best is None:
+            return {"category": None, "severity": None, "service": service, "rule": None, "fields": fields}
+
+        rule = self.rules[best]
+        if rule.get("service_from_upstream"):
+            service = self.upstream_services.get(urlsplit(fields["upstream"]).netloc) if "upstream" in fields else None
+        return {
+            "category": rule["category"],
+            "severity": rule["severity"],
+            "service": rule.get("service", service),
+            "rule": rule["name"],
+            "fields": fields
+        }
+
+    def is_at_least(self, classification: Dict, severity: str) -> bool:
+        """Серьезность не ниже заданной"""
+        found = classification.get("severity")
+        return found is not None and SEVERITY_RANK[found] >= SEVERITY_RANK[severity]
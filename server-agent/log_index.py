@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+📇 Log Index - инкрементальный индекс лога агента
+Файл дочитывается с сохраненного смещения, ротация определяется по inode.
+Ведутся счетчики по уровням и дням, а последние ошибки хранятся в кольцевом
+буфере: запросы стоят O(новых байт), а не O(размера файла)
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+# Уровни, которые попадают в буфер последних проблем
+ERROR_LEVELS = ("ERROR", "CRITICAL")
+
+# Формат времени logging по умолчанию: 2025-08-26 03:00:00,123
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+# Лог агента и маркеры, которые считаются по дням
+AGENT_LOG_FILE = "/home/yc-user/gita-1972/logs/server-agent.log"
+AGENT_LOG_MARKERS = {
+    "critical_checks": "критических проверок"
+}
+
+
+class LogIndex:
+    def __init__(self, path: str, markers: Optional[Dict[str, str]] = None, recent_size: int = 200,
+                 keep_days: int = 31, state_file: Optional[str] = None):
+        """Инициализация индекса
+
+        markers - именованные подстроки, вхождения которых считаются по дням.
+        state_file - куда сохранять смещение и счетчики между перезапусками.
+        """
+        self.path = path
+        self.markers = markers or {}
+        self.keep_days = keep_days
+        self.state_file = state_file
+
+        self.inode = None
+        self.offset = 0
+        self.levels = {}
+        self.days = {}
+        self.recent = deque(maxlen=recent_size)
+        self.bytes_read = 0
+
+        self._lock = threading.Lock()
+        self.load_state()
+
+    def load_state(self):
+        """Загрузка сохраненного смещения и счетчиков"""
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('path') != self.path:
+                return
+            self.inode = state.get('inode')
+            self.offset = state.get('offset', 0)
+            self.levels = state.get('levels', {})
+            self.days = state.get('days', {})
+            self.recent.extend(state.get('recent', []))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"❌ Ошибка чтения состояния индекса лога: {e}")
+
+    def save_state(self):
+        """Атомарное сохранение смещения и счетчиков"""
+        if not self.state_file:
+            return
+        try:
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "path": self.path,
+                    "inode": self.inode,
+                    "offset": self.offset,
+                    "levels": self.levels,
+                    "days": self.days,
+                    "recent": list(self.recent)
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            logging.error(f"❌ Ошибка сохранения состояния индекса лога: {e}")
+
+    def refresh(self) -> int:
+        """Дочитывание новых строк, возвращает число прочитанных байт"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return 0
+
+            read = 0
+            if self.inode is not None and stat.st_ino != self.inode:
+                # Файл ротирован: хвост старого файла дочитывается из path.1, если он там
+                read += self._read_rotated()
+                self.offset = 0
+            elif stat.st_size < self.offset:
+                # Файл усечен (copytruncate)
+                self.offset = 0
+
+            self.inode = stat.st_ino
+            if stat.st_size > self.offset:
+                read += self._read_from(self.path)
+
+            if read:
+                self.bytes_read += read
+                self._expire_days()
+                self.save_state()
+            return read
+
+    def _read_rotated(self) -> int:
+        """Дочитывание ротированного файла с прежним inode"""
+        rotated = f"{self.path}.1"
+        try:
+            if os.stat(rotated).st_ino != self.inode:
+                return 0
+        except FileNotFoundError:
+            return 0
+        return self._read_from(rotated)
+
+    def _read_from(self, path: str) -> int:
+        """Чтение полных строк файла начиная с self.offset"""
+        read = 0
+        with open(path, 'rb') as f:
+            f.seek(self.offset)
+            pending = b''
+            while True:
+                chunk = f.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                data = pending + chunk
+
+                # Незавершенная последняя строка будет прочитана со следующим блоком или вызовом
+                end = data.rfind(b'\n') + 1
+                pending = data[end:]
+                if not end:
+                    continue
+
+                for raw_line in data[:end].splitlines():
+                    self._index_line(raw_line.decode('utf-8', errors='replace'))
+
+                self.offset += end
+                read += end
+        return read
+
+    def _index_line(self, line: str):
+        """Учет одной строки формата '<время> - <уровень> - <сообщение>'"""
+        parts = line.split(' - ', 2)
+        if len(parts) < 3 or parts[1] not in LEVELS:
+            # Продолжение многострочного сообщения (traceback) - не отдельная запись
+            return
+
+        timestamp, level, message = parts
+        day = timestamp[:10]
+
+        self.levels[level] = self.levels.get(level, 0) + 1
+        day_counters = self.days.setdefault(day, {"levels": {}, "markers": {}})
+        day_counters["levels"][level] = day_counters["levels"].get(level, 0) + 1
+
+        for name, marker in self.markers.items():
+            if marker in message:
+                day_counters["markers"][name] = day_counters["markers"].get(name, 0) + 1
+
+        if level in ERROR_LEVELS:
+            self.recent.append({"time": timestamp, "level": level, "message": message})
+
+    def _expire_days(self):
+        """Удаление счетчиков старше keep_days"""
+        for day in sorted(self.days)[:-self.keep_days]:
+            del self.days[day]
+
+    def recent_errors(self, limit: int = 5, since: Optional[datetime] = None) -> List[Dict]:
+        """Последние ошибки (не больше limit), при since - только более новые"""
+        self.refresh()
+        with self._lock:
+            entries = list(self.recent)
+
+        if since is not None:
+            cutoff = since.strftime(TIMESTAMP_FORMAT)
+            entries = [entry for entry in entries if entry["time"][:19] >= cutoff]
+
+        return entries[-limit:] if limit else entries
+
+    def count(self, level: Optional[str] = None, day: Optional[str] = None) -> int:
+        """Число записей уровня (или всех) за день (или за все время)"""
+        self.refresh()
+        with self._lock:
+            if day is None:
+                counters = self.levels
+            else:
+                counters = self.days.get(day, {}).get("levels", {})
+            return counters.get(level, 0) if level else sum(counters.values())
+
+    def marker_count(self, name: str, day: Optional[str] = None) -> int:
+        """Число строк с маркером за день (по умолчанию сегодня)"""
+        self.refresh()
+        day = day or datetime.now().strftime('%Y-%m-%d')
+        with self._lock:
+            return self.days.get(day, {}).get("markers", {}).get(name, 0)
+
+    def get_stats(self) -> Dict:
+        """Состояние индекса"""
+        with self._lock:
+            return {
+                "path": self.path,
+                "offset": self.offset,
+                "bytes_read": self.bytes_read,
+                "levels": dict(self.levels),
+                "recent_errors": len(self.recent)
+            }
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+🧩 Log Templates - онлайн выделение шаблонов ошибок (в духе Drain)
+Переменные части строки (числа, адреса, идентификаторы) маскируются,
+похожие строки сливаются в кластер со стабильным отпечатком: тысячи
+одинаковых `upstream timed out` становятся одним кластером со счетчиком,
+временем первого и последнего появления и примерами значений
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Маски переменных частей: порядок важен - сначала более специфичные
+MASKS = [
+    (re.compile(r'\b\d{4}[-/]\d{2}[-/]\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b'), '<TIME>'),
+    (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b', re.IGNORECASE), '<UUID>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<IP>'),
+    (re.compile(r'https?://[^\s"\',]+'), '<URL>'),
+    (re.compile(r'\b0x[0-9a-f]+\b|\b[0-9a-f]{16,}\b', re.IGNORECASE), '<HEX>'),
+    (re.compile(r'(?<![\w.])[-+]?\d+(?:\.\d+)?(?:ms|s|b|kb|mb)?\b', re.IGNORECASE), '<NUM>')
+]
+
+WILDCARD = '<*>'
+
+# Префикс строки лога (время, уровень, pid nginx) и эмодзи перед текстом: одинаковые
+# у всех строк, они завышали похожесть коротких разных сообщений
+LINE_PREFIX = re.compile(
+    r'^(?:\d{4}[-/]\d{2}[-/]\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\S*\s+)?'
+    r'(?:-\s+)?(?:\[?(?:DEBUG|INFO|WARNING|WARN|ERROR|CRITICAL|FATAL|debug|info|notice|warn|error|crit|alert|emerg)\]?:?\s+)?'
+    r'(?:-\s+)?(?:\d+#\d+:\s+(?:\*\d+\s+)?)?(?:[^\w\s]+\s*)*'
+)
+
+# Поля метаданных, которые считаются по каждой строке: одинаковый шаблон
+# встречается в разных источниках (nginx и journal gita-api)
+COUNTED_FIELDS = ('source', 'service')
+
+
+class TemplateMiner:
+    def __init__(self, similarity_threshold: float = 0.5, max_clusters: int = 1000,
+                 max_examples: int = 3, max_values: int = 10, path: Optional[str] = None):
+        """Инициализация дерева шаблонов; с path кластеры загружаются с диска
+
+        Отпечаток - хэш первого шаблона кластера, поэтому без сохранения он зависел
+        бы от порядка строк после перезапуска и не годился бы как ключ кэша.
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_clusters = max_clusters
+        self.max_examples = max_examples
+        self.max_values = max_values
+
+        # Дерево разбора Drain: длина строки в токенах -> первый токен -> кластеры
+        self.tree = {}
+        self.clusters = {}
+        self._lock = threading.Lock()
+
+        self.path = path
+        if path:
+            self.load()
+
+    def load(self):
+        """Загрузка кластеров и восстановление дерева разбора"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logging.error(f"❌ Ошибка чтения шаблонов ошибок {self.path}: {e}")
+            return
+
+        with self._lock:
+            for cluster in stored.get('clusters', []):
+                tokens = cluster["tokens"]
+                self.tree.setdefault(len(tokens), {}).setdefault(self._leaf_key(tokens), []).append(cluster)
+                self.clusters[cluster["fingerprint"]] = cluster
+
+    def save(self):
+        """Атомарное сохранение кластеров"""
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps({"clusters": list(self.clusters.values())}, ensure_ascii=False)
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"❌ Ошибка сохранения шаблонов ошибок {self.path}: {e}")
+
+    @staticmethod
+    def _leaf_key(tokens: List[str]) -> str:
+        """Ключ листа дерева: первый токен, если в нем нет цифр"""
+        return tokens[0] if not any(char.isdigit() for char in tokens[0]) else WILDCARD
+
+    def mask(self, message: str) -> Tuple[str, List[str]]:
+        """Маскирование переменных частей, возвращает строку и замененные значения"""
+        values = []
+
+        def replace(token):
+            def substitute(match):
+                values.append(match.group(0))
+                return token
+            return substitute
+
+        for pattern, token in MASKS:
+            message = pattern.sub(replace(token), message)
+        return message, values
+
+    def add(self, message: str, timestamp: str, metadata: Optional[Dict] = None) -> Dict:
+        """Добавление строки, возвращает ее кластер (шаблон строится по тексту без префикса)"""
+        masked, values = self.mask(LINE_PREFIX.sub('', message.strip(), count=1))
+        tokens = masked.split()
+        if not tokens:
+            tokens = [WILDCARD]
+
+        with self._lock:
+            leaf = self.tree.setdefault(len(tokens), {}).setdefault(self._leaf_key(tokens), [])
+
+            cluster = self._best_match(leaf, tokens)
+            if cluster is None:
+                cluster = self._create(tokens, timestamp, metadata)
+                leaf.append(cluster)
+            else:
+                # Различающиеся токены становятся переменными, шаблон обобщается
+                for index, (template_token, token) in enumerate(zip(cluster["tokens"], tokens)):
+                    if template_token != token and template_token != WILDCARD:
+                        cluster["tokens"][index] = WILDCARD
+                        values.append(token)
+                cluster["template"] = ' '.join(cluster["tokens"])
+
+            cluster["count"] += 1
+            cluster["first_seen"] = min(cluster["first_seen"], timestamp)
+            cluster["last_seen"] = max(cluster["last_seen"], timestamp)
+            if len(cluster["examples"]) < self.max_examples and message not in cluster["examples"]:
+                cluster["examples"].append(message.strip())
+            for value in values:
+                if len(cluster["values"]) >= self.max_values:
+                    break
+                if value not in cluster["values"]:
+                    cluster["values"].append(value)
+            self._count_metadata(cluster, metadata)
+
+            if len(self.clusters) > self.max_clusters:
+                self._evict()
+            return cluster
+
+    def _count_metadata(self, cluster: Dict, metadata: Optional[Dict]):
+        """Счетчики источников и сервисов кластера; поле source/service - самое частое значение"""
+        for field in COUNTED_FIELDS:
+            value = (metadata or {}).get(field)
+            if value is None:
+                continue
+            counts = cluster.setdefault(f"{field}s", {})
+            counts[value] = counts.get(value, 0) + 1
+            cluster[field] = max(counts, key=counts.get)
+
+    def _best_match(self, leaf: List[Dict], tokens: List[str]) -> Optional[Dict]:
+        """Самый похожий кластер листа, если похожесть выше порога"""
+        best = None
+        best_similarity = -1.0
+        for cluster in leaf:
+            same = sum(1 for template_token, token in zip(cluster["tokens"], tokens)
+                       if template_token == token or template_token == WILDCARD)
+            similarity = same / len(tokens)
+            if similarity > best_similarity:
+                best, best_similarity = cluster, similarity
+        return best if best_similarity >= self.similarity_threshold else None
+
+    def _create(self, tokens: List[str], timestamp: str, metadata: Optional[Dict]) -> Dict:
+        """Новый кластер; отпечаток считается по исходному шаблону и не меняется при обобщении
+
+        Категория и серьезность берутся из первой строки, источники и сервисы
+        считаются по всем строкам в _count_metadata.
+        """
+        template = ' '.join(tokens)
+        fingerprint = hashlib.sha1(template.encode('utf-8')).hexdigest()[:12]
+        cluster = {
+            "fingerprint": fingerprint,
+            "template": template,
+            "tokens": list(tokens),
+            "count": 0,
+            "first_seen": timestamp,
+            "last_seen": timestamp,
+            "examples": [],
+            "values": [],
+            **(metadata or {})
+        }
+        self.clusters[fingerprint] = cluster
+        return cluster
+
+    def _evict(self):
+        """Удаление давно не встречавшихся кластеров"""
+        stale = sorted(self.clusters.values(), key=lambda cluster: cluster["last_seen"])
+        for cluster in stale[:len(self.clusters) - self.max_clusters]:
+            del self.clusters[cluster["fingerprint"]]
+            for leaves in self.tree.values():
+                for leaf in leaves.values():
+                    if cluster in leaf:
+                        leaf.remove(cluster)
+
+    def summarize(self, fingerprints: List[str]) -> List[Dict]:
+        """Снимок кластеров (без служебных токенов), самые частые первыми"""
+        with self._lock:
+            clusters = [self.clusters[fingerprint] for fingerprint in set(fingerprints) if fingerprint in self.clusters]
+            snapshot = [
+                {key: type(value)(value) if isinstance(value, (list, dict)) else value
+                 for key, value in cluster.items() if key != "tokens"}
+                for cluster in clusters
+            ]
+        return sorted(snapshot, key=lambda cluster: cluster["count"], reverse=True)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+📈 Metric History - история метрик для прогнозирования
+Каждый сбор метрик дописывает одну строку CSV (время и значения), старые
+строки раз в сутки отбрасываются. Формат читается numpy.loadtxt без
+разбора JSON: отсутствующее значение записывается как nan
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+METRIC_HISTORY_FILE = "/home/yc-user/gita-1972/logs/metric-history.csv"
+
+# Колонки после timestamp (секунды Unix)
+HISTORY_METRICS = ("cpu", "memory", "disk", "api_latency_ms", "requests")
+
+TRIM_INTERVAL_SECONDS = 24 * 3600
+
+
+class MetricHistory:
+    def __init__(self, path: str = METRIC_HISTORY_FILE, retention_days: int = 35):
+        """Инициализация файла истории"""
+        self.path = path
+        self.retention_days = retention_days
+        self._last_trim = 0.0
+        self._lock = threading.Lock()
+
+    def append(self, values: Dict[str, Optional[float]], timestamp: Optional[float] = None):
+        """Добавление замера; метрики не из HISTORY_METRICS игнорируются"""
+        timestamp = timestamp or time.time()
+        row = [f"{timestamp:.0f}"] + [
+            'nan' if values.get(name) is None else f"{float(values[name]):.3f}"
+            for name in HISTORY_METRICS
+        ]
+
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                new_file = not os.path.exists(self.path)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    if new_file:
+                        f.write('# timestamp,' + ','.join(HISTORY_METRICS) + '\n')
+                    f.write(','.join(row) + '\n')
+            except Exception as e:
+                logging.error(f"❌ Ошибка записи истории метрик: {e}")
+                return
+
+            if timestamp - self._last_trim >= TRIM_INTERVAL_SECONDS:
+                self._trim(timestamp - self.retention_days * 86400)
+                self._last_trim = timestamp
+
+    def _trim(self, cutoff: float):
+        """Атомарная перезапись без строк старше cutoff"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+            kept = [line for line in lines if line.startswith('#') or float(line.split(',', 1)[0]) >= cutoff]
+            if len(kept) == len(lines):
+                return
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(kept)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"❌ Ошибка очистки истории метрик: {e}")
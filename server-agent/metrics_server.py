@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+📟 Metrics Server - встроенный HTTP сервер агента
+Отдает /metrics в формате Prometheus из заранее агрегированных счетчиков
+в памяти: скрейп ничего не проверяет заново и занимает микросекунды
+"""
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# Тип ответа обработчика: (HTTP код, content-type, тело)
+Response = Tuple[int, str, bytes]
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Реестр метрик агента"""
+        self._lock = threading.Lock()
+        self._descriptions = {}
+        self._values = {}
+        self._collectors = []
+
+    def describe(self, name: str, metric_type: str, help_text: str):
+        """Описание метрики (gauge или counter)"""
+        with self._lock:
+            self._descriptions[name] = (metric_type, help_text)
+            self._values.setdefault(name, {})
+
+    def set(self, name: str, value: float, **labels):
+        """Установка значения gauge"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Увеличение счетчика"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def add_collector(self, collector: Callable[[], List[Tuple]]):
+        """Коллектор возвращает готовые значения из памяти:
+        список (name, type, help, labels, value)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Текст в формате Prometheus exposition"""
+        with self._lock:
+            families = {
+                name: (self._descriptions.get(name, ("gauge", name)), dict(series))
+                for name, series in self._values.items()
+            }
+
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                logging.error(f"❌ Ошибка коллектора метрик: {e}")
+                continue
+            for name, metric_type, help_text, labels, value in samples:
+                description, series = families.setdefault(name, ((metric_type, help_text), {}))
+                series[tuple(sorted(labels.items()))] = value
+
+        lines = []
+        for name in sorted(families):
+            (metric_type, help_text), series = families[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in series.items():
+                if value is None:
+                    continue
+                lines.append(f"{name}{self._format_labels(labels)} {self._format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def _format_labels(self, labels: Tuple) -> str:
+        """Форматирование меток"""
+        if not labels:
+            return ""
+        escaped = []
+        for key, value in labels:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            escaped.append(f'{key}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    def _format_value(self, value) -> str:
+        """Форматирование значения"""
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class AgentHttpServer:
+    def __init__(self, host: str = "0.0.0.0", port: int = 8080):
+        """Встроенный HTTP сервер агента"""
+        self.host = host
+        self.port = port
+        self.routes = {}
+        self.registry = MetricsRegistry()
+        self.add_route("/metrics", self._metrics_route)
+
+        self._server = None
+        self._thread = None
+
+    def add_route(self, path: str, handler: Callable[[Dict[str, List[str]]], Response]):
+        """Регистрация обработчика пути; обработчик получает query параметры"""
+        self.routes[path] = handler
+
+    def _metrics_route(self, query: Dict[str, List[str]]) -> Response:
+        """GET /metrics"""
+        return 200, PROMETHEUS_CONTENT_TYPE, self.registry.render().encode('utf-8')
+
+    def start(self) -> bool:
+        """Запуск сервера в фоновом потоке"""
+        routes = self.routes
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                handler = routes.get(url.path)
+                if handler is None:
+                    self._reply(404, "text/plain; charset=utf-8", b"not found\n")
+                    return
+                try:
+                    self._reply(*handler(parse_qs(url.query)))
+                except Exception as e:
+                    logging.error(f"❌ Ошибка обработки {url.path}: {e}")
+                    self._reply(500, "text/plain; charset=utf-8", b"internal error\n")
+
+            def _reply(self, status: int, content_type: str, body: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Скрейпы каждые 15 секунд не должны засорять лог агента
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+        except OSError as e:
+            logging.error(f"❌ Не удалось запустить HTTP сервер агента на {self.host}:{self.port}: {e}")
+            return False
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name='agent-http', daemon=True)
+        self._thread.start()
+        logging.info(f"📟 HTTP сервер агента слушает {self.host}:{self.port} ({', '.join(sorted(self.routes))})")
+        return True
+
+    def stop(self):
+        """Остановка сервера"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
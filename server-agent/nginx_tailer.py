@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+🪵 Nginx Tailer - общий сервис чтения логов Nginx по смещению
+access.log и error.log дочитываются с сохраненной позиции, logrotate
+определяется по смене inode и уменьшению размера, остаток ротированного
+файла (.1 или .1.gz) дочитывается. Разобранные строки передаются подписчикам,
+дневные счетчики запросов ведутся сразу при чтении
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional
+
+NGINX_LOGS = {
+    "access": "/var/log/nginx/access.log",
+    "error": "/var/log/nginx/error.log"
+}
+
+# combined: 1.2.3.4 - - [26/Aug/2025:03:00:00 +0300] "GET /api/status HTTP/1.1" 200 512 "-" "curl/8.0"
+ACCESS_PATTERN = re.compile(
+    r'^(?P<remote_addr>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] '
+    r'"(?P<method>\S+) (?P<path>\S+)[^"]*" (?P<status>\d{3}) (?P<bytes>\d+|-)'
+    r'(?: "(?P<referer>[^"]*)" "(?P<user_agent>[^"]*)")?'
+)
+
+# 2025/08/26 03:00:00 [error] 1234#1234: *56 connect() failed ...
+ERROR_PATTERN = re.compile(r'^(?P<time>\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}) \[(?P<level>\w+)\] (?P<message>.*)$')
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+# Начало файла, по которому сжатый .1.gz сверяется с файлом, который читался
+HEAD_BYTES = 64
+
+
+class LogFollower:
+    def __init__(self, path: str, inode: Optional[int] = None, offset: int = 0, head: bytes = b''):
+        """Чтение одного файла по смещению с учетом ротации"""
+        self.path = path
+        self.inode = inode
+        self.offset = offset
+        self.head = head
+
+    def seek_end(self):
+        """Позиция в конец текущего файла: старые строки не читаются как новые"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        self.inode = stat.st_ino
+        self.offset = stat.st_size
+        try:
+            with open(self.path, 'rb') as f:
+                self.head = f.read(HEAD_BYTES)
+        except OSError:
+            self.head = b''
+
+    def poll(self) -> Iterator[str]:
+        """Новые полные строки с последнего вызова (смещение сдвигается по мере чтения)"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+
+        if self.inode is not None and stat.st_ino != self.inode:
+            # logrotate переименовал файл: дочитываем старый и начинаем новый с начала
+            yield from self._read_rotated()
+            self.offset = 0
+            self.head = b''
+        elif stat.st_size < self.offset:
+            # copytruncate: тот же inode, но файл стал короче
+            self.offset = 0
+            self.head = b''
+
+        self.inode = stat.st_ino
+        if stat.st_size > self.offset:
+            with open(self.path, 'rb') as f:
+                if len(self.head) < HEAD_BYTES:
+                    self.head = f.read(HEAD_BYTES)
+                yield from self._read(f)
+
+    def _read_rotated(self) -> Iterator[str]:
+        """Остаток ротированного файла: .1 с прежним inode или уже сжатый .1.gz"""
+        rotated = f"{self.path}.1"
+        try:
+            if os.stat(rotated).st_ino == self.inode:
+                with open(rotated, 'rb') as f:
+                    yield from self._read(f)
+                return
+        except FileNotFoundError:
+            pass
+
+        # Сжатый файл совпадает с исходным по содержимому, смещение то же, но это
+        # может быть и более старая ротация: начало файла сверяется с прочитанным
+        try:
+            with gzip.open(f"{rotated}.gz", 'rb') as f:
+                if not self.head or f.read(len(self.head)) != self.head:
+                    logging.warning(f"⚠️ {rotated}.gz - не тот файл, что читался, остаток {self.path} пропущен")
+                    return
+                yield from self._read(f)
+        except (FileNotFoundError, OSError, EOFError):
+            logging.warning(f"⚠️ Остаток ротированного {self.path} не найден")
+
+    def _read(self, f) -> Iterator[str]:
+        """Полные строки начиная с self.offset, смещение сдвигается на прочитанное"""
+        f.seek(self.offset)
+        pending = b''
+        while True:
+            chunk = f.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            data = pending + chunk
+            end = data.rfind(b'\n') + 1
+            pending = data[end:]
+            if not end:
+                continue
+            lines = data[:end].splitlines()
+            self.offset += end
+            for line in lines:
+                yield line.decode('utf-8', errors='replace')
+
+
+class NginxLogTailer:
+    def __init__(self, checkpoint_file: str, logs: Optional[Dict[str, str]] = None,
+                 interval_seconds: float = 10, keep_days: int = 7):
+        """Инициализация сервиса чтения логов Nginx"""
+        self.checkpoint_file = checkpoint_file
+        self.interval_seconds = interval_seconds
+        self.keep_days = keep_days
+
+        self.followers = {name: LogFollower(path) for name, path in (logs or NGINX_LOGS).items()}
+        self.subscribers = {name: [] for name in self.followers}
+
+        # Дневные счетчики access.log: {'2025-08-26': {'requests', 'api_requests', 'errors_5xx'}}
+        self.daily = {}
+
+        self.stats = {"lines": 0, "polls": 0, "errors": 0}
+        # Логи без прав на чтение: ошибка пишется один раз, а не на каждом опросе
+        self.denied = set()
+        # Подписчики вызываются под блокировкой и могут читать счетчики
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.load_checkpoint()
+
+    def load_checkpoint(self):
+        """Загрузка позиций и счетчиков; логи без сохраненной позиции читаются с конца
+
+        Без контрольной точки (первый запуск, потерянный файл) вся история
+        error.log иначе пришла бы в первый анализ как новые ошибки.
+        """
+        checkpoint = {}
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"❌ Ошибка чтения контрольной точки логов Nginx: {e}")
+
+        files = checkpoint.get('files', {})
+        for name, follower in self.followers.items():
+            position = files.get(name)
+            if position and position.get('path') == follower.path:
+                follower.inode = position.get('inode')
+                follower.offset = position.get('offset', 0)
+                follower.head = bytes.fromhex(position.get('head', ''))
+            else:
+                follower.seek_end()
+        self.daily = checkpoint.get('daily', {})
+
+    def save_checkpoint(self):
+        """Атомарное сохранение позиций и счетчиков"""
+        try:
+            os.makedirs(os.path.dirname(self.checkpoint_file) or '.', exist_ok=True)
+            tmp_path = f"{self.checkpoint_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "files": {
+                        name: {"path": follower.path, "inode": follower.inode, "offset": follower.offset,
+                               "head": follower.head.hex()}
+                        for name, follower in self.followers.items()
+                    },
+                    "daily": self.daily
+                }, f)
+            os.replace(tmp_path, self.checkpoint_file)
+        except Exception as e:
+            logging.error(f"❌ Ошибка сохранения контрольной точки логов Nginx: {e}")
+
+    def subscribe(self, log_name: str, callback: Callable[[Dict], None]):
+        """Подписка на разобранные строки лога ('access' или 'error')"""
+        self.subscribers[log_name].append(callback)
+
+    def poll(self) -> int:
+        """Дочитывание всех логов, возвращает число новых строк"""
+        with self._lock:
+            self.stats["polls"] += 1
+            total = 0
+
+            for name, follower in self.followers.items():
+                parse = self.parse_access if name == "access" else self.parse_error
+                try:
+                    for line in follower.poll():
+                        total += 1
+                        record = parse(line)
+                        if record is None:
+                            continue
+                        if name == "access":
+                            self._count(record)
+                        for callback in self.subscribers[name]:
+                            try:
+                                callback(record)
+                            except Exception as e:
+                                logging.error(f"❌ Ошибка подписчика лога {name}: {e}")
+                    if name in self.denied:
+                        self.denied.discard(name)
+                        logging.info(f"✅ Чтение {follower.path} восстановлено")
+                except PermissionError:
+                    self.stats["errors"] += 1
+                    if name not in self.denied:
+                        self.denied.add(name)
+                        logging.error(f"❌ Нет прав на чтение {follower.path} (нужна группа adm)")
+
+            if total:
+                self.stats["lines"] += total
+                self._expire_days()
+                self.save_checkpoint()
+            return total
+
+    def readable(self, log_name: str) -> bool:
+        """Читается ли лог: без прав вызывающие используют прежний способ чтения"""
+        return log_name not in self.denied
+
+    def parse_access(self, line: str) -> Optional[Dict]:
+        """Разбор строки access.log в формате combined"""
+        match = ACCESS_PATTERN.match(line)
+        if not match:
+            return None
+        record = match.groupdict()
+        try:
+            record["day"] = datetime.strptime(record["time"][:11], '%d/%b/%Y').strftime('%Y-%m-%d')
+        except ValueError:
+            return None
+        record["status"] = int(record["status"])
+        record["bytes"] = int(record["bytes"]) if record["bytes"] != '-' else 0
+        return record
+
+    def parse_error(self, line: str) -> Optional[Dict]:
+        """Разбор строки error.log"""
+        match = ERROR_PATTERN.match(line)
+        if not match:
+            return None
+        record = match.groupdict()
+        record["timestamp"] = datetime.strptime(record["time"], '%Y/%m/%d %H:%M:%S').isoformat()
+        record["line"] = line
+        return record
+
+    def _count(self, record: Dict):
+        """Дневные счетчики запросов"""
+        counters = self.daily.setdefault(record["day"], {"requests": 0, "api_requests": 0, "errors_5xx": 0})
+        counters["requests"] += 1
+        if record["path"].startswith('/api/'):
+            counters["api_requests"] += 1
+        if record["status"] >= 500:
+            counters["errors_5xx"] += 1
+
+    def _expire_days(self):
+        """Удаление счетчиков старше keep_days"""
+        for day in sorted(self.daily)[:-self.keep_days]:
+            del self.daily[day]
+
+    def daily_count(self, counter: str, day: Optional[str] = None) -> int:
+        """Значение дневного счетчика (по умолчанию за сегодня)"""
+        day = day or datetime.now().strftime('%Y-%m-%d')
+        with self._lock:
+            return self.daily.get(day, {}).get(counter, 0)
+
+    def start(self):
+        """Запуск фонового чтения"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='nginx-tailer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка фонового чтения"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval_seconds)
+
+    def _loop(self):
+        """Периодическое дочитывание логов"""
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logging.error(f"❌ Ошибка чтения логов Nginx: {e}")
+            self._stop_event.wait(self.interval_seconds)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+📝 Prompt Builder - сборка промпта для YandexGPT в пределах бюджета токенов
+Кластеры ошибок укладываются в промпт от самых важных к менее важным,
+остаток не отбрасывается молча: он сворачивается в сводку (локально или
+через параллельное суммирование частей с ограничением одновременных вызовов)
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from log_classifier import SEVERITY_RANK
+
+T = TypeVar('T')
+
+# Шаблон длиннее (трассировка целиком) обрезается, чтобы один кластер не съел бюджет
+MAX_TEMPLATE_CHARS = 500
+
+
+def estimate_tokens(text: str) -> int:
+    """Оценка числа токенов без токенизатора
+
+    Около 4 байт UTF-8 на токен: для латиницы это ~4 символа, для кириллицы ~2 -
+    с запасом для обоих языков.
+    """
+    return (len(text.encode('utf-8')) + 3) // 4
+
+
+def rank_clusters(clusters: List[Dict]) -> List[Dict]:
+    """Порядок важности: серьезность, число повторов, свежесть"""
+    return sorted(clusters, key=lambda cluster: (
+        SEVERITY_RANK.get(cluster.get('severity'), 0),
+        cluster.get('batch_count', cluster['count']),
+        cluster.get('last_seen') or ''
+    ), reverse=True)
+
+
+def render_cluster(cluster: Dict) -> str:
+    """Строка промпта для кластера: источник, повторы, период, шаблон и примеры значений"""
+    line = f"- {cluster.get('source', 'logs')} ×{cluster.get('batch_count', cluster['count'])}"
+    if cluster.get('first_seen'):
+        line += f" (с {cluster['first_seen']} по {cluster['last_seen']})"
+    line += f": {cluster['template'][:MAX_TEMPLATE_CHARS]}\n"
+    if cluster.get('values'):
+        line += f"  примеры значений: {', '.join(cluster['values'][:5])}\n"
+    return line
+
+
+def summarize_clusters(clusters: List[Dict]) -> List[str]:
+    """Локальная сводка остатка: группы по источнику и категории, без вызова API"""
+    groups = {}
+    for cluster in clusters:
+        key = (cluster.get('source', 'logs'), cluster.get('category') or 'прочее')
+        group = groups.setdefault(key, {"clusters": 0, "lines": 0, "example": cluster['template']})
+        group["clusters"] += 1
+        group["lines"] += cluster.get('batch_count', cluster['count'])
+
+    ordered = sorted(groups.items(), key=lambda item: item[1]["lines"], reverse=True)
+    return [
+        f"- {source}/{category}: {group['clusters']} шаблонов, {group['lines']} строк, например: {group['example'][:120]}\n"
+        for (source, category), group in ordered
+    ]
+
+
+class PromptBuilder:
+    def __init__(self, max_tokens: int = 6000, tail_share: float = 0.25):
+        """Бюджет промпта в токенах и доля бюджета под сводку остатка"""
+        self.max_tokens = max_tokens
+        self.tail_share = tail_share
+
+    def build(self, header: str, clusters: List[Dict], footer: str = "",
+              tail_lines: Optional[List[str]] = None) -> Dict:
+        """Промпт из кластеров в пределах бюджета
+
+        Если все кластеры не помещаются, под остаток оставляется tail_share бюджета:
+        туда идет tail_lines (например, сводки частей от модели) или локальная сводка.
+        Возвращает prompt, включенные кластеры (included), остаток (rest) и оценку токенов.
+        """
+        budget = self.max_tokens - estimate_tokens(header) - estimate_tokens(footer)
+        ranked = rank_clusters(clusters)
+        lines = [render_cluster(cluster) for cluster in ranked]
+        costs = [estimate_tokens(line) for line in lines]
+
+        if sum(costs) <= budget:
+            included, rest, body = ranked, [], ''.join(lines)
+        else:
+            included, rest, body, used = [], [], '', 0
+            main_budget = int(budget * (1 - self.tail_share))
+            for cluster, line, cost in zip(ranked, lines, costs):
+                # Крупный кластер не закрывает дорогу следующим, более коротким
+                if used + cost <= main_budget:
+                    included.append(cluster)
+                    body += line
+                    used += cost
+                else:
+                    rest.append(cluster)
+
+            tail = tail_lines if tail_lines is not None else summarize_clusters(rest)
+            body += f"Остальные {len(rest)} шаблонов ({sum(c.get('batch_count', c['count']) for c in rest)} строк) кратко:\n"
+            skipped = 0
+            for line in tail:
+                cost = estimate_tokens(line)
+                if used + cost <= budget:
+                    body += line
+                    used += cost
+                else:
+                    skipped += 1
+            if skipped:
+                body += f"- и еще {skipped} групп\n"
+
+        prompt = header + body + footer
+        return {"prompt": prompt, "included": included, "rest": rest, "tokens": estimate_tokens(prompt)}
+
+    def chunks(self, clusters: List[Dict], overhead_tokens: int = 0) -> List[List[Dict]]:
+        """Разбиение кластеров на части, каждая со своим промптом в пределах бюджета"""
+        budget = self.max_tokens - overhead_tokens
+        chunks, current, used = [], [], 0
+        for cluster in clusters:
+            cost = estimate_tokens(render_cluster(cluster))
+            if current and used + cost > budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(cluster)
+            used += cost
+        if current:
+            chunks.append(current)
+        return chunks
+
+
+async def map_chunks(chunks: List[List[Dict]], summarize: Callable[[List[Dict]], Awaitable[T]],
+                     max_concurrency: int = 4) -> List[T]:
+    """Асинхронное суммирование частей: не больше max_concurrency вызовов одновременно"""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def limited(chunk: List[Dict]) -> T:
+        async with semaphore:
+            return await summarize(chunk)
+
+    return list(await asyncio.gather(*(limited(chunk) for chunk in chunks)))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+📈 Resource Sampler - фоновый сбор метрик CPU, памяти, нагрузки и диска
+Хранит кольцевой буфер замеров, чтение последнего значения и среднего
+за окно выполняется мгновенно, без блокирующего psutil.cpu_percent(interval=1)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import psutil
+
+
+class ResourceSampler:
+    def __init__(self, interval_seconds: float = 5, history_size: int = 720, disk_path: str = '/'):
+        """Инициализация фонового сборщика"""
+        self.interval_seconds = interval_seconds
+        self.disk_path = disk_path
+        self.samples = deque(maxlen=history_size)
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запуск фонового потока"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        # Первый замер CPU считается относительно этой точки
+        psutil.cpu_percent(interval=0.1)
+        self._record(self._collect())
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='resource-sampler', daemon=True)
+        self._thread.start()
+        logging.info(f"📈 Сборщик ресурсов запущен (интервал {self.interval_seconds}с)")
+
+    def stop(self):
+        """Остановка фонового потока"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval_seconds + 1)
+
+    def _loop(self):
+        """Цикл сбора замеров"""
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self._record(self._collect())
+            except Exception as e:
+                logging.error(f"❌ Ошибка сбора ресурсов: {e}")
+
+    def _collect(self) -> Dict:
+        """Один замер ресурсов"""
+        # cpu_percent(interval=None) считает загрузку с момента предыдущего вызова
+        return {
+            "timestamp": time.time(),
+            "cpu": psutil.cpu_percent(interval=None),
+            "memory": psutil.virtual_memory().percent,
+            "load": os.getloadavg()[0],
+            "disk": psutil.disk_usage(self.disk_path).percent
+        }
+
+    def _record(self, sample: Dict):
+        """Добавление замера в кольцевой буфер"""
+        with self._lock:
+            self.samples.append(sample)
+
+    def latest(self) -> Dict:
+        """Последний замер"""
+        with self._lock:
+            if self.samples:
+                return dict(self.samples[-1])
+
+        sample = self._collect()
+        self._record(sample)
+        return sample
+
+    def window(self, seconds: float) -> List[Dict]:
+        """Замеры за последние N секунд"""
+        since = time.time() - seconds
+        with self._lock:
+            return [sample for sample in self.samples if sample['timestamp'] >= since]
+
+    def average(self, seconds: float = 60) -> Dict:
+        """Средние значения за окно в N секунд"""
+        samples = self.window(seconds)
+        if not samples:
+            return self.latest()
+
+        return {
+            "timestamp": samples[-1]['timestamp'],
+            "cpu": round(sum(s['cpu'] for s in samples) / len(samples), 1),
+            "memory": round(sum(s['memory'] for s in samples) / len(samples), 1),
+            "load": round(sum(s['load'] for s in samples) / len(samples), 2),
+            "disk": samples[-1]['disk'],
+            "samples": len(samples)
+        }
+
+    def get_value(self, metric: str, window_seconds: Optional[float] = None) -> float:
+        """Значение одной метрики: последнее или среднее за окно"""
+        if window_seconds:
+            return self.average(window_seconds)[metric]
+        return self.latest()[metric]
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+🔧 Service State Provider - состояние systemd сервисов одним запросом
+Все отслеживаемые юниты опрашиваются одним вызовом `systemctl show`,
+результат кэшируется на время тика и используется всеми модулями агента
+"""
+
+import logging
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Свойства юнита, которые запрашиваются у systemd
+UNIT_PROPERTIES = [
+    "Id",
+    "LoadState",
+    "ActiveState",
+    "SubState",
+    "ActiveEnterTimestamp",
+    "ActiveEnterTimestampMonotonic",
+    "MainPID",
+    "MemoryCurrent"
+]
+
+# Значение MemoryCurrent, когда учет памяти недоступен (UINT64_MAX)
+MEMORY_NOT_SET = 2 ** 64 - 1
+
+
+class ServiceStateProvider:
+    def __init__(self, units: List[str], cache_ttl: float = 10, timeout: float = 10):
+        """Инициализация провайдера состояния сервисов"""
+        self.units = list(dict.fromkeys(units))
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+
+        self._states = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+        self.queries = 0
+
+    def watch(self, unit: str):
+        """Добавление юнита в список отслеживаемых"""
+        with self._lock:
+            if unit not in self.units:
+                self.units.append(unit)
+                self._fetched_at = 0.0
+
+    def invalidate(self):
+        """Сброс кэша (например, после перезапуска сервиса)"""
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def get_states(self, force: bool = False) -> Dict[str, Dict]:
+        """Состояние всех отслеживаемых юнитов"""
+        # Блокировка удерживается на время запроса: параллельные вызовы получат общий ответ
+        with self._lock:
+            if force or time.monotonic() - self._fetched_at > self.cache_ttl:
+                self._states = self._query(self.units)
+                self._fetched_at = time.monotonic()
+            return dict(self._states)
+
+    def get_unit(self, unit: str, force: bool = False) -> Dict:
+        """Полное состояние одного юнита"""
+        if unit not in self.units:
+            self.watch(unit)
+        return self.get_states(force).get(unit, self._unknown_state(unit))
+
+    def get_state(self, unit: str, force: bool = False) -> str:
+        """ActiveState юнита (аналог `systemctl is-active`)"""
+        return self.get_unit(unit, force)['active_state']
+
+    def is_active(self, unit: str, force: bool = False) -> bool:
+        """Проверка что юнит активен"""
+        return self.get_state(unit, force) == "active"
+
+    def _query(self, units: List[str]) -> Dict[str, Dict]:
+        """Один вызов `systemctl show` для всех юнитов"""
+        if not units:
+            return {}
+
+        self.queries += 1
+        try:
+            result = subprocess.run(
+                ["systemctl", "show", "--no-pager", f"--property={','.join(UNIT_PROPERTIES)}", *units],
+                capture_output=True,
+                text=True,
+                timeout=self.timeout
+            )
+        except Exception as e:
+            logging.error(f"❌ Ошибка запроса состояния сервисов: {e}")
+            return {unit: self._unknown_state(unit) for unit in units}
+
+        states = {}
+        for block in result.stdout.strip().split('\n\n'):
+            properties = {}
+            for line in block.split('\n'):
+                if '=' in line:
+                    key, value = line.split('=', 1)
+                    properties[key] = value
+
+            if properties.get('Id'):
+                state = self._parse_properties(properties)
+                states[state['unit']] = state
+
+        # systemd возвращает Id с суффиксом .service - сопоставляем с запрошенными именами
+        mapped = {}
+        for unit in units:
+            full_name = unit if '.' in unit else f"{unit}.service"
+            mapped[unit] = states.get(full_name, states.get(unit, self._unknown_state(unit)))
+        return mapped
+
+    def _parse_properties(self, properties: Dict[str, str]) -> Dict:
+        """Преобразование свойств systemd в состояние юнита"""
+        main_pid = self._to_int(properties.get('MainPID'))
+        memory = self._to_int(properties.get('MemoryCurrent'))
+        entered_monotonic = self._to_int(properties.get('ActiveEnterTimestampMonotonic'))
+
+        active_state = properties.get('ActiveState', 'unknown')
+        if properties.get('LoadState') == 'not-found':
+            active_state = 'inactive'
+
+        uptime_seconds = None
+        if active_state == 'active' and entered_monotonic:
+            # Монотонные часы systemd совпадают с CLOCK_MONOTONIC
+            uptime_seconds = max(0.0, time.monotonic() - entered_monotonic / 1_000_000)
+
+        return {
+            "unit": properties['Id'],
+            "load_state": properties.get('LoadState', 'unknown'),
+            "active_state": active_state,
+            "sub_state": properties.get('SubState', 'unknown'),
+            "active_enter_timestamp": properties.get('ActiveEnterTimestamp') or None,
+            "uptime_seconds": uptime_seconds,
+            "main_pid": main_pid or None,
+            "memory_bytes": memory if memory is not None and memory != MEMORY_NOT_SET else None
+        }
+
+    def _unknown_state(self, unit: str) -> Dict:
+        """Состояние юнита, когда systemd не ответил"""
+        return {
+            "unit": unit,
+            "load_state": "unknown",
+            "active_state": "unknown",
+            "sub_state": "unknown",
+            "active_enter_timestamp": None,
+            "uptime_seconds": None,
+            "main_pid": None,
+            "memory_bytes": None
+        }
+
+    def _to_int(self, value: Optional[str]) -> Optional[int]:
+        """Безопасное преобразование числового свойства"""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
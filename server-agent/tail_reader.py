@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+🔚 Tail Reader - чтение последних строк больших логов без tail и grep
+Файл отображается в память и просматривается с конца; чтение прекращается,
+как только найдено нужное число подходящих строк. Память и время не зависят
+от размера файла
+"""
+
+import mmap
+import os
+import re
+from typing import Callable, List, Optional, Pattern, Union
+
+# Сколько байт с конца файла просматривать максимум, если подходящих строк мало
+DEFAULT_MAX_SCAN_BYTES = 32 * 1024 * 1024
+
+# Размер блока, которым файл просматривается с конца
+BLOCK_SIZE = 64 * 1024
+
+Predicate = Union[str, Pattern, Callable[[str], bool], None]
+
+
+def compile_pattern(predicate: Predicate) -> Optional[Pattern]:
+    """Скомпилированное регулярное выражение, если predicate - не функция"""
+    if predicate is None or callable(predicate):
+        return None
+    return re.compile(predicate) if isinstance(predicate, str) else predicate
+
+
+def tail_lines(path: str, limit: int = 10, predicate: Predicate = None,
+               max_scan_bytes: Optional[int] = DEFAULT_MAX_SCAN_BYTES) -> List[str]:
+    """Последние limit строк файла, подходящих под predicate (в порядке следования в файле)
+
+    predicate - регулярное выражение (строка или скомпилированное) или функция.
+    Поиск идет с конца файла блоками и останавливается, когда найдено limit
+    строк или просмотрено max_scan_bytes байт.
+    """
+    pattern = compile_pattern(predicate)
+    if pattern is not None:
+        matches = lambda line: pattern.search(line) is not None
+    else:
+        matches = predicate
+    lines = []
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or limit <= 0:
+            return []
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            floor = max(0, size - max_scan_bytes) if max_scan_bytes else 0
+            end = size
+            carry = b''
+
+            # Завершающий перевод строки не образует пустую строку
+            if mapped[end - 1:end] == b'\n':
+                end -= 1
+
+            while end > floor and len(lines) < limit:
+                start = max(floor, end - BLOCK_SIZE)
+                block = mapped[start:end] + carry
+
+                if start > floor:
+                    # Первая строка блока может начинаться раньше - ее часть переносится в следующий блок
+                    cut = block.find(b'\n')
+                    if cut == -1:
+                        carry = block
+                        end = start
+                        continue
+                    carry, block = block[:cut], block[cut + 1:]
+                elif floor > 0 and mapped[floor - 1:floor] != b'\n':
+                    # Строка начинается раньше границы просмотра - отбрасываем неполную
+                    cut = block.find(b'\n')
+                    if cut == -1:
+                        break
+                    block = block[cut + 1:]
+
+                end = start
+                text = block.decode('utf-8', errors='replace')
+
+                # Блок без единого совпадения пропускается целиком
+                if pattern is not None and not pattern.search(text):
+                    continue
+
+                for line in reversed(text.split('\n')):
+                    line = line.rstrip('\r')
+                    if matches is None or matches(line):
+                        lines.append(line)
+                        if len(lines) >= limit:
+                            break
+
+    lines.reverse()
+    return lines
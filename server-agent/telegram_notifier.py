@@ -10,15 +10,46 @@ import requests
 import subprocess
 import os
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import time
 
+from http_client import HttpClient
+from service_state import ServiceStateProvider
+from tail_reader import tail_lines
+from telegram_outbox import OutboxLocked, TelegramOutbox
+from telegram_queue import TelegramSendQueue
+
+# Сервисы, статус которых показывает команда /services
+WATCHED_SERVICES = ["gita-api", "nginx", "yandex-server-agent"]
+
 class TelegramNotifier:
     def __init__(self, config_path="agent-config.json"):
         """Инициализация Telegram уведомлений"""
         self.config = self.load_config(config_path)
         self.setup_logging()
         
+        # Агент подменяет провайдер на общий, чтобы кэш тика был один на все модули
+        self.service_state = ServiceStateProvider(WATCHED_SERVICES)
+        self.http = HttpClient.from_config(self.config)
+        
+        # Недоставленные сообщения хранятся на диске рядом с логами и переживают перезапуск
+        outbox_config = self.config.get('telegram', {}).get('outbox', {})
+        self.outbox = None
+        if outbox_config.get('enabled', True):
+            log_file = self.config.get('logging', {}).get('log_file', '/home/yc-user/gita-1972/logs/server-agent.log')
+            try:
+                self.outbox = TelegramOutbox(
+                    outbox_config.get('file', os.path.join(os.path.dirname(log_file), 'telegram-outbox.jsonl')),
+                    fsync_interval=outbox_config.get('fsync_interval_seconds', 1.0),
+                    max_age_seconds=outbox_config.get('max_age_seconds', 86400)
+                )
+            except OutboxLocked as e:
+                # Журналом владеет запущенный агент (ручной тест): очередь только в памяти
+                logging.warning(f"⚠️ {e} - сообщения не сохраняются на диск")
+        
+        # Отправка - фоновым потоком с лимитом telegram.rate_limit, вызывающие не ждут сети
+        self.queue = TelegramSendQueue.from_config(self.deliver, self.config, self.outbox)
+        
     def load_config(self, config_path):
         """Загрузка конфигурации"""
         try:
@@ -44,7 +75,15 @@ class TelegramNotifier:
                     "interactive_commands": True,
                     "rate_limit": {
                         "max_messages_per_minute": 10,
-                        "critical_override": True
+                        "critical_override": True,
+                        "coalesce_window_seconds": 60,
+                        "max_queue": 1000
+                    },
+                    "outbox": {
+                        "enabled": True,
+                        "fsync_interval_seconds": 1.0,
+                        "max_age_seconds": 86400,
+                        "retry_backoff_max_seconds": 300
                     }
                 }
                 self.save_config(config, config_path)
@@ -77,44 +116,58 @@ class TelegramNotifier:
             ]
         )
     
-    def send_message(self, text: str, chat_type: str = "admin", parse_mode: str = "Markdown") -> bool:
-        """Отправка сообщения в Telegram"""
+    def send_message(self, text: str, chat_type: str = "admin", parse_mode: str = "Markdown",
+                     critical: bool = False, coalesce_key: Optional[str] = None, summary: Optional[str] = None) -> bool:
+        """Постановка сообщения в очередь отправки Telegram (без ожидания сети)"""
         if not self.config.get('telegram', {}).get('enabled', False):
             self.log_info("📱 Telegram уведомления отключены")
             return False
             
-        try:
-            bot_token = self.config['telegram']['bot_token']
-            chat_id = self.config['telegram']['chat_ids'].get(chat_type)
-            
-            if not bot_token or bot_token == "YOUR_BOT_TOKEN_HERE":
-                self.log_error("❌ Не настроен токен Telegram бота")
-                return False
-                
-            if not chat_id:
-                self.log_error(f"❌ Не настроен chat_id для типа: {chat_type}")
-                return False
-            
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            payload = {
-                "chat_id": chat_id,
-                "text": text,
-                "parse_mode": parse_mode,
-                "disable_web_page_preview": True
-            }
-            
-            response = requests.post(url, json=payload, timeout=10)
+        bot_token = self.config['telegram'].get('bot_token')
+        chat_id = self.config['telegram'].get('chat_ids', {}).get(chat_type)
+        
+        if not bot_token or bot_token == "YOUR_BOT_TOKEN_HERE":
+            self.log_error("❌ Не настроен токен Telegram бота")
+            return False
             
-            if response.status_code == 200:
-                self.log_info(f"✅ Сообщение отправлено в {chat_type}")
-                return True
-            else:
-                self.log_error(f"❌ Ошибка отправки в Telegram: {response.status_code}")
-                return False
-                
-        except Exception as e:
-            self.log_error(f"❌ Ошибка отправки в Telegram: {e}")
+        if not chat_id:
+            self.log_error(f"❌ Не настроен chat_id для типа: {chat_type}")
             return False
+        
+        return self.queue.enqueue(chat_id, text, parse_mode, critical=critical,
+                                  coalesce_key=coalesce_key, summary=summary)
+    
+    def deliver(self, chat_id: str, text: str, parse_mode: str) -> Tuple[bool, Optional[float]]:
+        """Отправка одного сообщения (поток очереди): успех и retry_after (см. TelegramSendQueue)"""
+        url = f"https://api.telegram.org/bot{self.config['telegram']['bot_token']}/sendMessage"
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "disable_web_page_preview": True
+        }
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        
+        response = self.http.post(url, json=payload, timeout=10)
+        
+        if response.status_code == 200:
+            self.log_info(f"✅ Сообщение отправлено в {chat_id}")
+            return True, None
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json().get('parameters', {}).get('retry_after', 5))
+            except ValueError:
+                retry_after = 5.0
+            self.log_error(f"⏳ Telegram ограничил частоту для {chat_id}, пауза {retry_after:g}с")
+            return False, retry_after
+        
+        self.log_error(f"❌ Ошибка отправки в Telegram: {response.status_code}")
+        # Ошибка сервера Telegram - временная, сообщение останется в очереди
+        return False, (0.0 if response.status_code >= 500 else None)
+    
+    def stop(self, timeout: float = 10):
+        """Остановка очереди: отправка накопленного в пределах timeout"""
+        self.queue.stop(timeout)
     
     def send_critical_alert(self, alert_type: str, message: str, details: Dict = None):
         """Отправка критического алерта"""
@@ -147,7 +200,9 @@ class TelegramNotifier:
         
         alert_text += "\n🔧 *Действия:* Проверьте сервер немедленно!"
         
-        return self.send_message(alert_text, "alerts")
+        # Повторы того же типа в пределах окна уходят одной сводкой
+        return self.send_message(alert_text, "alerts", critical=True,
+                                 coalesce_key=f"alert:{alert_type}", summary=message)
     
     def send_daily_report(self, system_stats: Dict, service_status: Dict, recent_issues: List):
         """Отправка ежедневного отчета"""
@@ -202,123 +257,109 @@ class TelegramNotifier:
         
         return self.send_message(notification_text, "admin")
     
-    def check_for_commands(self) -> bool:
-        """Проверка и обработка входящих команд от Telegram"""
-        print("🔍 DEBUG: check_for_commands() вызван")
-        
-        if not self.config.get('telegram', {}).get('enabled', False):
-            print("🔍 DEBUG: Telegram отключен в конфиге")
+    def commands_enabled(self) -> bool:
+        """Включены ли интерактивные команды и настроен ли бот"""
+        telegram_config = self.config.get('telegram', {})
+        if not telegram_config.get('enabled', False):
             return False
-            
-        if not self.config.get('telegram', {}).get('interactive_commands', False):
-            print("🔍 DEBUG: Интерактивные команды отключены в конфиге")
+        if not telegram_config.get('interactive_commands', False):
             return False
+        bot_token = telegram_config.get('bot_token')
+        return bool(bot_token) and bot_token != "YOUR_BOT_TOKEN_HERE"
+    
+    def get_updates(self, offset: int, timeout: int = 1, limit: int = 10) -> Optional[List[Dict]]:
+        """Получение обновлений через getUpdates (long polling при timeout > 0)"""
+        bot_token = self.config.get('telegram', {}).get('bot_token')
+        url = f"https://api.telegram.org/bot{bot_token}/getUpdates"
+        params = {
+            'offset': offset,
+            'timeout': timeout,
+            'limit': limit
+        }
+        
+        # HTTP таймаут должен быть больше времени ожидания long polling
+        response = self.http.get(url, params=params, timeout=timeout + 10)
+        
+        if response.status_code != 200:
+            self.log_error(f"❌ getUpdates вернул HTTP {response.status_code}")
+            return None
             
-        try:
-            bot_token = self.config.get('telegram', {}).get('bot_token')
-            if not bot_token or bot_token == "YOUR_BOT_TOKEN_HERE":
-                print("🔍 DEBUG: Нет токена бота")
-                return False
+        data = response.json()
+        if not data.get('ok', False):
+            self.log_error(f"❌ getUpdates вернул ошибку: {data}")
+            return None
+            
+        return data.get('result', [])
+    
+    def handle_update(self, update: Dict) -> bool:
+        """Обработка одного обновления: проверка отправителя и выполнение команды"""
+        if 'message' not in update:
+            return False
             
-            print(f"🔍 DEBUG: Токен найден: {bot_token[:10]}...")
+        message = update['message']
+        chat_id = str(message['chat']['id'])
+        
+        # Проверяем что сообщение от разрешенного пользователя
+        allowed_chat_ids = [
+            str(self.config.get('telegram', {}).get('chat_id', '')),
+            str(self.config.get('telegram', {}).get('chat_ids', {}).get('admin', ''))
+        ]
+        
+        if chat_id not in allowed_chat_ids:
+            return False
             
-            # Получаем обновления от Telegram API
-            url = f"https://api.telegram.org/bot{bot_token}/getUpdates"
-            current_offset = getattr(self, 'last_update_id', 0) + 1
-            params = {
-                'offset': current_offset,
-                'timeout': 1,  # Короткий таймаут для неблокирующего опроса
-                'limit': 10
-            }
+        if 'text' not in message:
+            return False
             
-            print(f"🔍 DEBUG: Запрос getUpdates с offset={current_offset}")
-            response = requests.get(url, params=params, timeout=5)
+        command_text = message['text'].strip()
+        
+        # Игнорируем старые сообщения (более 5 минут)
+        message_date = message.get('date', 0)
+        current_time = int(time.time())
+        if current_time - message_date > 300:  # 5 минут
+            return False
+        
+        if not command_text.startswith('/'):
+            return False
             
-            if response.status_code != 200:
-                print(f"🔍 DEBUG: Ошибка HTTP {response.status_code}")
-                return False
-                
-            data = response.json()
-            print(f"🔍 DEBUG: Ответ API: ok={data.get('ok', False)}")
+        self.log_info(f"📱 Получена команда: {command_text} от {chat_id}")
+        response_text = self.process_command(command_text)
+        
+        # Отправляем ответ
+        self.send_message_to_chat(response_text, chat_id)
+        return True
+    
+    def check_for_commands(self) -> bool:
+        """Проверка и обработка входящих команд от Telegram (однократный опрос)"""
+        if not self.commands_enabled():
+            return False
             
-            if not data.get('ok', False):
-                print(f"🔍 DEBUG: API вернул ошибку: {data}")
-                return False
-                
-            updates = data.get('result', [])
-            print(f"🔍 DEBUG: Получено обновлений: {len(updates)}")
+        try:
+            current_offset = getattr(self, 'last_update_id', 0) + 1
+            updates = self.get_updates(current_offset, timeout=1)
             
             if not updates:
-                print("🔍 DEBUG: Нет новых обновлений")
                 return False
                 
             # Обрабатываем каждое обновление
             for update in updates:
                 self.last_update_id = update['update_id']
-                
-                if 'message' not in update:
-                    continue
-                    
-                message = update['message']
-                chat_id = str(message['chat']['id'])
-                
-                # Проверяем что сообщение от разрешенного пользователя
-                allowed_chat_ids = [
-                    str(self.config.get('telegram', {}).get('chat_id', '')),
-                    str(self.config.get('telegram', {}).get('chat_ids', {}).get('admin', ''))
-                ]
-                
-                if chat_id not in allowed_chat_ids:
-                    continue
-                    
-                if 'text' not in message:
-                    continue
+                self.handle_update(update)
                     
-                command_text = message['text'].strip()
-                
-                # Игнорируем старые сообщения (более 5 минут)
-                message_date = message.get('date', 0)
-                current_time = int(time.time())
-                if current_time - message_date > 300:  # 5 минут
-                    continue
-                
-                # Обрабатываем команду
-                if command_text.startswith('/'):
-                    print(f"📱 Получена команда: {command_text} от {chat_id}")  # Используем print вместо logger
-                    response_text = self.process_command(command_text)
-                    
-                    # Отправляем ответ
-                    self.send_message_to_chat(response_text, chat_id)
-                    
-            return len(updates) > 0
+            return True
             
         except requests.exceptions.RequestException as e:
-            print(f"DEBUG: Ошибка при получении обновлений Telegram: {e}")
+            self.log_error(f"❌ Ошибка при получении обновлений Telegram: {e}")
             return False
         except Exception as e:
-            print(f"ERROR: Ошибка при обработке команд Telegram: {e}")
+            self.log_error(f"❌ Ошибка при обработке команд Telegram: {e}")
             return False
     
     def send_message_to_chat(self, text: str, chat_id: str) -> bool:
-        """Отправка сообщения в конкретный чат"""
-        try:
-            bot_token = self.config.get('telegram', {}).get('bot_token')
-            if not bot_token:
-                return False
-                
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            payload = {
-                'chat_id': chat_id,
-                'text': text,
-                'parse_mode': 'Markdown'
-            }
-            
-            response = requests.post(url, json=payload, timeout=10)
-            return response.status_code == 200
-            
-        except Exception as e:
-            print(f"ERROR: Ошибка отправки сообщения в чат {chat_id}: {e}")
+        """Постановка ответа в конкретный чат в очередь отправки"""
+        if not self.config.get('telegram', {}).get('bot_token'):
             return False
+        return self.queue.enqueue(chat_id, text, 'Markdown')
 
     def process_command(self, command: str) -> str:
         """Обработка интерактивных команд"""
@@ -378,13 +419,10 @@ class TelegramNotifier:
     def get_services_status(self) -> str:
         """Получение статуса сервисов"""
         try:
-            services = ["gita-api", "nginx", "yandex-server-agent"]
             status_text = "🔧 *СТАТУС СЕРВИСОВ*\n\n"
             
-            for service in services:
-                cmd = f"systemctl is-active {service}"
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                status = result.stdout.strip()
+            for service in WATCHED_SERVICES:
+                status = self.service_state.get_state(service)
                 
                 if status == "active":
                     emoji = "✅"
@@ -403,12 +441,28 @@ class TelegramNotifier:
     def get_recent_logs(self) -> str:
         """Получение последних логов"""
         try:
-            cmd = "journalctl -u gita-api -n 5 --no-pager | tail -5"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+            sections = []
             
-            if result.returncode == 0 and result.stdout:
-                logs = result.stdout.strip()
-                return f"📋 *ПОСЛЕДНИЕ ЛОГИ:*\n\n```\n{logs}\n```"
+            # journalctl сам читает журнал с конца, отдельный tail не нужен
+            result = subprocess.run(
+                ["journalctl", "-u", "gita-api", "-n", "5", "--no-pager"],
+                capture_output=True, text=True
+            )
+            if result.returncode == 0 and result.stdout.strip():
+                sections.append(f"*gita-api:*\n```\n{result.stdout.strip()}\n```")
+                
+            # Последние предупреждения и ошибки агента - с конца файла, без чтения всего лога
+            agent_log = self.config.get('logging', {}).get('log_file', '/home/yc-user/gita-1972/logs/server-agent.log')
+            try:
+                agent_lines = tail_lines(agent_log, 5, " - (WARNING|ERROR|CRITICAL) - ")
+            except OSError:
+                agent_lines = []
+            if agent_lines:
+                logs = '\n'.join(agent_lines)
+                sections.append(f"*server-agent:*\n```\n{logs}\n```")
+            
+            if sections:
+                return "📋 *ПОСЛЕДНИЕ ЛОГИ:*\n\n" + "\n\n".join(sections)
             else:
                 return "📋 Логи недоступны"
                 
@@ -424,9 +478,7 @@ class TelegramNotifier:
             if result.returncode == 0:
                 # Проверяем статус после перезапуска
                 time.sleep(2)
-                status_cmd = "systemctl is-active gita-api"
-                status_result = subprocess.run(status_cmd, shell=True, capture_output=True, text=True)
-                status = status_result.stdout.strip()
+                status = self.service_state.get_state("gita-api", force=True)
                 
                 if status == "active":
                     return "✅ API сервис успешно перезапущен"
@@ -495,6 +547,8 @@ def main():
 """
     
     success = notifier.send_message(test_message, "admin")
+    notifier.stop()
+    success = success and notifier.queue.get_stats()["sent"] > 0
     print(f"📱 Тест отправки: {'✅ Успешно' if success else '❌ Ошибка'}")
 
 if __name__ == "__main__":
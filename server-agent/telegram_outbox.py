@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+📮 Telegram Outbox - дисковая очередь недоставленных сообщений Telegram
+Журнал только дописывается: строка add при постановке, строка done после
+доставки. fsync выполняется пачкой не чаще fsync_interval фоновым потоком,
+поэтому постановка в очередь - одна запись в файл. После перезапуска
+недоставленные сообщения читаются из журнала в исходном порядке. Журнал
+пишет один процесс: второй (например, ручной тест) получает OutboxLocked
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+
+class OutboxLocked(RuntimeError):
+    """Журналом уже владеет другой процесс"""
+
+
+class TelegramOutbox:
+    def __init__(self, path: Optional[str], fsync_interval: float = 1.0, max_age_seconds: float = 86400,
+                 compact_threshold: int = 500):
+        """Инициализация журнала, недоставленные сообщения загружаются с диска
+
+        path None - очередь только в памяти. Если журнал открыт другим процессом,
+        выбрасывается OutboxLocked: два писателя пересылали бы чужие сообщения,
+        а сжатие одного оставляло бы второго писать в удаленный файл.
+        """
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.max_age_seconds = max_age_seconds
+        self.compact_threshold = compact_threshold
+
+        # id -> запись сообщения, в порядке постановки
+        self.records = OrderedDict()
+        self.next_id = 1
+        self.done_lines = 0
+
+        self.stats = {
+            "added": 0,
+            "done": 0,
+            "expired": 0,
+            "fsyncs": 0
+        }
+
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._file = None
+        # Строки, записанные во время сжатия журнала (None - сжатие не идет)
+        self._tail = None
+        self._stop_event = threading.Event()
+        self._flusher = None
+
+        self._lock_file = None
+        if self.path is None:
+            return
+        self._acquire()
+        self.load()
+        self.compact()
+
+    def _acquire(self):
+        """Монопольная блокировка журнала (flock на файле рядом: сам журнал подменяется при сжатии)"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock_file = open(f"{self.path}.lock", 'a')
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise OutboxLocked(f"очередь Telegram {self.path} используется другим процессом")
+
+    def load(self):
+        """Чтение журнала; оборванная при сбое последняя строка пропускается"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('op') == 'add':
+                        self.records[entry['id']] = entry
+                        self.next_id = max(self.next_id, entry['id'] + 1)
+                    elif entry.get('op') == 'done':
+                        for message_id in entry.get('ids', []):
+                            self.records.pop(message_id, None)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logging.error(f"❌ Ошибка чтения очереди Telegram {self.path}: {e}")
+            return
+
+        # Слишком старые алерты после долгого простоя уже не нужны
+        cutoff = time.time() - self.max_age_seconds
+        for message_id in [message_id for message_id, record in self.records.items() if record.get('created', 0) < cutoff]:
+            del self.records[message_id]
+            self.stats["expired"] += 1
+
+        if self.records:
+            logging.info(f"📮 В очереди Telegram {len(self.records)} недоставленных сообщений")
+
+    def compact(self):
+        """Атомарная перезапись журнала только с недоставленными сообщениями
+
+        Под блокировкой - только снимок записей и подмена файла: запись снимка и
+        fsync идут без нее, строки, записанные за это время, дописываются в новый
+        файл перед подменой, поэтому add() и done() не ждут диска.
+        """
+        with self._lock:
+            if self._tail is not None or self.path is None:
+                return
+            snapshot = list(self.records.values())
+            self._tail = []
+            self.done_lines = 0
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in snapshot:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._lock:
+                with open(tmp_path, 'a', encoding='utf-8') as f:
+                    f.writelines(self._tail)
+                os.replace(tmp_path, self.path)
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(self.path, 'a', encoding='utf-8')
+                self._dirty = bool(self._tail)
+        except Exception as e:
+            logging.error(f"❌ Ошибка сжатия очереди Telegram {self.path}: {e}")
+        finally:
+            with self._lock:
+                self._tail = None
+
+        # Дописанные во время сжатия строки - на диск сразу, не дожидаясь фонового fsync
+        self.sync()
+
+    def _write(self, entry: Dict):
+        """Запись строки журнала (вызывается под блокировкой); fsync - пачкой в фоне"""
+        if self.path is None:
+            return
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        self._file.write(line)
+        self._file.flush()
+        self._dirty = True
+        if self._tail is not None:
+            self._tail.append(line)
+
+        if self._flusher is None or not self._flusher.is_alive():
+            self._stop_event.clear()
+            self._flusher = threading.Thread(target=self._flush_loop, name='telegram-outbox-fsync', daemon=True)
+            self._flusher.start()
+
+    def add(self, message: Dict) -> int:
+        """Сохранение сообщения до отправки, возвращает его id"""
+        with self._lock:
+            message_id = self.next_id
+            self.next_id += 1
+            record = {"op": "add", "id": message_id, "created": time.time(), **message}
+            self.records[message_id] = record
+            self.stats["added"] += 1
+            try:
+                self._write(record)
+            except Exception as e:
+                logging.error(f"❌ Ошибка записи очереди Telegram: {e}")
+            return message_id
+
+    def done(self, ids: Iterable[int]):
+        """Отметка о доставке (или окончательном отказе) сообщений"""
+        with self._lock:
+            ids = [message_id for message_id in ids if message_id in self.records]
+            if not ids:
+                return
+            for message_id in ids:
+                self.records.pop(message_id, None)
+            self.stats["done"] += len(ids)
+            self.done_lines += 1
+            try:
+                self._write({"op": "done", "ids": ids})
+            except Exception as e:
+                logging.error(f"❌ Ошибка записи очереди Telegram: {e}")
+            compact = self.done_lines >= self.compact_threshold
+
+        if compact:
+            self.compact()
+
+    def pending(self) -> List[Dict]:
+        """Недоставленные сообщения в порядке постановки"""
+        with self._lock:
+            return [dict(record) for record in self.records.values()]
+
+    def sync(self):
+        """fsync накопленных записей; под блокировкой берется только копия дескриптора"""
+        with self._lock:
+            if not self._dirty or self._file is None:
+                return
+            try:
+                # Копия дескриптора переживает закрытие файла при сжатии журнала
+                fd = os.dup(self._file.fileno())
+            except Exception as e:
+                logging.error(f"❌ Ошибка fsync очереди Telegram: {e}")
+                return
+            self._dirty = False
+
+        try:
+            os.fsync(fd)
+            with self._lock:
+                self.stats["fsyncs"] += 1
+        except Exception as e:
+            logging.error(f"❌ Ошибка fsync очереди Telegram: {e}")
+            with self._lock:
+                self._dirty = True
+        finally:
+            os.close(fd)
+
+    def _flush_loop(self):
+        """Фоновый fsync не чаще fsync_interval"""
+        while not self._stop_event.wait(self.fsync_interval):
+            self.sync()
+
+    def close(self):
+        """Остановка фонового fsync и закрытие журнала"""
+        self._stop_event.set()
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._lock_file is not None:
+                # Закрытие снимает flock
+                self._lock_file.close()
+                self._lock_file = None
+
+    def get_stats(self) -> Dict:
+        """Счетчики и число недоставленных сообщений"""
+        with self._lock:
+            return {**self.stats, "pending": len(self.records)}
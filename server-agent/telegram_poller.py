@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+📡 Telegram Poller - выделенный поток long polling для команд Telegram
+Команды обрабатываются сразу после поступления, смещение getUpdates
+сохраняется на диск и переживает перезапуск агента
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+class TelegramPoller:
+    def __init__(self, notifier, offset_file: str, poll_timeout: int = 50, workers: int = 2):
+        """Инициализация long polling"""
+        self.notifier = notifier
+        self.offset_file = offset_file
+        self.poll_timeout = poll_timeout
+
+        # Команды выполняются в пуле, чтобы медленный /restart_api не блокировал опрос
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='telegram-command')
+
+        self.last_update_id = self.load_offset()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            "polls": 0,
+            "updates": 0,
+            "commands": 0,
+            "errors": 0
+        }
+
+    def load_offset(self) -> int:
+        """Загрузка сохраненного update_id"""
+        try:
+            with open(self.offset_file, 'r', encoding='utf-8') as f:
+                return int(json.load(f).get('last_update_id', 0))
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logging.error(f"❌ Ошибка чтения смещения Telegram: {e}")
+            return 0
+
+    def save_offset(self):
+        """Атомарное сохранение update_id"""
+        try:
+            os.makedirs(os.path.dirname(self.offset_file) or '.', exist_ok=True)
+            tmp_path = f"{self.offset_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"last_update_id": self.last_update_id}, f)
+            os.replace(tmp_path, self.offset_file)
+        except Exception as e:
+            logging.error(f"❌ Ошибка сохранения смещения Telegram: {e}")
+
+    def start(self) -> bool:
+        """Запуск потока опроса"""
+        if not self.notifier.commands_enabled():
+            logging.info("📱 Интерактивные команды Telegram отключены - опрос не запущен")
+            return False
+
+        if self._thread and self._thread.is_alive():
+            return True
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='telegram-poller', daemon=True)
+        self._thread.start()
+        logging.info(f"📡 Telegram long polling запущен (timeout={self.poll_timeout}с, offset={self.last_update_id})")
+        return True
+
+    def stop(self):
+        """Остановка опроса (текущий запрос long polling завершится по таймауту)"""
+        self._stop_event.set()
+        self.executor.shutdown(wait=False)
+
+    def _loop(self):
+        """Цикл long polling"""
+        backoff = 1
+
+        while not self._stop_event.is_set():
+            try:
+                polled = self._poll_once()
+            except requests.exceptions.RequestException as e:
+                polled = False
+                logging.error(f"❌ Ошибка long polling Telegram: {e}")
+            except Exception as e:
+                # Неожиданный ответ API или сбой обработки не должны останавливать поток
+                polled = False
+                logging.exception(f"❌ Ошибка обработки ответа Telegram: {e}")
+
+            if polled:
+                backoff = 1
+                continue
+
+            # Ошибка сети или API - повтор с растущей паузой
+            self.stats["errors"] += 1
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, 60)
+
+    def _poll_once(self) -> bool:
+        """Один запрос long polling и передача обновлений обработчикам; False - ответа нет"""
+        updates = self.notifier.get_updates(self.last_update_id + 1, timeout=self.poll_timeout)
+        self.stats["polls"] += 1
+        if updates is None:
+            return False
+        if not updates:
+            return True
+
+        # Обновление без update_id не сдвигает смещение и не обрабатывается
+        updates = [update for update in updates if isinstance(update, dict) and isinstance(update.get('update_id'), int)]
+        if not updates:
+            return True
+
+        self.stats["updates"] += len(updates)
+        self.last_update_id = max(self.last_update_id, *(update['update_id'] for update in updates))
+
+        # Смещение сохраняется до выполнения команд: после перезапуска они не повторятся
+        self.save_offset()
+
+        for update in updates:
+            self._dispatch(update)
+        return True
+
+    def _dispatch(self, update: dict):
+        """Передача обновления в пул обработчиков"""
+        try:
+            self.executor.submit(self._handle, update)
+        except RuntimeError:
+            # Пул уже остановлен
+            pass
+
+    def _handle(self, update: dict):
+        """Обработка обновления в рабочем потоке"""
+        try:
+            if self.notifier.handle_update(update):
+                self.stats["commands"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logging.error(f"❌ Ошибка обработки команды Telegram: {e}")
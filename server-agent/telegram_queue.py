@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+📬 Telegram Queue - исходящая очередь сообщений Telegram с ограничением частоты
+Вызывающие только ставят сообщение в очередь, отправляет фоновый поток:
+token bucket на каждый чат, критические алерты - отдельной полосой вне лимита,
+однотипные алерты внутри окна объединяются в одну сводку. С журналом
+(TelegramOutbox) сообщения переживают перезапуск, а при недоступности
+Telegram повторяются с растущей паузой в исходном порядке
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from telegram_outbox import TelegramOutbox
+
+# Максимальная длина сообщения Telegram
+TELEGRAM_MAX_LENGTH = 4096
+
+# Строк сводки, после которых остальные только подсчитываются
+DIGEST_MAX_LINES = 20
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        """Ведро на per_minute сообщений: пополняется равномерно, вмещает минутный запас"""
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, float(per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        """Пополнение с момента прошлого обращения"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Секунды до появления жетона (0 - можно отправлять)"""
+        self._refill(now)
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0 if self.tokens >= 1 else float('inf')
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        """Расход жетона; вне лимита (критические) - без ухода в минус"""
+        self._refill(now)
+        self.tokens = max(0.0, self.tokens - 1)
+
+
+class TelegramSendQueue:
+    def __init__(self, deliver: Callable[[str, str, str], Tuple[bool, Optional[float]]],
+                 max_per_minute: float = 10, critical_override: bool = True,
+                 coalesce_window: float = 60, max_queue: int = 1000,
+                 outbox: Optional[TelegramOutbox] = None, backoff_max: float = 300):
+        """Очередь отправки
+
+        deliver(chat_id, text, parse_mode) отправляет одно сообщение и возвращает
+        (успех, retry_after): retry_after None - окончательная ошибка, 0 - временная
+        (повтор с растущей паузой), больше 0 - пауза, которую попросил Telegram (429).
+        Исключение deliver считается временной ошибкой сети.
+        """
+        self.deliver = deliver
+        self.max_per_minute = max_per_minute
+        self.critical_override = critical_override
+        self.coalesce_window = coalesce_window
+        self.max_queue = max_queue
+        self.outbox = outbox
+        self.backoff_max = backoff_max
+
+        # Полосы: критические всегда раньше обычных
+        self.critical = deque()
+        self.normal = deque()
+
+        # chat_id -> TokenBucket и время, до которого Telegram попросил не писать в чат
+        self.buckets = {}
+        self.paused_until = {}
+
+        # chat_id -> неудачных попыток подряд
+        self.failures = {}
+
+        # coalesce_key -> время последней отправки и копящаяся сводка
+        self.last_sent = {}
+        self.groups = {}
+
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+        # id журнала завершенных сообщений: done() (и сжатие журнала) вызывается
+        # потоком отправки вне self._cond, чтобы enqueue() не ждал диска
+        self._finished = []
+
+        self.stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "digests": 0,
+            "rate_limited": 0,
+            "retries": 0,
+            "restored": 0
+        }
+
+        # Недоставленные до перезапуска сообщения - первыми, в исходном порядке
+        if self.outbox is not None:
+            for record in self.outbox.pending():
+                message = {key: record.get(key) for key in ("chat_id", "text", "parse_mode", "critical")}
+                message["ids"] = [record["id"]]
+                with self._cond:
+                    self._accept(message, record.get("coalesce_key"), record.get("summary"))
+                self.stats["restored"] += 1
+
+    @classmethod
+    def from_config(cls, deliver: Callable[[str, str, str], Tuple[bool, Optional[float]]], config: Dict,
+                    outbox: Optional[TelegramOutbox] = None) -> 'TelegramSendQueue':
+        """Создание очереди из секций telegram.rate_limit и telegram.outbox конфигурации"""
+        rate_config = config.get('telegram', {}).get('rate_limit', {})
+        return cls(
+            deliver,
+            max_per_minute=rate_config.get('max_messages_per_minute', 10),
+            critical_override=rate_config.get('critical_override', True),
+            coalesce_window=rate_config.get('coalesce_window_seconds', 60),
+            max_queue=rate_config.get('max_queue', 1000),
+            outbox=outbox,
+            backoff_max=config.get('telegram', {}).get('outbox', {}).get('retry_backoff_max_seconds', 300)
+        )
+
+    def enqueue(self, chat_id: str, text: str, parse_mode: str = "Markdown", critical: bool = False,
+                coalesce_key: Optional[str] = None, summary: Optional[str] = None) -> bool:
+        """Постановка сообщения в очередь без ожидания
+
+        Сообщения с одинаковым coalesce_key чаще coalesce_window отправляются
+        одной сводкой из строк summary по окончании окна.
+        """
+        message = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "critical": critical
+        }
+
+        with self._cond:
+            if self._stopping:
+                return False
+            self.stats["enqueued"] += 1
+
+            # Запись в журнал до отправки: сообщение не теряется при сбое сети или процесса
+            ids = []
+            if self.outbox is not None:
+                ids.append(self.outbox.add({**message, "coalesce_key": coalesce_key, "summary": summary}))
+            message["ids"] = ids
+            self._accept(message, coalesce_key, summary)
+            return True
+
+    def _accept(self, message: Dict, coalesce_key: Optional[str], summary: Optional[str]):
+        """Сообщение в полосу или в копящуюся сводку (вызывается под блокировкой)"""
+        if coalesce_key:
+            now = time.monotonic()
+            group = self.groups.get(coalesce_key)
+            last = self.last_sent.get(coalesce_key)
+            if group is None and last is not None and now - last < self.coalesce_window:
+                group = self.groups[coalesce_key] = {"due": last + self.coalesce_window, "lines": [], "ids": []}
+            if group is not None:
+                group["message"] = message
+                group["lines"].append(f"{datetime.now().strftime('%H:%M:%S')} {summary or message['text'].strip()}")
+                group["ids"].extend(message["ids"])
+                self.stats["coalesced"] += 1
+                self._cond.notify()
+                return
+            self.last_sent[coalesce_key] = now
+
+        self._push(message)
+        self._ensure_thread()
+        self._cond.notify()
+
+    def _push(self, message: Dict, front: bool = False):
+        """Добавление в полосу; при переполнении вытесняется самое старое обычное сообщение"""
+        lane = self.critical if message["critical"] else self.normal
+        if front:
+            lane.appendleft(message)
+        else:
+            lane.append(message)
+
+        if len(self.critical) + len(self.normal) > self.max_queue:
+            dropped = (self.normal or self.critical).popleft()
+            self._done(dropped)
+            self.stats["dropped"] += 1
+            logging.warning("📬 Очередь Telegram переполнена - старое сообщение отброшено")
+
+    def _done(self, message: Dict):
+        """Сообщение больше не нужно хранить в журнале (вызывается под блокировкой, запись - в _flush_done)"""
+        if self.outbox is not None:
+            self._finished.extend(message["ids"])
+
+    def _flush_done(self):
+        """Отметка завершенных сообщений в журнале вне блокировки очереди"""
+        with self._cond:
+            ids, self._finished = self._finished, []
+        if ids:
+            self.outbox.done(ids)
+
+    def _ensure_thread(self):
+        """Поток отправки запускается при первом сообщении"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name='telegram-sender', daemon=True)
+            self._thread.start()
+
+    def _digest(self, group: Dict) -> Dict:
+        """Сводка накопленных однотипных сообщений; одно сообщение отправляется как есть"""
+        message = {**group["message"], "ids": group["ids"]}
+        lines = group["lines"]
+        if len(lines) == 1:
+            return message
+
+        self.stats["digests"] += 1
+        text = f"🔁 *Сводка: {len(lines)} однотипных сообщений за {self.coalesce_window:g} с*\n\n"
+        text += '\n'.join(f"• {line}" for line in lines[-DIGEST_MAX_LINES:])
+        if len(lines) > DIGEST_MAX_LINES:
+            text += f"\n… и еще {len(lines) - DIGEST_MAX_LINES} ранее"
+        if len(text) > TELEGRAM_MAX_LENGTH:
+            text = text[:TELEGRAM_MAX_LENGTH - 1] + "…"
+        return {**message, "text": text}
+
+    def _next(self, now: float) -> Tuple[Optional[Dict], Optional[float]]:
+        """Следующее сообщение, которое можно отправить, или время ожидания"""
+        wait = None
+
+        # Сводки, окно которых закончилось (при остановке - все сразу)
+        for key, group in list(self.groups.items()):
+            if self._stopping or group["due"] <= now:
+                del self.groups[key]
+                self.last_sent[key] = now
+                self._push(self._digest(group))
+            else:
+                wait = group["due"] - now if wait is None else min(wait, group["due"] - now)
+
+        for lane in (self.critical, self.normal):
+            # Сообщение первого готового чата: ожидание одного чата не задерживает остальные
+            for index, message in enumerate(lane):
+                chat_id = message["chat_id"]
+                bucket = self.buckets.setdefault(chat_id, TokenBucket(self.max_per_minute))
+                delay = max(0.0, self.paused_until.get(chat_id, 0) - now)
+                if not (message["critical"] and self.critical_override):
+                    delay = max(delay, bucket.wait_time(now))
+                if delay <= 0:
+                    del lane[index]
+                    bucket.take(now)
+                    return message, None
+                wait = delay if wait is None else min(wait, delay)
+
+        return None, wait
+
+    def _loop(self):
+        """Цикл отправки"""
+        while True:
+            self._flush_done()
+            with self._cond:
+                message, wait = self._next(time.monotonic())
+                if message is None:
+                    # При остановке ждущие сообщения остаются в журнале до следующего запуска
+                    if self._stopping and (self.outbox is not None or not (self.critical or self.normal)):
+                        return
+                    self._cond.wait(wait)
+                    continue
+
+            try:
+                delivered, retry_after = self.deliver(message["chat_id"], message["text"], message["parse_mode"])
+            except Exception as e:
+                logging.error(f"❌ Ошибка отправки в Telegram: {e}")
+                delivered, retry_after = False, 0.0
+
+            chat_id = message["chat_id"]
+            with self._cond:
+                if delivered:
+                    self.stats["sent"] += 1
+                    self.failures.pop(chat_id, None)
+                    self._done(message)
+                elif retry_after is None:
+                    self.stats["failed"] += 1
+                    self._done(message)
+                else:
+                    # Чат на паузе, сообщение возвращается в начало своей полосы: порядок сохраняется
+                    if retry_after > 0:
+                        self.stats["rate_limited"] += 1
+                        delay = retry_after
+                    else:
+                        self.stats["retries"] += 1
+                        failures = self.failures[chat_id] = self.failures.get(chat_id, 0) + 1
+                        delay = min(self.backoff_max, 2 ** failures) * random.uniform(0.75, 1.0)
+                        logging.warning(f"📮 Telegram недоступен, повтор через {delay:.0f}с")
+                    self.paused_until[chat_id] = time.monotonic() + delay
+                    self._push(message, front=True)
+
+    def stop(self, timeout: float = 10):
+        """Остановка: накопленные сводки и очередь отправляются в пределах timeout"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        if self.outbox is not None:
+            self._flush_done()
+            self.outbox.close()
+
+    def get_stats(self) -> Dict:
+        """Счетчики и глубина очереди"""
+        with self._cond:
+            return {
+                **self.stats,
+                "queued": len(self.critical) + len(self.normal),
+                "pending_digests": len(self.groups),
+                "outbox": self.outbox.get_stats() if self.outbox is not None else None
+            }
@@ -14,17 +14,28 @@ import sys
 import time
 import subprocess
 import logging
-import requests
-import schedule
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 import shutil
 import psutil
 
+from agent_scheduler import AgentScheduler
+from check_engine import CheckEngine
+from http_client import HttpClient
+from http_probe import HttpProbeEngine
+from job_executor import JobExecutor
+from log_index import AGENT_LOG_MARKERS, LogIndex
+from nginx_tailer import NginxLogTailer
+from metrics_server import AgentHttpServer, MetricsRegistry
+from resource_sampler import ResourceSampler
+from service_state import ServiceStateProvider
+
 # Новые модули для расширенной функциональности
 try:
     from ai_log_analyzer import AILogAnalyzer
     from telegram_notifier import TelegramNotifier  
+    from telegram_poller import TelegramPoller
     from yandex_monitoring_integration import YandexMonitoringIntegration
     AI_ENABLED = True
 except ImportError:
@@ -39,6 +50,90 @@ class YandexServerAgent:
         self.setup_logging()
         self.last_sync = None
         
+        # Параллельный движок критических проверок
+        engine_config = self.config['monitoring'].get('check_engine', {})
+        self.check_engine = CheckEngine(
+            max_workers=engine_config.get('max_workers', 4),
+            default_timeout=engine_config.get('default_timeout', 30)
+        )
+        
+        # Фоновый сбор ресурсов вместо блокирующих замеров CPU
+        sampler_config = self.config['monitoring'].get('resource_sampler', {})
+        self.resource_window = sampler_config.get('window_seconds', 60)
+        self.resource_sampler = ResourceSampler(
+            interval_seconds=sampler_config.get('interval_seconds', 5),
+            history_size=sampler_config.get('history_size', 720)
+        )
+        
+        # Состояние всех сервисов одним запросом к systemd, общий кэш на тик
+        state_config = self.config['monitoring'].get('service_state', {})
+        self.service_state = ServiceStateProvider(
+            units=[
+                self.config['services']['api']['name'],
+                self.config['services']['nginx']['name'],
+                'yandex-server-agent'
+            ],
+            cache_ttl=state_config.get('cache_ttl_seconds', 10)
+        )
+        
+        # Общий пул keep-alive соединений для всех исходящих запросов
+        self.http = HttpClient.from_config(self.config)
+        
+        # Асинхронные HTTP пробы с разбивкой времени по фазам и гистограммами задержек
+        probe_config = self.config['monitoring'].get('probes', {})
+        endpoints = probe_config.get('endpoints', [
+            {'name': 'site', 'url': 'https://gita-1972-reprint.ru/'}
+        ])
+        if not any(endpoint['name'] == 'api' for endpoint in endpoints):
+            endpoints = [{'name': 'api', 'url': self.config['services']['api']['check_url']}] + endpoints
+        self.probes = HttpProbeEngine(
+            endpoints,
+            timeout=self.config['monitoring']['alerts']['api_timeout'],
+            window_seconds=probe_config.get('window_minutes', 15) * 60
+        )
+        self.probe_interval = probe_config.get('interval_seconds', 60)
+        
+        # Планировщик просыпается ровно к следующему дедлайну
+        scheduler_config = self.config['monitoring'].get('scheduler', {})
+        self.scheduler = AgentScheduler(default_jitter=scheduler_config.get('jitter_seconds', 5))
+        
+        # Тяжелые задачи выполняются в отдельных пулах, не блокируя планировщик
+        executor_config = self.config['monitoring'].get('job_executor', {})
+        self.jobs = JobExecutor(classes=executor_config.get('classes'))
+        
+        # Инкрементальный индекс собственного лога: смещение и счетчики переживают перезапуск
+        log_file = self.config['logging']['log_file']
+        self.log_index = LogIndex(log_file, markers=AGENT_LOG_MARKERS, state_file=f"{log_file}.index.json")
+        
+        # Логи Nginx читаются одним сервисом по смещению, позиция переживает ротацию и перезапуск
+        tailer_config = self.config['monitoring'].get('nginx_tailer', {})
+        self.nginx_tailer = NginxLogTailer(
+            checkpoint_file=tailer_config.get('checkpoint_file', os.path.join(os.path.dirname(log_file), 'nginx-tailer.json')),
+            interval_seconds=tailer_config.get('interval_seconds', 10)
+        )
+        
+        # Встроенный HTTP сервер: /metrics для Prometheus из счетчиков в памяти
+        server_config = self.config['monitoring'].get('http_server', {})
+        self.http_server = AgentHttpServer(
+            host=server_config.get('host', '0.0.0.0'),
+            port=server_config.get('port', 8080)
+        ) if server_config.get('enabled', True) else None
+        self.metrics = self.http_server.registry if self.http_server else MetricsRegistry()
+        self.process = psutil.Process()
+        self.setup_metrics()
+        
+        # /health отвечает из кэша последних проверок, ?fresh=1 запускает проверку с дедлайном
+        self.health_fresh_timeout = server_config.get('health_fresh_timeout_seconds', 5)
+        self.health_body = self.build_health_body({}, [], source="startup")
+        
+        # Свой пул для проверок по запросу: плановый цикл не задерживает их в очереди
+        self.health_engine = CheckEngine(max_workers=3, default_timeout=self.health_fresh_timeout)
+        # Одновременные запросы ?fresh=1 ждут одну выполняющуюся проверку
+        self._fresh_lock = threading.Lock()
+        self._fresh_run = None
+        if self.http_server:
+            self.http_server.add_route("/health", self.health_route)
+        
         # Инициализация новых модулей
         if AI_ENABLED:
             try:
@@ -55,6 +150,35 @@ class YandexServerAgent:
             self.ai_analyzer = None
             self.telegram = None
             self.monitoring = None
+            
+        if self.monitoring:
+            self.monitoring.sampler = self.resource_sampler
+            self.monitoring.resource_window = self.resource_window
+            self.monitoring.service_state = self.service_state
+            self.monitoring.http = self.http
+            self.monitoring.probes = self.probes
+            self.monitoring.log_index = self.log_index
+            self.monitoring.nginx_tailer = self.nginx_tailer
+            
+        if self.ai_analyzer:
+            self.ai_analyzer.log_index = self.log_index
+            self.ai_analyzer.follow_nginx_errors(self.nginx_tailer)
+            
+        self.telegram_poller = None
+        if self.telegram:
+            self.telegram.service_state = self.service_state
+            self.telegram.http = self.http
+            
+            # Выделенный поток long polling для команд, смещение хранится рядом с логами
+            polling_config = self.config.get('telegram', {}).get('polling', {})
+            default_offset_file = os.path.join(os.path.dirname(self.config['logging']['log_file']), 'telegram-offset.json')
+            self.telegram_poller = TelegramPoller(
+                self.telegram,
+                offset_file=polling_config.get('offset_file', default_offset_file),
+                poll_timeout=polling_config.get('timeout_seconds', 50),
+                workers=polling_config.get('command_workers', 2)
+            )
+            
         self.status = "initializing"
         
         self.log_info("🤖 Yandex Server Agent запущен")
@@ -98,6 +222,7 @@ class YandexServerAgent:
         
     def run_command(self, command, timeout=30):
         """Выполнение команды с таймаутом"""
+        self.metrics.inc('agent_subprocess_total', source='agent')
         try:
             result = subprocess.run(
                 command, 
@@ -116,19 +241,17 @@ class YandexServerAgent:
             
     def check_api_availability(self):
         """Проверка доступности API"""
-        api_url = self.config['services']['api']['check_url']
-        timeout = self.config['monitoring']['alerts']['api_timeout']
+        result = self.probes.probe_endpoint('api')
+        timings = ', '.join(f"{phase}={value}мс" for phase, value in result['timings_ms'].items())
         
-        try:
-            response = requests.get(api_url, timeout=timeout)
-            if response.status_code == 200:
-                self.log_info("✅ API доступен")
-                return True
-            else:
-                self.log_warning(f"⚠️ API вернул код: {response.status_code}")
-                return False
-        except Exception as e:
-            self.log_error(f"❌ API недоступен: {e}")
+        if result['ok']:
+            self.log_info(f"✅ API доступен ({timings})")
+            return True
+        elif result['status_code']:
+            self.log_warning(f"⚠️ API вернул код: {result['status_code']}")
+            return False
+        else:
+            self.log_error(f"❌ API недоступен: {result['error']}")
             return False
             
     def check_systemd_services(self):
@@ -140,8 +263,7 @@ class YandexServerAgent:
         
         all_ok = True
         for service in services:
-            success, stdout, stderr = self.run_command(f"systemctl is-active {service}")
-            if success and "active" in stdout:
+            if self.service_state.is_active(service):
                 self.log_info(f"✅ Сервис {service} работает")
             else:
                 self.log_error(f"❌ Сервис {service} не работает")
@@ -162,8 +284,7 @@ class YandexServerAgent:
             self.log_info(f"✅ Сервис {service_name} перезапущен")
             # Проверяем что сервис запустился
             time.sleep(5)
-            success, stdout, stderr = self.run_command(f"systemctl is-active {service_name}")
-            if success:
+            if self.service_state.is_active(service_name, force=True):
                 self.log_info(f"✅ Сервис {service_name} успешно работает")
             else:
                 self.log_error(f"❌ Сервис {service_name} не запустился после перезапуска")
@@ -175,8 +296,11 @@ class YandexServerAgent:
         alerts = self.config['monitoring']['alerts']
         issues = []
         
+        # Среднее за окно сглаживает кратковременные всплески
+        averaged = self.resource_sampler.average(self.resource_window)
+        
         # CPU
-        cpu_percent = psutil.cpu_percent(interval=1)
+        cpu_percent = averaged['cpu']
         if cpu_percent > alerts['cpu_threshold']:
             issues.append(f"CPU: {cpu_percent}% (>{alerts['cpu_threshold']}%)")
             self.log_warning(f"⚠️ Высокое использование CPU: {cpu_percent}%")
@@ -184,24 +308,24 @@ class YandexServerAgent:
             self.log_info(f"✅ CPU: {cpu_percent}%")
             
         # Memory  
-        memory = psutil.virtual_memory()
-        if memory.percent > alerts['memory_threshold']:
-            issues.append(f"RAM: {memory.percent}% (>{alerts['memory_threshold']}%)")
-            self.log_warning(f"⚠️ Высокое использование памяти: {memory.percent}%")
+        memory_percent = averaged['memory']
+        if memory_percent > alerts['memory_threshold']:
+            issues.append(f"RAM: {memory_percent}% (>{alerts['memory_threshold']}%)")
+            self.log_warning(f"⚠️ Высокое использование памяти: {memory_percent}%")
         else:
-            self.log_info(f"✅ Memory: {memory.percent}%")
+            self.log_info(f"✅ Memory: {memory_percent}%")
             
         # Disk
-        disk = psutil.disk_usage('/')
-        if disk.percent > alerts['disk_threshold']:
-            issues.append(f"Диск: {disk.percent}% (>{alerts['disk_threshold']}%)")
-            self.log_warning(f"⚠️ Высокое использование диска: {disk.percent}%")
+        disk_percent = averaged['disk']
+        if disk_percent > alerts['disk_threshold']:
+            issues.append(f"Диск: {disk_percent}% (>{alerts['disk_threshold']}%)")
+            self.log_warning(f"⚠️ Высокое использование диска: {disk_percent}%")
             
             # Автоматическая очистка логов если включена
             if self.config['automation']['auto_cleanup_logs']:
                 self.cleanup_old_logs()
         else:
-            self.log_info(f"✅ Disk: {disk.percent}%")
+            self.log_info(f"✅ Disk: {disk_percent}%")
             
         return len(issues) == 0, issues
         
@@ -475,25 +599,66 @@ class YandexServerAgent:
         """Критические проверки"""
         self.log_info("🔍 Выполнение критических проверок")
         
+        api_timeout = self.config['monitoring']['alerts']['api_timeout']
+        timeouts = self.config['monitoring'].get('check_engine', {}).get('timeouts', {})
+        
+        # Независимые проверки выполняются параллельно, у каждой свой дедлайн
+        checks = [
+            {'name': 'api', 'func': self.check_api_availability, 'timeout': timeouts.get('api', api_timeout + 5)},
+            {'name': 'services', 'func': self.check_systemd_services, 'timeout': timeouts.get('services', 60)},
+            {'name': 'resources', 'func': self.check_system_resources, 'timeout': timeouts.get('resources', 10)},
+            {'name': 'ssl', 'func': self.check_ssl_certificates, 'timeout': timeouts.get('ssl', 30)}
+        ]
+        
+        run = self.check_engine.run(checks)
+        results = run['results']
+        
         issues = []
         
         # API
-        if not self.check_api_availability():
+        if not (results['api']['ok'] and results['api']['value']):
             issues.append("API недоступен")
             
         # Сервисы
-        if not self.check_systemd_services():
+        if not (results['services']['ok'] and results['services']['value']):
             issues.append("Проблемы с сервисами")
             
         # Ресурсы
-        resources_ok, resource_issues = self.check_system_resources()
-        if not resources_ok:
-            issues.extend(resource_issues)
+        if results['resources']['ok']:
+            resources_ok, resource_issues = results['resources']['value']
+            if not resources_ok:
+                issues.extend(resource_issues)
+        else:
+            issues.append(f"Проверка ресурсов не выполнена: {results['resources']['error']}")
             
         # SSL
-        if not self.check_ssl_certificates():
+        if not (results['ssl']['ok'] and results['ssl']['value']):
             issues.append("Проблемы с SSL")
             
+        if run['timed_out']:
+            self.log_warning(f"⏰ Проверки превысили дедлайн: {', '.join(run['timed_out'])}")
+            
+        passed_checks = {
+            name: result['ok'] and bool(result['value'][0] if name == 'resources' else result['value'])
+            for name, result in results.items()
+        }
+        for name, result in results.items():
+            passed = passed_checks[name]
+            self.metrics.set('agent_check_up', passed, check=name)
+            self.metrics.set('agent_check_duration_seconds', result['duration'], check=name)
+            self.metrics.inc('agent_checks_total', check=name, result='ok' if passed else 'fail')
+        self.metrics.set('agent_critical_checks_duration_seconds', round(run['duration'], 3))
+        self.metrics.set('agent_critical_checks_last_run_timestamp_seconds', round(time.time(), 3))
+            
+        durations = ', '.join(f"{name}={result['duration']}с" for name, result in results.items())
+        self.log_info(f"⏱️ Критические проверки заняли {run['duration']:.1f}с ({durations})")
+            
+        self.health_body = self.build_health_body(
+            {name: dict(results[name], ok=passed) for name, passed in passed_checks.items()},
+            issues,
+            source="cache"
+        )
+            
         if issues:
             self.log_warning(f"⚠️ Обнаружены проблемы: {', '.join(issues)}")
             if self.config['automation']['emergency_recovery']:
@@ -503,19 +668,196 @@ class YandexServerAgent:
             
         return len(issues) == 0
         
+    def build_health_body(self, checks, issues, source):
+        """Готовый JSON ответа /health - сериализуется один раз при обновлении"""
+        if source == "startup":
+            status = "starting"
+        else:
+            status = "ok" if not issues and all(check['ok'] for check in checks.values()) else "degraded"
+            
+        health = {
+            "status": status,
+            "agent_status": getattr(self, 'status', 'initializing'),
+            "version": self.config['agent']['version'],
+            "source": source,
+            "checked_at": datetime.now().isoformat(),
+            "checks": {
+                name: {"ok": check['ok'], "error": check['error'], "duration": check['duration']}
+                for name, check in checks.items()
+            },
+            "issues": issues
+        }
+        return json.dumps(health, ensure_ascii=False).encode('utf-8')
+        
+    def run_fresh_health_check(self, deadline):
+        """Проверка по запросу /health?fresh=1: без побочных действий и не дольше дедлайна"""
+        services = [
+            self.config['services']['api']['name'],
+            self.config['services']['nginx']['name']
+        ]
+        alerts = self.config['monitoring']['alerts']
+        
+        def check_services():
+            states = self.service_state.get_states(force=True)
+            return all(states.get(service, {}).get('active_state') == 'active' for service in services)
+            
+        def check_resources():
+            latest = self.resource_sampler.latest()
+            return (latest['cpu'] <= alerts['cpu_threshold'] and
+                    latest['memory'] <= alerts['memory_threshold'] and
+                    latest['disk'] <= alerts['disk_threshold'])
+        
+        run = self.health_engine.run([
+            {'name': 'health_api', 'func': lambda: self.probes.probe_endpoint('api')['ok'], 'timeout': deadline},
+            {'name': 'health_services', 'func': check_services, 'timeout': deadline},
+            {'name': 'health_resources', 'func': check_resources, 'timeout': deadline}
+        ])
+        
+        checks = {}
+        issues = []
+        for name, result in run['results'].items():
+            name = name[len('health_'):]
+            checks[name] = dict(result, ok=result['ok'] and bool(result['value']))
+            if not checks[name]['ok']:
+                issues.append(f"{name}: {result['error'] or 'failed'}")
+                
+        return self.build_health_body(checks, issues, source="fresh")
+        
+    def fresh_health_body(self, deadline):
+        """Ответ ?fresh=1: новая проверка или результат уже выполняющейся, при неудаче - кэш"""
+        with self._fresh_lock:
+            run = self._fresh_run
+            owner = run is None
+            if owner:
+                run = self._fresh_run = {'done': threading.Event(), 'body': None}
+        
+        if owner:
+            try:
+                run['body'] = self.run_fresh_health_check(deadline)
+            except Exception as e:
+                self.log_error(f"❌ Ошибка проверки /health: {e}")
+            finally:
+                with self._fresh_lock:
+                    self._fresh_run = None
+                run['done'].set()
+        else:
+            run['done'].wait(deadline)
+            
+        return run['body'] or self.health_body
+        
+    def health_route(self, query):
+        """GET /health - последний результат из кэша, /health?fresh=1&timeout=N - новая проверка"""
+        if query.get('fresh', ['0'])[0].lower() in ('1', 'true', 'yes'):
+            try:
+                deadline = float(query.get('timeout', [self.health_fresh_timeout])[0])
+            except ValueError:
+                deadline = self.health_fresh_timeout
+            body = self.fresh_health_body(min(max(deadline, 0.1), 30))
+        else:
+            body = self.health_body
+            
+        return 200, "application/json; charset=utf-8", body
+        
+    def setup_metrics(self):
+        """Описание метрик, которые агент обновляет сам"""
+        self.metrics.describe('agent_subprocess_total', 'counter', 'Запущено внешних процессов')
+        self.metrics.describe('agent_check_up', 'gauge', 'Результат последней критической проверки (1 - пройдена)')
+        self.metrics.describe('agent_check_duration_seconds', 'gauge', 'Длительность последней критической проверки')
+        self.metrics.describe('agent_checks_total', 'counter', 'Выполнено критических проверок по результату')
+        self.metrics.describe('agent_critical_checks_duration_seconds', 'gauge', 'Длительность последнего цикла критических проверок')
+        self.metrics.describe('agent_critical_checks_last_run_timestamp_seconds', 'gauge', 'Время последнего цикла критических проверок')
+        self.metrics.add_collector(self.collect_runtime_metrics)
+        
+    def collect_runtime_metrics(self):
+        """Метрики из статистики модулей агента - только данные в памяти, без новых проверок"""
+        samples = []
+        
+        def add(name, metric_type, help_text, value, **labels):
+            samples.append((name, metric_type, help_text, labels, value))
+        
+        # Собственный процесс агента
+        cpu_times = self.process.cpu_times()
+        add('process_cpu_seconds_total', 'counter', 'Процессорное время агента', round(cpu_times.user + cpu_times.system, 3))
+        add('process_resident_memory_bytes', 'gauge', 'Резидентная память агента', self.process.memory_info().rss)
+        add('process_start_time_seconds', 'gauge', 'Время запуска агента', self.process.create_time())
+        
+        # Последний замер фонового сборщика ресурсов
+        recent = self.resource_sampler.window(self.resource_window)
+        if recent:
+            for resource in ('cpu', 'memory', 'disk'):
+                add('agent_host_usage_percent', 'gauge', 'Загрузка ресурсов сервера', recent[-1][resource], resource=resource)
+            add('agent_host_load1', 'gauge', 'Load average за минуту', recent[-1]['load'])
+        
+        add('agent_subprocess_total', 'counter', 'Запущено внешних процессов', self.service_state.queries, source='service_state')
+        
+        # Планировщик и фоновые задачи
+        add('agent_scheduler_jobs', 'gauge', 'Задач в очереди планировщика', len(self.scheduler.pending()))
+        for job_class, depth in self.jobs.queue_depths().items():
+            add('agent_job_queue_depth', 'gauge', 'Задач в очереди пула класса', depth, job_class=job_class)
+        
+        for name, stats in self.scheduler.get_stats().items():
+            add('agent_job_runs_total', 'counter', 'Запусков задачи планировщиком', stats['runs'], job=name)
+            add('agent_job_failures_total', 'counter', 'Ошибок задачи в планировщике', stats['failures'], job=name)
+            add('agent_job_overruns_total', 'counter', 'Запусков дольше периода задачи', stats['overruns'], job=name)
+            add('agent_job_missed_total', 'counter', 'Пропущенных и объединенных запусков', stats['skipped'] + stats['coalesced'], job=name)
+            add('agent_job_last_duration_seconds', 'gauge', 'Длительность последнего запуска в планировщике', stats['last_duration'], job=name)
+        
+        for name, stats in self.jobs.get_stats().items():
+            labels = {'job': name, 'job_class': stats['job_class']}
+            add('agent_background_job_completed_total', 'counter', 'Завершенных фоновых задач', stats['completed'], **labels)
+            add('agent_background_job_failures_total', 'counter', 'Ошибок фоновых задач', stats['failures'], **labels)
+            add('agent_background_job_rejected_total', 'counter', 'Пропущено из-за незавершенного запуска', stats['rejected_overlap'], **labels)
+            add('agent_background_job_last_duration_seconds', 'gauge', 'Длительность последнего выполнения', stats['last_duration'], **labels)
+            add('agent_background_job_running', 'gauge', 'Задача выполняется сейчас', stats['running_since'] is not None, **labels)
+        
+        # HTTP пробы: счетчики и перцентили из гистограмм со скользящим окном
+        for name, summary in self.probes.get_summary().items():
+            add('agent_probe_total', 'counter', 'Выполнено HTTP проб', summary['probes'], endpoint=name)
+            add('agent_probe_failures_total', 'counter', 'Неудачных HTTP проб', summary['failures'], endpoint=name)
+            if summary['last']:
+                add('agent_probe_up', 'gauge', 'Результат последней HTTP пробы', summary['last']['ok'], endpoint=name)
+            for phase, latency in summary['latency_ms'].items():
+                for key, quantile in (('p50', '0.5'), ('p95', '0.95'), ('p99', '0.99')):
+                    if latency[key] is not None:
+                        add('agent_probe_latency_milliseconds', 'gauge', 'Перцентили задержки HTTP проб за окно',
+                            latency[key], endpoint=name, phase=phase, quantile=quantile)
+        
+        # Пул HTTP соединений
+        pool = self.http.get_stats()
+        add('agent_http_requests_total', 'counter', 'HTTP запросов через общий пул', pool['requests'])
+        add('agent_http_connections_opened_total', 'counter', 'Открыто HTTP соединений', pool['connections_opened'])
+
+        # Исходящая очередь Telegram
+        if self.telegram:
+            queue = self.telegram.queue.get_stats()
+            for result in ('sent', 'failed', 'dropped', 'coalesced', 'rate_limited', 'retries'):
+                add('agent_telegram_messages_total', 'counter', 'Сообщений Telegram по результату', queue[result], result=result)
+            add('agent_telegram_queue_depth', 'gauge', 'Сообщений в очереди отправки Telegram', queue['queued'])
+            if queue['outbox']:
+                add('agent_telegram_outbox_pending', 'gauge', 'Недоставленных сообщений в журнале Telegram', queue['outbox']['pending'])
+
+        return samples
+        
     def generate_status_report(self):
         """Генерация отчета о состоянии"""
+        resources = self.resource_sampler.average(self.resource_window)
         report = {
             "timestamp": datetime.now().isoformat(),
             "agent_status": self.status,
             "last_sync": self.last_sync.isoformat() if self.last_sync else None,
             "system": {
-                "cpu": psutil.cpu_percent(interval=1),
-                "memory": psutil.virtual_memory().percent,
-                "disk": psutil.disk_usage('/').percent
+                "cpu": resources['cpu'],
+                "memory": resources['memory'],
+                "disk": resources['disk'],
+                "load": resources['load']
             },
             "services": {},
+            "services_details": {},
             "ssl_status": "checking",
+            "jobs": self.scheduler.get_stats(),
+            "background_jobs": self.jobs.get_stats(),
+            "http_pool": self.http.get_stats(),
+            "probes": self.probes.get_summary(),
             "last_check": datetime.now().isoformat()
         }
         
@@ -526,8 +868,9 @@ class YandexServerAgent:
         ]
         
         for service in services:
-            success, stdout, stderr = self.run_command(f"systemctl is-active {service}")
-            report["services"][service] = "active" if success else "inactive"
+            state = self.service_state.get_unit(service)
+            report["services"][service] = state['active_state']
+            report["services_details"][service] = state
             
         return report
         
@@ -549,37 +892,46 @@ class YandexServerAgent:
         interval = self.config['monitoring']['interval_minutes']
 
         # Основные проверки каждые 15 минут
-        schedule.every(interval).minutes.do(self.perform_critical_checks)
+        self.scheduler.every(
+            interval * 60,
+            self.jobs.wrap("critical_checks", self.perform_critical_checks, "checks"),
+            name="critical_checks"
+        )
+
+        # HTTP пробы всех эндпоинтов каждую минуту
+        self.scheduler.every(self.probe_interval, self.jobs.wrap("http_probes", self.probes.probe_all), name="http_probes")
 
         # Синхронизация с Cursor каждый час
-        schedule.every().hour.do(self.sync_with_cursor)
+        self.scheduler.every(3600, self.sync_with_cursor, name="sync_with_cursor")
 
         # Синхронизация с GitHub каждые 30 минут
-        schedule.every(30).minutes.do(self.sync_with_github)
+        self.scheduler.every(30 * 60, self.jobs.wrap("sync_with_github", self.sync_with_github), name="sync_with_github")
 
         # Генерация отчета каждые 5 минут
-        schedule.every(5).minutes.do(lambda: self.save_status_report(self.generate_status_report()))
+        self.scheduler.every(5 * 60, lambda: self.save_status_report(self.generate_status_report()), name="status_report")
 
-        # Системное обслуживание и обновления
+        # Системное обслуживание и обновления (apt может работать минутами - выполняем вне планировщика,
+        # оба расписания используют одно имя задачи, чтобы обслуживание не пересекалось само с собой)
+        maintenance = self.jobs.wrap("system_maintenance", self.perform_system_maintenance, "maintenance")
         if self.config['automation'].get('auto_security_updates', True):
-            # Проверка обновлений безопасности каждые 6 часов
-            schedule.every(6).hours.do(self.perform_system_maintenance)
+            # Проверка обновлений безопасности каждые 6 часов (пропущенные запуски не догоняем)
+            self.scheduler.every(6 * 3600, maintenance, name="system_maintenance", misfire="skip")
 
         # Еженедельное обслуживание (воскресенье в 3:00)
-        schedule.every().sunday.at("03:00").do(self.perform_system_maintenance)
+        self.scheduler.weekly_at("sunday", "03:00", maintenance, name="weekly_maintenance")
 
         # Новые расширенные функции
         if AI_ENABLED and self.ai_analyzer:
             # AI анализ логов каждые 30 минут
-            schedule.every(30).minutes.do(self.run_ai_analysis)
+            self.scheduler.every(30 * 60, self.jobs.wrap("ai_analysis", self.run_ai_analysis, "analysis"), name="ai_analysis")
             
         if AI_ENABLED and self.monitoring:
             # Сбор и отправка метрик каждые 5 минут
-            schedule.every(5).minutes.do(self.collect_and_send_metrics)
+            self.scheduler.every(5 * 60, self.jobs.wrap("metrics", self.collect_and_send_metrics), name="metrics")
             
         if AI_ENABLED and self.telegram:
             # Ежедневный отчет в 9:00
-            schedule.every().day.at("09:00").do(self.send_daily_telegram_report)
+            self.scheduler.daily_at("09:00", self.jobs.wrap("daily_report", self.send_daily_telegram_report), name="daily_report")
 
         self.log_info(f"✅ Расписание настроено (проверки каждые {interval} минут, AI анализ каждые 30 минут)")
     
@@ -643,10 +995,11 @@ class YandexServerAgent:
             self.log_info("📱 Отправка ежедневного отчета")
             
             # Собираем данные для отчета
+            resources = self.resource_sampler.average(self.resource_window)
             system_stats = {
-                'cpu': psutil.cpu_percent(interval=1),
-                'memory': psutil.virtual_memory().percent,
-                'disk': psutil.disk_usage('/').percent,
+                'cpu': resources['cpu'],
+                'memory': resources['memory'],
+                'disk': resources['disk'],
                 'uptime': f"{(time.time() - psutil.boot_time()) / 3600:.1f} hours"
             }
             
@@ -667,33 +1020,18 @@ class YandexServerAgent:
     def check_service_status(self, service_name):
         """Проверка статуса сервиса"""
         try:
-            success, stdout, stderr = self.run_command(f"systemctl is-active {service_name}")
-            return stdout.strip() if success else "inactive"
+            return self.service_state.get_state(service_name)
         except:
             return "unknown"
     
     def get_recent_issues(self):
         """Получение недавних проблем из логов"""
         try:
-            issues = []
-            
-            # Ищем ошибки в логах агента за последние 24 часа
-            success, stdout, stderr = self.run_command(
-                "grep 'ERROR' /home/yc-user/gita-1972/logs/server-agent.log | tail -5"
-            )
-            
-            if success and stdout:
-                for line in stdout.strip().split('\n'):
-                    if line:
-                        # Простой парсинг времени и описания
-                        parts = line.split(' - ', 2)
-                        if len(parts) >= 3:
-                            issues.append({
-                                'time': parts[0],
-                                'description': parts[2]
-                            })
-            
-            return issues
+            # Последние ошибки из индекса лога агента (дочитываются только новые строки)
+            return [
+                {'time': entry['time'], 'description': entry['message']}
+                for entry in self.log_index.recent_errors(limit=5)
+            ]
             
         except Exception as e:
             self.log_error(f"❌ Ошибка получения недавних проблем: {e}")
@@ -702,33 +1040,44 @@ class YandexServerAgent:
     def run(self):
         """Основной цикл агента"""
         self.status = "running"
+        self.resource_sampler.start()
+        self.nginx_tailer.start()
+        if self.http_server:
+            self.http_server.start()
         self.setup_schedule()
         
         # Первоначальная проверка
         self.perform_critical_checks()
         self.sync_with_cursor()
         
+        # Команды Telegram обрабатываются сразу по поступлении
+        if self.telegram_poller:
+            self.telegram_poller.start()
+        
         self.log_info("🚀 Агент запущен и работает")
         
         try:
-            while True:
-                schedule.run_pending()
-                
-                # Проверяем команды Telegram каждый цикл
-                if self.telegram:
-                    try:
-                        self.telegram.check_for_commands()
-                    except Exception as e:
-                        self.log_error(f"Ошибка обработки команд Telegram: {e}")
-                
-                time.sleep(30)  # Уменьшили интервал для быстрой реакции на команды
-                
+            self.scheduler.run_forever()
         except KeyboardInterrupt:
             self.log_info("🛑 Агент остановлен пользователем")
             self.status = "stopped"
         except Exception as e:
             self.log_error(f"❌ Критическая ошибка агента: {e}")
             self.status = "error"
+        finally:
+            self.scheduler.stop()
+            if self.telegram_poller:
+                self.telegram_poller.stop()
+            self.jobs.shutdown()
+            if self.telegram:
+                self.telegram.stop()
+            self.resource_sampler.stop()
+            self.nginx_tailer.stop()
+            self.check_engine.shutdown()
+            self.health_engine.shutdown()
+            if self.http_server:
+                self.http_server.stop()
+            self.http.close()
 
 def main():
     """Главная функция"""
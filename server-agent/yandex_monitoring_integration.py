@@ -6,7 +6,6 @@
 
 import json
 import logging
-import requests
 import subprocess
 import psutil
 import os
@@ -14,12 +13,44 @@ from datetime import datetime, timezone
 from typing import Dict, List, Optional
 import time
 
+from http_client import HttpClient
+from log_index import AGENT_LOG_FILE, AGENT_LOG_MARKERS, LogIndex
+from metric_history import METRIC_HISTORY_FILE, MetricHistory
+from service_state import ServiceStateProvider
+
 class YandexMonitoringIntegration:
     def __init__(self, config_path="agent-config.json"):
         """Инициализация интеграции с Yandex Monitoring"""
         self.config = self.load_config(config_path)
         self.setup_logging()
         
+        # Фоновый сборщик ресурсов (подключается агентом)
+        self.sampler = None
+        self.resource_window = 60
+        
+        # Состояние сервисов одним запросом (агент подменяет на общий провайдер)
+        self.service_state = ServiceStateProvider(["gita-api", "nginx", "yandex-server-agent"])
+        self.http = HttpClient.from_config(self.config)
+        
+        # Движок HTTP проб агента: если подключен, метрики берутся из последних проб
+        self.probes = None
+        
+        # Общий сервис чтения логов Nginx (подключается агентом)
+        self.nginx_tailer = None
+        
+        # Инкрементальный индекс лога агента (агент подменяет на общий)
+        self.log_index = LogIndex(
+            self.config.get('logging', {}).get('log_file', AGENT_LOG_FILE),
+            markers=AGENT_LOG_MARKERS
+        )
+        
+        # История метрик для локального прогнозирования
+        self.history = MetricHistory(
+            self.config.get('yandex_monitoring', {}).get('history_file', METRIC_HISTORY_FILE),
+            retention_days=self.config.get('yandex_monitoring', {}).get('history_retention_days', 35)
+        )
+        self._last_requests = None
+        
     def load_config(self, config_path):
         """Загрузка конфигурации"""
         try:
@@ -82,13 +113,23 @@ class YandexMonitoringIntegration:
     def collect_system_metrics(self) -> Dict:
         """Сбор системных метрик"""
         try:
+            if self.sampler:
+                resources = self.sampler.average(self.resource_window)
+            else:
+                resources = {
+                    "cpu": psutil.cpu_percent(interval=1),
+                    "memory": psutil.virtual_memory().percent,
+                    "disk": psutil.disk_usage('/').percent,
+                    "load": psutil.getloadavg()[0]
+                }
+            
             metrics = {
                 "timestamp": datetime.now(timezone.utc).isoformat(),
                 "system": {
-                    "cpu_percent": psutil.cpu_percent(interval=1),
-                    "memory_percent": psutil.virtual_memory().percent,
-                    "disk_percent": psutil.disk_usage('/').percent,
-                    "load_average": psutil.getloadavg()[0],
+                    "cpu_percent": resources['cpu'],
+                    "memory_percent": resources['memory'],
+                    "disk_percent": resources['disk'],
+                    "load_average": resources['load'],
                     "uptime_seconds": time.time() - psutil.boot_time(),
                     "network_io": {
                         "bytes_sent": psutil.net_io_counters().bytes_sent,
@@ -131,42 +172,52 @@ class YandexMonitoringIntegration:
             self.log_error(f"❌ Ошибка сбора метрик приложений: {e}")
             return {}
     
+    def check_endpoint(self, probe_name: str, url: str) -> Dict:
+        """Доступность и время ответа эндпоинта"""
+        latest = self.probes.latest(probe_name) if self.probes else None
+        
+        if latest:
+            # Последняя проба агента с разбивкой по фазам и перцентилями за окно
+            return {
+                "available": latest['ok'],
+                "response_time_ms": latest['timings_ms'].get('total', 0),
+                "status_code": latest['status_code'],
+                "timings_ms": latest['timings_ms'],
+                "latency_ms": self.probes.latency(probe_name)
+            }
+        
+        start_time = time.time()
+        try:
+            response = self.http.get(url, timeout=10)
+            return {
+                "available": response.status_code == 200,
+                "response_time_ms": (time.time() - start_time) * 1000,  # в миллисекундах
+                "status_code": response.status_code
+            }
+        except:
+            return {
+                "available": False,
+                "response_time_ms": 0,
+                "status_code": 0
+            }
+    
     def get_api_metrics(self) -> Dict:
         """Метрики API сервиса"""
         try:
             # Проверка доступности API
-            api_url = "https://api.gita-1972-reprint.ru/api/status"
-            start_time = time.time()
+            endpoint = self.check_endpoint("api", "https://api.gita-1972-reprint.ru/api/status")
             
-            try:
-                response = requests.get(api_url, timeout=10)
-                response_time = (time.time() - start_time) * 1000  # в миллисекундах
-                api_available = response.status_code == 200
-                status_code = response.status_code
-            except:
-                response_time = 0
-                api_available = False
-                status_code = 0
-            
-            # Статус systemd сервиса
-            service_cmd = "systemctl is-active gita-api"
-            service_result = subprocess.run(service_cmd, shell=True, capture_output=True, text=True)
-            service_active = service_result.stdout.strip() == "active"
-            
-            # Использование памяти процессом Node.js
-            try:
-                memory_cmd = "ps aux | grep 'node.*server.js' | grep -v grep | awk '{print $6}'"
-                memory_result = subprocess.run(memory_cmd, shell=True, capture_output=True, text=True)
-                memory_usage_kb = int(memory_result.stdout.strip()) if memory_result.stdout.strip() else 0
-            except:
-                memory_usage_kb = 0
+            # Статус systemd сервиса и память его cgroup
+            service = self.service_state.get_unit("gita-api")
+            service_active = service['active_state'] == "active"
+            memory_usage_kb = (service['memory_bytes'] or 0) // 1024
             
             return {
-                "available": api_available,
-                "response_time_ms": response_time,
-                "status_code": status_code,
+                **endpoint,
                 "service_active": service_active,
                 "memory_usage_kb": memory_usage_kb,
+                "main_pid": service['main_pid'],
+                "uptime_seconds": service['uptime_seconds'] or 0,
                 "last_check": datetime.now(timezone.utc).isoformat()
             }
             
@@ -178,23 +229,10 @@ class YandexMonitoringIntegration:
         """Метрики Nginx"""
         try:
             # Статус сервиса
-            service_cmd = "systemctl is-active nginx"
-            service_result = subprocess.run(service_cmd, shell=True, capture_output=True, text=True)
-            service_active = service_result.stdout.strip() == "active"
+            service_active = self.service_state.is_active("nginx")
             
             # Проверка доступности сайта
-            site_url = "https://gita-1972-reprint.ru/"
-            start_time = time.time()
-            
-            try:
-                response = requests.get(site_url, timeout=10)
-                response_time = (time.time() - start_time) * 1000
-                site_available = response.status_code == 200
-                status_code = response.status_code
-            except:
-                response_time = 0
-                site_available = False
-                status_code = 0
+            endpoint = self.check_endpoint("site", "https://gita-1972-reprint.ru/")
             
             # Количество активных соединений (если доступен nginx status)
             try:
@@ -204,11 +242,12 @@ class YandexMonitoringIntegration:
             except:
                 active_connections = 0
             
+            site_metrics = {key: value for key, value in endpoint.items() if key != "available"}
+            
             return {
                 "service_active": service_active,
-                "site_available": site_available,
-                "response_time_ms": response_time,
-                "status_code": status_code,
+                "site_available": endpoint['available'],
+                **site_metrics,
                 "active_connections": active_connections,
                 "last_check": datetime.now(timezone.utc).isoformat()
             }
@@ -220,28 +259,11 @@ class YandexMonitoringIntegration:
     def get_agent_metrics(self) -> Dict:
         """Метрики агента"""
         try:
-            # Статус сервиса агента
-            service_cmd = "systemctl is-active yandex-server-agent"
-            service_result = subprocess.run(service_cmd, shell=True, capture_output=True, text=True)
-            service_active = service_result.stdout.strip() == "active"
-            
-            # Время работы агента
-            try:
-                uptime_cmd = "systemctl show yandex-server-agent --property=ActiveEnterTimestamp | cut -d'=' -f2"
-                uptime_result = subprocess.run(uptime_cmd, shell=True, capture_output=True, text=True)
-                start_time_str = uptime_result.stdout.strip()
-                # Здесь можно вычислить uptime, но для простоты пропускаем
-                uptime_seconds = 0
-            except:
-                uptime_seconds = 0
-            
-            # Использование памяти агентом
-            try:
-                memory_cmd = "ps aux | grep 'python3.*yandex-server-agent' | grep -v grep | awk '{print $6}'"
-                memory_result = subprocess.run(memory_cmd, shell=True, capture_output=True, text=True)
-                memory_usage_kb = int(memory_result.stdout.strip()) if memory_result.stdout.strip() else 0
-            except:
-                memory_usage_kb = 0
+            # Статус, время работы и память сервиса агента
+            service = self.service_state.get_unit("yandex-server-agent")
+            service_active = service['active_state'] == "active"
+            uptime_seconds = service['uptime_seconds'] or 0
+            memory_usage_kb = (service['memory_bytes'] or 0) // 1024
             
             # Количество выполненных проверок (можно считать из логов)
             checks_completed = self.count_completed_checks()
@@ -261,10 +283,7 @@ class YandexMonitoringIntegration:
     def count_completed_checks(self) -> int:
         """Подсчет выполненных проверок за сегодня"""
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            log_cmd = f"grep '{today}.*критических проверок' /home/yc-user/gita-1972/logs/server-agent.log | wc -l"
-            result = subprocess.run(log_cmd, shell=True, capture_output=True, text=True)
-            return int(result.stdout.strip()) if result.stdout.strip() else 0
+            return self.log_index.marker_count("critical_checks")
         except:
             return 0
     
@@ -293,6 +312,9 @@ class YandexMonitoringIntegration:
     def estimate_site_visits(self) -> int:
         """Оценка посещений сайта (из логов Nginx)"""
         try:
+            if self.nginx_tailer and self.nginx_tailer.readable("access"):
+                return self.nginx_tailer.daily_count("requests")
+                
             today = datetime.now().strftime('%d/%b/%Y')
             cmd = f"grep '{today}' /var/log/nginx/access.log 2>/dev/null | wc -l"
             result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
@@ -303,6 +325,9 @@ class YandexMonitoringIntegration:
     def count_api_requests(self) -> int:
         """Подсчет API запросов за день"""
         try:
+            if self.nginx_tailer and self.nginx_tailer.readable("access"):
+                return self.nginx_tailer.daily_count("api_requests")
+                
             today = datetime.now().strftime('%d/%b/%Y')
             cmd = f"grep '{today}' /var/log/nginx/access.log 2>/dev/null | grep '/api/' | wc -l"
             result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
@@ -477,6 +502,9 @@ class YandexMonitoringIntegration:
             **business_metrics
         }
         
+        # Сохраняем замер в историю для прогнозов
+        self.record_history(all_metrics)
+        
         # Отправляем в Yandex Monitoring
         success = self.send_metrics_to_yandex(all_metrics)
         
@@ -484,6 +512,27 @@ class YandexMonitoringIntegration:
         
         return all_metrics
     
+    def record_history(self, metrics: Dict):
+        """Запись замера в историю метрик"""
+        system = metrics.get('system', {})
+        api = metrics.get('applications', {}).get('gita_api', {})
+        
+        # Запросы за интервал - прирост дневного счетчика (в полночь счетчик начинается заново)
+        requests = None
+        requests_today = metrics.get('business', {}).get('site_visits_today')
+        if requests_today is not None:
+            if self._last_requests is not None:
+                requests = requests_today - self._last_requests if requests_today >= self._last_requests else requests_today
+            self._last_requests = requests_today
+        
+        self.history.append({
+            "cpu": system.get('cpu_percent'),
+            "memory": system.get('memory_percent'),
+            "disk": system.get('disk_percent'),
+            "api_latency_ms": api.get('response_time_ms') if api.get('available') else None,
+            "requests": requests
+        })
+    
     def log_info(self, message):
         """Логирование информации"""
         logging.info(message)
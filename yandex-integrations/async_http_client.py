@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+🌐 ASYNC HTTP CLIENT - долгоживущий aiohttp клиент для внешнего сервиса
+Одна сессия с пулом соединений на сервис, ограничение одновременных
+запросов, повторы с экспоненциальной задержкой и jitter на 429/5xx,
+предохранитель (circuit breaker) и счетчики задержек и ошибок по endpoint
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import aiohttp
+
+# Статусы, после которых запрос имеет смысл повторить
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    """Предохранитель открыт: сервис недавно был недоступен, запрос не отправлялся"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30):
+        """Предохранитель: после failure_threshold неудач подряд запросы отклоняются на reset_seconds"""
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        """closed - запросы идут, open - отклоняются, half_open - пропускается пробный"""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос; в half_open пропускается один пробный, остальные ждут его результата"""
+        state = self.state
+        if state == "half_open":
+            self.opened_at = time.monotonic()
+        return state != "open"
+
+    def record_success(self):
+        """Успешный ответ закрывает предохранитель"""
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        """Неудача; неудачный пробный запрос снова открывает предохранитель на reset_seconds"""
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+
+
+class AsyncServiceClient:
+    def __init__(self, name: str, timeout: float = 30, max_concurrency: int = 4, retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 10, idempotent: bool = True,
+                 failure_threshold: int = 5, reset_seconds: float = 30, pool_limit: int = 10):
+        """Клиент одного сервиса
+
+        Неидемпотентные запросы (отправка сообщений) повторяются только если точно
+        не были обработаны: 429 и ошибка установки соединения.
+        """
+        self.name = name
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.idempotent = idempotent
+        self.pool_limit = pool_limit
+
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.logger = logging.getLogger(f"{__name__}.{name}")
+
+        # Сессия и семафор создаются в работающем event loop при первом запросе
+        self._session = None
+        self._semaphore = None
+
+        # endpoint -> счетчики
+        self.stats = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Общая сессия с пулом соединений"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_limit, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _endpoint_stats(self, endpoint: str) -> Dict:
+        """Счетчики endpoint"""
+        return self.stats.setdefault(endpoint, {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "rejected": 0,
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+            "last_status": None
+        })
+
+    def _should_retry(self, status: Optional[int], error: Optional[Exception]) -> bool:
+        """Повторять ли попытку"""
+        if error is not None:
+            return self.idempotent or isinstance(error, aiohttp.ClientConnectorError)
+        return status == 429 or (self.idempotent and status in RETRY_STATUSES)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Задержка перед повтором: Retry-After сервиса или экспонента с jitter"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(self, method: str, url: str, endpoint: Optional[str] = None, **kwargs) -> Tuple[int, Any]:
+        """Запрос с повторами, возвращает статус и тело (JSON или текст)
+
+        При открытом предохранителе сразу бросает CircuitOpenError,
+        после исчерпания повторов на сетевой ошибке бросает ее.
+        """
+        endpoint = endpoint or url
+        stats = self._endpoint_stats(endpoint)
+
+        if not self.breaker.allow():
+            stats["rejected"] += 1
+            raise CircuitOpenError(f"{self.name}: сервис недоступен, повтор через {self.breaker.reset_seconds}с")
+
+        session = self._get_session()
+        attempt = 0
+        while True:
+            stats["requests"] += 1
+            started = time.monotonic()
+            status, body, error, retry_after = None, None, None, None
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, **kwargs) as response:
+                        status = response.status
+                        retry_after = response.headers.get('Retry-After')
+                        if response.content_type == 'application/json':
+                            body = await response.json()
+                        else:
+                            body = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+
+            elapsed = time.monotonic() - started
+            stats["latency_total"] += elapsed
+            stats["latency_max"] = max(stats["latency_max"], elapsed)
+            stats["last_status"] = status
+
+            failed = error is not None or status in RETRY_STATUSES
+            if failed:
+                stats["errors"] += 1
+
+            if failed and attempt < self.retries and self._should_retry(status, error):
+                delay = self._backoff(attempt, retry_after)
+                stats["retries"] += 1
+                attempt += 1
+                self.logger.warning(f"🔁 {self.name} {endpoint}: {error or status}, повтор {attempt} через {delay:.1f}с")
+                await asyncio.sleep(delay)
+                continue
+
+            if failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if error is not None:
+                raise error
+            return status, body
+
+    async def stream_lines(self, method: str, url: str, endpoint: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """Потоковый ответ построчно (NDJSON)
+
+        Повторы - только до начала ответа: полученные строки уже отданы вызывающему.
+        Таймаут - на паузу между данными, а не на весь ответ: длинная генерация не обрывается.
+        При статусе не 200 бросает aiohttp.ClientResponseError.
+        """
+        endpoint = endpoint or url
+        stats = self._endpoint_stats(endpoint)
+
+        if not self.breaker.allow():
+            stats["rejected"] += 1
+            raise CircuitOpenError(f"{self.name}: сервис недоступен, повтор через {self.breaker.reset_seconds}с")
+
+        session = self._get_session()
+        kwargs.setdefault('timeout', aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout))
+        attempt = 0
+        while True:
+            stats["requests"] += 1
+            started = time.monotonic()
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, **kwargs) as response:
+                        stats["last_status"] = response.status
+                        if response.status in RETRY_STATUSES and attempt < self.retries:
+                            stats["errors"] += 1
+                            stats["retries"] += 1
+                            delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                            attempt += 1
+                            self.logger.warning(f"🔁 {self.name} {endpoint}: {response.status}, повтор {attempt} через {delay:.1f}с")
+                        elif response.status != 200:
+                            response.raise_for_status()
+                            raise aiohttp.ClientResponseError(response.request_info, (), status=response.status)
+                        else:
+                            # Задержка до первых данных - время до первого полезного вывода
+                            first = True
+                            async for raw in response.content:
+                                if first:
+                                    elapsed = time.monotonic() - started
+                                    stats["latency_total"] += elapsed
+                                    stats["latency_max"] = max(stats["latency_max"], elapsed)
+                                    first = False
+                                line = raw.decode('utf-8', errors='replace').strip()
+                                if line:
+                                    yield line
+                            self.breaker.record_success()
+                            return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                stats["errors"] += 1
+                # Ошибка запроса (4xx) не говорит о недоступности сервиса
+                if isinstance(e, aiohttp.ClientResponseError) and e.status not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                raise
+            await asyncio.sleep(delay)
+
+    async def post(self, url: str, endpoint: Optional[str] = None, **kwargs) -> Tuple[int, Any]:
+        """POST запрос"""
+        return await self.request('POST', url, endpoint, **kwargs)
+
+    async def get(self, url: str, endpoint: Optional[str] = None, **kwargs) -> Tuple[int, Any]:
+        """GET запрос"""
+        return await self.request('GET', url, endpoint, **kwargs)
+
+    def get_stats(self) -> Dict:
+        """Счетчики по endpoint со средней задержкой и состояние предохранителя"""
+        return {
+            "service": self.name,
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "endpoints": {
+                endpoint: {
+                    **stats,
+                    "latency_avg": round(stats["latency_total"] / stats["requests"], 3) if stats["requests"] else 0.0
+                }
+                for endpoint, stats in self.stats.items()
+            }
+        }
+
+    async def close(self):
+        """Закрытие сессии"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
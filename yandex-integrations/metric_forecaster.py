@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+📈 METRIC FORECASTER - локальный статистический прогноз метрик сервера
+История метрик агента (CSV) выравнивается на равномерную сетку, для каждой
+метрики строится Holt-Winters с суточной сезонностью (при коротком ряде -
+Holt с трендом), диск дополнительно - линейный тренд до заполнения.
+Результат детерминирован, считается за миллисекунды, с доверительными
+интервалами и временем до порога
+"""
+
+import time
+import warnings
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from metric_history import HISTORY_METRICS, METRIC_HISTORY_FILE
+
+SEASON_SECONDS = 24 * 3600
+
+# Пороги, до которых считается время; None - только прогноз
+DEFAULT_THRESHOLDS = {
+    "cpu": 90.0,
+    "memory": 90.0,
+    "disk": 95.0,
+    "api_latency_ms": 2000.0,
+    "requests": None
+}
+
+# Синонимы ключей текущих метрик от вызывающих
+CURRENT_ALIASES = {
+    "cpu": ("cpu", "cpu_usage", "cpu_percent"),
+    "memory": ("memory", "memory_usage", "memory_percent"),
+    "disk": ("disk", "disk_usage", "disk_percent"),
+    "api_latency_ms": ("api_latency_ms", "response_time_ms", "api_response_time"),
+    "requests": ("requests", "request_rate")
+}
+
+Z_95 = 1.96
+
+# Сглаживание уровня, тренда и сезонности: замеры идут раз в несколько минут, уровень сглаживается сильно
+ALPHA = 0.1
+BETA = 0.01
+GAMMA = 0.1
+
+
+def load_history(path: str, days: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Время и значения (строки - замеры, столбцы - HISTORY_METRICS) за последние days суток"""
+    # Строки с другим числом полей (оборванная запись, ручная правка) пропускаются,
+    # нечисловые значения становятся NaN - история не теряется из-за одной строки
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            data = np.genfromtxt(path, delimiter=',', comments='#', usecols=range(1 + len(HISTORY_METRICS)),
+                                 invalid_raise=False, ndmin=2)
+    except (OSError, ValueError):
+        return np.empty(0), np.empty((0, len(HISTORY_METRICS)))
+    if data.size == 0 or data.shape[1] != 1 + len(HISTORY_METRICS):
+        return np.empty(0), np.empty((0, len(HISTORY_METRICS)))
+
+    data = data[np.isfinite(data[:, 0])]
+    if not len(data):
+        return np.empty(0), np.empty((0, len(HISTORY_METRICS)))
+
+    data = data[data[:, 0] >= data[-1, 0] - days * 86400]
+    return data[:, 0], data[:, 1:1 + len(HISTORY_METRICS)]
+
+
+def resample(timestamps: np.ndarray, values: np.ndarray, step: float) -> np.ndarray:
+    """Среднее по интервалам равномерной сетки, пропуски заполняются интерполяцией"""
+    valid = np.isfinite(values)
+    if not valid.any():
+        return np.empty(0)
+
+    bins = ((timestamps - timestamps[0]) // step).astype(int)
+    size = bins[-1] + 1
+    sums = np.bincount(bins[valid], values[valid], minlength=size)
+    counts = np.bincount(bins[valid], minlength=size)
+
+    filled = counts > 0
+    grid = np.arange(size)
+    return np.interp(grid, grid[filled], sums[filled] / counts[filled])
+
+
+def holt_winters(series: np.ndarray, season: int, horizon: int, alpha: float = ALPHA,
+                 beta: float = BETA, gamma: float = GAMMA) -> Tuple[np.ndarray, float]:
+    """Аддитивный Holt-Winters: прогноз на horizon шагов и СКО ошибки прогноза на шаг"""
+    level = float(series[:season].mean())
+    trend = float(series[season:2 * season].mean() - level) / season
+
+    # Начальная сезонность - отклонения первого сезона от линии тренда (среднее сезона -
+    # его середина), иначе рост за первые сутки попадает в сезонность и прогноз занижается;
+    # уровень переносится на последнюю точку первого сезона
+    center = (season - 1) / 2
+    seasonal = (series[:season] - (level + trend * (np.arange(season) - center))).tolist()
+    level += trend * center
+
+    # Рекурсия по списку float: скаляры numpy в цикле заметно медленнее
+    values = series.tolist()
+    errors = []
+    for t in range(season, len(values)):
+        index = t % season
+        errors.append(values[t] - (level + trend + seasonal[index]))
+
+        previous_level = level
+        level = alpha * (values[t] - seasonal[index]) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous_level) + (1 - beta) * trend
+        seasonal[index] = gamma * (values[t] - level) + (1 - gamma) * seasonal[index]
+
+    steps = np.arange(1, horizon + 1)
+    forecast = level + steps * trend + np.array(seasonal)[(len(values) + steps - 1) % season]
+    return forecast, float(np.std(errors)) if errors else 0.0
+
+
+def holt(series: np.ndarray, horizon: int, alpha: float = ALPHA, beta: float = BETA) -> Tuple[np.ndarray, float]:
+    """Holt (EWMA уровня и тренда) для ряда короче двух сезонов"""
+    values = series.tolist()
+    level, trend = values[0], 0.0
+    errors = []
+    for value in values[1:]:
+        errors.append(value - (level + trend))
+        previous_level = level
+        level = alpha * value + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous_level) + (1 - beta) * trend
+
+    forecast = level + np.arange(1, horizon + 1) * trend
+    return forecast, float(np.std(errors)) if errors else 0.0
+
+
+def first_crossing(values: np.ndarray, threshold: float, step_hours: float) -> Optional[float]:
+    """Часы до первого достижения порога или None"""
+    crossed = np.nonzero(values >= threshold)[0]
+    return round(float(crossed[0] + 1) * step_hours, 2) if crossed.size else None
+
+
+class MetricForecaster:
+    def __init__(self, history_file: str = METRIC_HISTORY_FILE, horizon_hours: float = 24,
+                 history_days: float = 14, thresholds: Optional[Dict[str, Optional[float]]] = None):
+        """Параметры прогноза"""
+        self.history_file = history_file
+        self.horizon_hours = horizon_hours
+        self.history_days = history_days
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+
+    def forecast(self, current: Optional[Dict] = None) -> Dict:
+        """Прогноз всех метрик истории на horizon_hours"""
+        started = time.perf_counter()
+        current = current or {}
+        timestamps, values = load_history(self.history_file, self.history_days)
+
+        # Шаг сетки - типичный интервал сбора метрик
+        step = max(60.0, float(np.median(np.diff(timestamps)))) if len(timestamps) > 1 else 300.0
+
+        metrics = {}
+        for column, name in enumerate(HISTORY_METRICS):
+            now_value = next((current[key] for key in CURRENT_ALIASES[name] if current.get(key) is not None), None)
+            series = resample(timestamps, values[:, column], step) if len(timestamps) else np.empty(0)
+            metrics[name] = self._forecast_metric(name, series, step, now_value)
+
+        disk_column = HISTORY_METRICS.index("disk")
+        metrics["disk"]["exhaustion"] = self._disk_exhaustion(timestamps, values[:, disk_column]) if len(timestamps) else None
+
+        risks = sorted(
+            ({"metric": name, "threshold": result["threshold"], "hours": result["hours_to_threshold_pessimistic"]}
+             for name, result in metrics.items() if result.get("hours_to_threshold_pessimistic") is not None),
+            key=lambda risk: risk["hours"]
+        )
+
+        return {
+            "horizon_hours": self.horizon_hours,
+            "step_seconds": step,
+            "history_samples": int(len(timestamps)),
+            "metrics": metrics,
+            "risks": risks,
+            "compute_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def _forecast_metric(self, name: str, series: np.ndarray, step: float, now_value: Optional[float]) -> Dict:
+        """Прогноз одной метрики с интервалом 95% и временем до порога"""
+        threshold = self.thresholds.get(name)
+        result = {
+            "current": now_value if now_value is not None else (round(float(series[-1]), 2) if len(series) else None),
+            "samples": int(len(series)),
+            "threshold": threshold
+        }
+        if len(series) < 12:
+            result["method"] = "current_only"
+            return result
+
+        season = int(round(SEASON_SECONDS / step))
+        horizon = max(1, int(round(self.horizon_hours * 3600 / step)))
+        if len(series) >= 2 * season:
+            forecast, sigma = holt_winters(series, season, horizon)
+            result["method"] = "holt_winters"
+        else:
+            forecast, sigma = holt(series, horizon)
+            result["method"] = "holt"
+
+        # Интервал расширяется с горизонтом: ошибка уровня накапливается
+        spread = Z_95 * sigma * np.sqrt(1 + np.arange(horizon) * ALPHA ** 2)
+        lower, upper = forecast - spread, forecast + spread
+        step_hours = step / 3600
+
+        result.update({
+            "forecast": {
+                f"{hours}h": round(float(forecast[max(1, min(horizon, int(hours / step_hours))) - 1]), 2)
+                for hours in (1, 6, 24) if hours <= self.horizon_hours
+            },
+            "band_end": [round(float(lower[-1]), 2), round(float(upper[-1]), 2)],
+            "peak": round(float(forecast.max()), 2),
+            "peak_in_hours": round(float(forecast.argmax() + 1) * step_hours, 2)
+        })
+        if threshold is not None:
+            result["hours_to_threshold"] = first_crossing(forecast, threshold, step_hours)
+            result["hours_to_threshold_pessimistic"] = first_crossing(upper, threshold, step_hours)
+        return result
+
+    def _disk_exhaustion(self, timestamps: np.ndarray, disk: np.ndarray, days: float = 7) -> Optional[Dict]:
+        """Линейный тренд заполнения диска за последние days суток и время до 100%"""
+        recent = (timestamps >= timestamps[-1] - days * 86400) & np.isfinite(disk)
+        if recent.sum() < 12:
+            return None
+
+        hours = (timestamps[recent] - timestamps[-1]) / 3600
+        (slope, intercept), covariance = np.polyfit(hours, disk[recent], 1, cov=True)
+        slope_error = float(np.sqrt(covariance[0, 0]))
+
+        result = {"trend_percent_per_day": round(float(slope) * 24, 3), "days_to_full": None, "days_to_full_range": None}
+        if slope > 0:
+            remaining = 100.0 - intercept
+            fastest, slowest = slope + Z_95 * slope_error, slope - Z_95 * slope_error
+            result["days_to_full"] = round(float(remaining / slope / 24), 1)
+            result["days_to_full_range"] = [
+                round(float(remaining / fastest / 24), 1),
+                round(float(remaining / slowest / 24), 1) if slowest > 0 else None
+            ]
+        return result
+
+    def describe(self, forecast: Dict) -> str:
+        """Краткий текст прогноза без обращения к модели"""
+        lines = []
+        for risk in forecast["risks"]:
+            lines.append(f"⚠️ {risk['metric']} может достичь {risk['threshold']:g} через ~{risk['hours']:g} ч")
+        exhaustion = forecast["metrics"]["disk"].get("exhaustion")
+        if exhaustion and exhaustion["days_to_full"] is not None:
+            lines.append(f"💾 Диск заполнится примерно через {exhaustion['days_to_full']:g} дн. "
+                         f"(+{exhaustion['trend_percent_per_day']:g}% в сутки)")
+        if not lines:
+            lines.append(f"✅ За {forecast['horizon_hours']:g} ч порогов не ожидается")
+        return '\n'.join(lines)
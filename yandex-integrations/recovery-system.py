@@ -13,6 +13,7 @@ import logging
 import os
 import socket
 import subprocess
+import sys
 import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
@@ -20,6 +21,13 @@ from typing import Dict, List, Optional, Any, Tuple
 import aiohttp
 import paramiko
 
+from async_http_client import AsyncServiceClient, CircuitOpenError
+
+# Общие модули агента: в репозитории лежат в соседнем server-agent, при установке копируются сюда
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server-agent'))
+
+from telegram_outbox import OutboxLocked, TelegramOutbox
+
 
 class ServerRecoverySystem:
     """🛡️ Система восстановления доступа к серверу"""
@@ -51,6 +59,20 @@ class ServerRecoverySystem:
             'chat_id': os.environ.get('TELEGRAM_CHAT_ID', '6878699213')
         }
         
+        # Один клиент Telegram на все уведомления; сообщение повторяется только если точно не доставлено
+        self.telegram_client = AsyncServiceClient("telegram", timeout=10, max_concurrency=2, idempotent=False)
+        
+        # Недоставленные уведомления хранятся на диске и досылаются по порядку, когда сеть вернется
+        try:
+            self.telegram_outbox = TelegramOutbox(os.environ.get('TELEGRAM_OUTBOX_FILE', 'data/recovery-telegram-outbox.jsonl'))
+        except OutboxLocked as e:
+            # Журналом владеет запущенный сервис (ручная проверка): очередь только в памяти
+            self.logger.warning(f"⚠️ {e} - уведомления не сохраняются на диск")
+            self.telegram_outbox = TelegramOutbox(None)
+        self.telegram_retry_max = float(os.environ.get('TELEGRAM_RETRY_MAX_SECONDS', 300))
+        self._outbox_lock = None
+        self._outbox_task = None
+        
         self.logger.info("🛡️ Система восстановления инициализирована")
 
     async def emergency_recovery(self, problem_description: str = "Connection lost") -> Dict[str, Any]:
@@ -430,32 +452,86 @@ class ServerRecoverySystem:
             return False
 
     async def _telegram_notify(self, message: str) -> bool:
-        """📱 Уведомление в Telegram"""
+        """📱 Уведомление в Telegram: сначала в журнал, затем отправка всех недоставленных по порядку"""
+        if not self.telegram_config['bot_token']:
+            self.logger.warning("📱 Telegram bot token не настроен")
+            return False
+        
+        message_id = self.telegram_outbox.add({
+            'chat_id': self.telegram_config['chat_id'],
+            'text': f"🛡️ RECOVERY SYSTEM\n\n{message}",
+            'parse_mode': 'HTML'
+        })
+        
+        if await self._flush_telegram_outbox():
+            return True
+        
+        # Telegram недоступен: повторы в фоне с растущей паузой
+        self._schedule_telegram_retry()
+        return message_id not in {record['id'] for record in self.telegram_outbox.pending()}
+
+    def _schedule_telegram_retry(self):
+        """📮 Запуск фоновых повторов, если они еще не идут"""
+        if self._outbox_task is None or self._outbox_task.done():
+            self._outbox_task = asyncio.create_task(self._retry_telegram_outbox())
+
+    async def _send_telegram(self, record: Dict[str, Any]) -> Optional[bool]:
+        """📱 Отправка одной записи журнала: True - доставлено, False - повторить позже, None - отказ Telegram"""
+        url = f"https://api.telegram.org/bot{self.telegram_config['bot_token']}/sendMessage"
+        data = {key: record[key] for key in ('chat_id', 'text', 'parse_mode')}
+        
         try:
-            if not self.telegram_config['bot_token']:
-                self.logger.warning("📱 Telegram bot token не настроен")
-                return False
-            
-            url = f"https://api.telegram.org/bot{self.telegram_config['bot_token']}/sendMessage"
-            
-            data = {
-                'chat_id': self.telegram_config['chat_id'],
-                'text': f"🛡️ RECOVERY SYSTEM\n\n{message}",
-                'parse_mode': 'HTML'
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=data, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        self.logger.info("📱 Telegram уведомление отправлено")
-                        return True
-                    else:
-                        self.logger.warning(f"📱 Telegram ошибка: {response.status}")
-                        return False
-                        
+            status, _ = await self.telegram_client.post(url, "sendMessage", json=data)
+        except CircuitOpenError as e:
+            self.logger.warning(f"📱 {e}")
+            return False
         except Exception as e:
             self.logger.error(f"📱 Telegram exception: {e}")
             return False
+        
+        if status == 200:
+            self.logger.info("📱 Telegram уведомление отправлено")
+            return True
+        self.logger.warning(f"📱 Telegram ошибка: {status}")
+        return False if status == 429 or status >= 500 else None
+
+    async def _flush_telegram_outbox(self) -> bool:
+        """📮 Отправка недоставленных уведомлений по порядку до первой временной ошибки"""
+        if self._outbox_lock is None:
+            self._outbox_lock = asyncio.Lock()
+        
+        async with self._outbox_lock:
+            for record in self.telegram_outbox.pending():
+                result = await self._send_telegram(record)
+                if result is False:
+                    return False
+                if result is None:
+                    self.logger.error(f"📱 Уведомление {record['id']} отклонено Telegram и удалено из очереди")
+                self.telegram_outbox.done([record['id']])
+            return True
+
+    async def _retry_telegram_outbox(self):
+        """📮 Фоновые повторы с экспоненциальной паузой, пока журнал не опустеет"""
+        delay = 2.0
+        while self.telegram_outbox.pending():
+            await asyncio.sleep(delay)
+            if await self._flush_telegram_outbox():
+                self.logger.info("📮 Недоставленные уведомления Telegram отправлены")
+                return
+            delay = min(delay * 2, self.telegram_retry_max)
+
+    async def start(self):
+        """▶️ Досылка уведомлений, оставшихся в журнале с прошлого запуска (нужен работающий цикл событий)"""
+        if self.telegram_outbox.pending() and self.telegram_config['bot_token']:
+            self.logger.info(f"📮 В журнале {len(self.telegram_outbox.pending())} недоставленных уведомлений, досылаем")
+            self._schedule_telegram_retry()
+
+    async def close(self):
+        """🔌 Остановка повторов и закрытие клиента и журнала Telegram"""
+        if self._outbox_task is not None:
+            self._outbox_task.cancel()
+        await self.telegram_client.close()
+        self.telegram_outbox.close()
 
     async def health_check_all_channels(self) -> Dict[str, Any]:
         """🩺 Проверка всех каналов восстановления"""
@@ -565,6 +641,7 @@ async def main():
     """🧪 Демонстрация Recovery System"""
     try:
         recovery = ServerRecoverySystem()
+        await recovery.start()
         
         print("🛡️ Демонстрация Server Recovery System")
         print("=" * 50)
@@ -579,6 +656,8 @@ async def main():
         test_result = await recovery.test_recovery_scenario("connection_lost")
         print(json.dumps(test_result, indent=2, ensure_ascii=False))
         
+        await recovery.close()
+        
         print("\n✅ Система восстановления готова к использованию!")
         
     except Exception as e:
@@ -19,6 +19,9 @@ VENV_DIR="/home/yc-user/yandex-venv"
 SERVICE_USER="yc-user"
 LOG_FILE="/var/log/yandex-integrations-setup.log"
 
+# Модули server-agent, которые используют интеграции
+SHARED_AGENT_MODULES="analysis_cache.py log_templates.py log_classifier.py prompt_builder.py metric_history.py telegram_outbox.py"
+
 echo -e "${CYAN}🚀 YANDEX ECOSYSTEM INTEGRATION SETUP${NC}"
 echo -e "${CYAN}====================================${NC}"
 echo ""
@@ -173,6 +176,12 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 cp "$SCRIPT_DIR"/*.py "$YANDEX_INTEGRATIONS_DIR/"
 check_success "Копирование Python модулей"
 
+# Общие модули из server-agent
+for module in $SHARED_AGENT_MODULES; do
+    cp "$SCRIPT_DIR/../server-agent/$module" "$YANDEX_INTEGRATIONS_DIR/"
+done
+check_success "Копирование общих модулей агента"
+
 # Создание конфигурационных файлов
 echo -e "${YELLOW}⚙️ Создание конфигураций...${NC}"
 
@@ -195,6 +204,7 @@ YANDEX_TRANSLATE_API_KEY=
 # Telegram
 TELEGRAM_BOT_TOKEN=YOUR_TELEGRAM_BOT_TOKEN_HERE
 TELEGRAM_CHAT_ID=6878699213
+TELEGRAM_EDIT_INTERVAL_SECONDS=1.5
 
 # Server Configuration
 PRIMARY_SERVER_IP=46.21.247.218
@@ -210,6 +220,24 @@ ENABLE_ENCRYPTION=true
 BACKUP_ENCRYPTION_KEY=
 AUDIT_LOG_RETENTION_DAYS=90
 
+# AI cache
+AI_CACHE_FILE=data/ai-analysis-cache.json
+AI_CACHE_MAX_ENTRIES=500
+AI_CACHE_TTL_SECONDS=21600
+TRANSLATION_CACHE_FILE=data/translation-cache.json
+TRANSLATION_CACHE_MAX_ENTRIES=5000
+TRANSLATION_CACHE_TTL_SECONDS=2592000
+AI_PROMPT_MAX_TOKENS=6000
+AI_MAP_CONCURRENCY=4
+
+# Forecasting
+METRIC_HISTORY_FILE=/home/yc-user/gita-1972/logs/metric-history.csv
+FORECAST_HORIZON_HOURS=24
+
+# Telegram outbox
+TELEGRAM_OUTBOX_FILE=data/recovery-telegram-outbox.jsonl
+TELEGRAM_RETRY_MAX_SECONDS=300
+
 # Performance
 MAX_CONCURRENT_OPERATIONS=10
 API_TIMEOUT_SECONDS=30
@@ -446,6 +474,21 @@ async def test():
 asyncio.run(test())
 "
 
+echo "4. 📈 Проверка прогноза метрик (линейный рост без шума)..."
+python3 -c "
+import sys
+import numpy as np
+from metric_forecaster import holt_winters
+# Рост +2 в сутки с шагом 5 минут: прогноз обязан продолжить прямую без занижения
+for days in (3, 14):
+    series = 55.99 - 2 * np.arange(days * 288)[::-1] / 288
+    forecast, _ = holt_winters(series, 288, 288)
+    if abs(forecast[-1] - 57.99) > 0.01 or abs(forecast[0] - (55.99 + 2 / 288)) > 0.01:
+        print(f'❌ Прогноз линейного роста ({days} сут): +24ч = {forecast[-1]:.2f}, ожидалось 57.99')
+        sys.exit(1)
+print('✅ Metric Forecaster: линейный рост прогнозируется точно')
+"
+
 echo ""
 echo "✅ Тестирование завершено!"
 EOF
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+🛫 SINGLE FLIGHT - объединение одинаковых одновременных запросов
+Пока запрос с ключом выполняется, повторные вызовы с тем же ключом
+не идут во внешний сервис, а ждут и получают результат первого
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    def __init__(self):
+        """Таблица выполняющихся запросов"""
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            "calls": 0,
+            "executed": 0,
+            "coalesced": 0
+        }
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Результат запроса с ключом: новый вызов factory или ожидание уже выполняющегося
+
+        Запрос выполняется отдельной задачей: отмена одного из ожидающих
+        не отменяет его для остальных.
+        """
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.stats["executed"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict:
+        """Счетчики: сколько вызовов во внешний сервис сэкономлено"""
+        return {
+            **self.stats,
+            "in_flight": len(self._inflight),
+            "saved_calls": self.stats["coalesced"]
+        }
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+📡 TELEGRAM LIVE MESSAGE - одно сообщение Telegram, которое дописывается по мере генерации
+Первый фрагмент отправляется сразу, дальше сообщение редактируется не чаще
+min_interval секунд (лимит Telegram - около одного редактирования в секунду на чат)
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from async_http_client import AsyncServiceClient, CircuitOpenError
+
+# Максимальная длина сообщения Telegram
+TELEGRAM_MAX_LENGTH = 4096
+
+
+class TelegramLiveMessage:
+    def __init__(self, client: AsyncServiceClient, bot_token: str, chat_id: str,
+                 header: str = "", min_interval: float = 1.5):
+        """Живое сообщение в чате"""
+        self.client = client
+        self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        self.chat_id = chat_id
+        self.header = header
+        self.min_interval = min_interval
+
+        self.message_id = None
+        self.sent_text = None
+        self.last_edit = 0.0
+        self.edits = 0
+        # Первая отправка оборвалась по таймауту: сообщение могло дойти, повтор дал бы дубль
+        self.abandoned = False
+        self.logger = logging.getLogger(__name__)
+
+    def _render(self, text: str, final: bool) -> str:
+        """Текст сообщения: заголовок, ответ и признак продолжения, в пределах лимита длины"""
+        suffix = "" if final else " ⏳"
+        message = f"{self.header}{text}"
+        limit = TELEGRAM_MAX_LENGTH - len(suffix)
+        if len(message) > limit:
+            message = message[:limit - 1] + "…"
+        return message + suffix
+
+    async def update(self, text: str, final: bool = False) -> bool:
+        """Показ текущего текста; промежуточные обновления чаще min_interval пропускаются"""
+        if self.abandoned:
+            return False
+
+        # Лимит действует и на попытки первой отправки: неудачная отправка не повторяется на каждом фрагменте
+        now = time.monotonic()
+        if not final and now - self.last_edit < self.min_interval:
+            return False
+
+        message = self._render(text, final)
+        if message == self.sent_text:
+            return False
+
+        self.last_edit = now
+        try:
+            if self.message_id is None:
+                status, body = await self.client.post(
+                    f"{self.base_url}/sendMessage", "sendMessage",
+                    json={'chat_id': self.chat_id, 'text': message}
+                )
+                if status == 200:
+                    self.message_id = body['result']['message_id']
+            else:
+                status, _ = await self.client.post(
+                    f"{self.base_url}/editMessageText", "editMessageText",
+                    json={'chat_id': self.chat_id, 'message_id': self.message_id, 'text': message}
+                )
+                self.edits += 1
+        except CircuitOpenError as e:
+            self.logger.warning(f"📱 {e}")
+            return False
+        except asyncio.TimeoutError:
+            if self.message_id is None:
+                self.abandoned = True
+                self.logger.warning("📱 Таймаут отправки сообщения Telegram - дальнейшие обновления пропускаются")
+            return False
+        except Exception as e:
+            self.logger.error(f"📱 Ошибка обновления сообщения Telegram: {e}")
+            return False
+
+        if status != 200:
+            self.logger.warning(f"📱 Telegram ошибка: {status}")
+            return False
+        self.sent_text = message
+        return True
+
+    async def finish(self, text: str) -> Optional[int]:
+        """Итоговый текст без признака продолжения, возвращает id сообщения"""
+        await self.update(text, final=True)
+        return self.message_id
+
+    async def fail(self, text: str, reason: str) -> Optional[int]:
+        """Итоговый текст с пометкой, что ответ оборван"""
+        await self.update(f"{text}\n\n❌ Ответ прерван: {reason}", final=True)
+        return self.message_id
@@ -8,16 +8,45 @@
 """
 
 import asyncio
+import hashlib
 import json
 import logging
 import os
 import re
+import sys
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-import aiohttp
 import aiofiles
 
+from async_http_client import AsyncServiceClient, CircuitOpenError
+from single_flight import SingleFlight
+from telegram_live_message import TelegramLiveMessage
+
+# Общие модули агента: в репозитории лежат в соседнем server-agent, при установке копируются сюда
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server-agent'))
+
+from analysis_cache import AnalysisCache, make_key, normalize
+from log_templates import TemplateMiner
+from metric_forecaster import MetricForecaster
+from metric_history import METRIC_HISTORY_FILE
+from prompt_builder import PromptBuilder, estimate_tokens, map_chunks, render_cluster, summarize_clusters
+
+# Лимит Yandex Translate на суммарную длину texts в одном запросе
+MAX_TRANSLATE_CHARS = 10000
+
+
+def split_translate_text(text: str, limit: int = MAX_TRANSLATE_CHARS) -> List[str]:
+    """Части строки не длиннее limit, по границе строки или слова (разделитель остается в части)"""
+    parts = []
+    while len(text) > limit:
+        cut = max(text.rfind('\n', 0, limit), text.rfind(' ', 0, limit)) + 1
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:]
+    return parts + [text] if text else parts
+
 
 class YandexAIAssistant:
     """🧠 Интеллектуальный ассистент на базе Yandex AI"""
@@ -43,12 +72,61 @@ class YandexAIAssistant:
             'monitoring_active': True
         }
         
+        # Кэш ответов: повторный инцидент отвечается без обращения к YandexGPT
+        self.cache = AnalysisCache(
+            os.environ.get('AI_CACHE_FILE', 'data/ai-analysis-cache.json'),
+            max_entries=int(os.environ.get('AI_CACHE_MAX_ENTRIES', 500)),
+            ttl_seconds=float(os.environ.get('AI_CACHE_TTL_SECONDS', 6 * 3600))
+        )
+        
+        # Переводы по языкам: строки агента повторяются, перевод не устаревает
+        self.translation_cache = AnalysisCache(
+            os.environ.get('TRANSLATION_CACHE_FILE', 'data/translation-cache.json'),
+            max_entries=int(os.environ.get('TRANSLATION_CACHE_MAX_ENTRIES', 5000)),
+            ttl_seconds=float(os.environ.get('TRANSLATION_CACHE_TTL_SECONDS', 30 * 86400))
+        )
+        
+        # Долгоживущие клиенты сервисов: пул соединений, лимит параллельных запросов, повторы
+        api_timeout = float(os.environ.get('API_TIMEOUT_SECONDS', 30))
+        max_concurrency = int(os.environ.get('MAX_CONCURRENT_OPERATIONS', 4))
+        self.gpt_client = AsyncServiceClient("yandexgpt", timeout=api_timeout, max_concurrency=max_concurrency)
+        self.translate_client = AsyncServiceClient("translate", timeout=api_timeout, max_concurrency=max_concurrency)
+        self.telegram_client = AsyncServiceClient("telegram", timeout=10, max_concurrency=2, idempotent=False)
+        
+        # Одинаковые одновременные промпты (расписание, команды, алерты) - один вызов API
+        self.gpt_flights = SingleFlight()
+        
+        # Telegram для показа потоковых ответов
+        self.telegram_config = {
+            'bot_token': os.environ.get('TELEGRAM_BOT_TOKEN'),
+            'chat_id': os.environ.get('TELEGRAM_CHAT_ID', '6878699213'),
+            'edit_interval': float(os.environ.get('TELEGRAM_EDIT_INTERVAL_SECONDS', 1.5))
+        }
+        
+        # Прогноз метрик по истории, которую пишет агент
+        self.forecaster = MetricForecaster(
+            os.environ.get('METRIC_HISTORY_FILE', METRIC_HISTORY_FILE),
+            horizon_hours=float(os.environ.get('FORECAST_HORIZON_HOURS', 24))
+        )
+        
+        # Промпт в пределах бюджета токенов; большие объемы логов - через суммирование частей
+        self.prompt_builder = PromptBuilder(int(os.environ.get('AI_PROMPT_MAX_TOKENS', 6000)))
+        self.map_concurrency = int(os.environ.get('AI_MAP_CONCURRENCY', 4))
+        
         self.logger.info("🧠 Yandex AI Assistant инициализирован")
 
-    async def analyze_logs_with_ai(self, logs: str, context: str = "") -> Dict[str, Any]:
-        """🔍 AI анализ логов с YandexGPT"""
+    async def analyze_logs_with_ai(self, logs: str, context: str = "", stream_to_telegram: bool = False) -> Dict[str, Any]:
+        """🔍 AI анализ логов с YandexGPT (stream_to_telegram - показывать ответ в Telegram по мере генерации)"""
         try:
-            prompt = f"""
+            # Одинаковые строки с разными временем, адресами и числами дают один ключ
+            lines = {normalize(line) for line in logs.splitlines() if line.strip()}
+            cache_key = make_key("log_analysis", [f"context:{normalize(context)}", *lines])
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.logger.info("🗃️ AI анализ логов взят из кэша")
+                return {**cached, 'cached': True}
+            
+            header = f"""
             Ты эксперт по системному администрированию и DevOps.
             
             КОНТЕКСТ СИСТЕМЫ:
@@ -56,9 +134,9 @@ class YandexAIAssistant:
             - Сервисы: {', '.join(self.system_context['services'])}
             - Дополнительный контекст: {context}
             
-            ЛОГИ ДЛЯ АНАЛИЗА:
-            {logs}
-            
+            ЛОГИ ДЛЯ АНАЛИЗА (шаблоны строк с числом повторов):
+"""
+            footer = f"""
             ЗАДАЧА:
             Проанализируй логи и предоставь:
             1. 🚨 КРИТИЧЕСКИЕ ПРОБЛЕМЫ (требуют немедленного вмешательства)
@@ -70,19 +148,37 @@ class YandexAIAssistant:
             Отвечай структурированно в формате JSON.
             """
             
-            analysis = await self._call_yandex_gpt(prompt)
+            # Одинаковые строки сворачиваются в шаблоны, важные идут первыми
+            clusters = self._cluster_logs(logs)
+            built = self.prompt_builder.build(header, clusters, footer)
+            if built['rest']:
+                # Не поместившийся остаток суммируется по частям параллельно, сводки идут в итоговый промпт
+                summaries = await self._summarize_chunks(built['rest'])
+                built = self.prompt_builder.build(header, clusters, footer, tail_lines=summaries)
+                self.logger.info(f"📝 Логи свернуты: {len(built['included'])} шаблонов целиком, "
+                                 f"{len(built['rest'])} через {len(summaries)} сводок")
+            
+            if stream_to_telegram:
+                analysis = await self.stream_to_telegram(built['prompt'], "🔍 AI анализ логов:\n\n")
+            else:
+                analysis = await self._call_yandex_gpt(built['prompt'])
             
             if analysis:
                 parsed_analysis = await self._parse_ai_response(analysis)
                 
-                self.logger.info("✅ AI анализ логов завершен")
-                return {
+                result = {
                     'success': True,
                     'analysis_time': datetime.utcnow().isoformat(),
                     'ai_analysis': parsed_analysis,
                     'confidence_score': 0.85,
                     'recommendations_count': len(parsed_analysis.get('recommendations', []))
                 }
+                # Без API ключа ответ симулирован - в кэш идут только ответы модели
+                if self.yandex_gpt_api_key:
+                    await asyncio.to_thread(self.cache.set, cache_key, result)
+                
+                self.logger.info("✅ AI анализ логов завершен")
+                return result
             else:
                 raise Exception("Не удалось получить ответ от YandexGPT")
                 
@@ -93,9 +189,38 @@ class YandexAIAssistant:
                 'error': str(e)
             }
 
+    def _cluster_logs(self, logs: str) -> List[Dict[str, Any]]:
+        """🧩 Группировка строк логов в шаблоны"""
+        miner = TemplateMiner()
+        fingerprints = [
+            miner.add(line, '', {'source': 'logs'})['fingerprint']
+            for line in logs.splitlines() if line.strip()
+        ]
+        return miner.summarize(fingerprints)
+
+    async def _summarize_chunks(self, clusters: List[Dict[str, Any]]) -> List[str]:
+        """🗜️ Краткие сводки частей остатка (не больше map_concurrency вызовов одновременно)"""
+        map_header = "Кратко, в 1-2 строки, опиши суть этих ошибок сервера:\n"
+        chunks = self.prompt_builder.chunks(clusters, estimate_tokens(map_header))
+        
+        async def summarize(chunk: List[Dict[str, Any]]) -> str:
+            summary = await self._call_yandex_gpt(map_header + ''.join(render_cluster(cluster) for cluster in chunk))
+            if summary:
+                return f"- {' '.join(summary.split())[:300]}\n"
+            # Без ответа модели часть сворачивается локально
+            return ''.join(summarize_clusters(chunk))
+        
+        return await map_chunks(chunks, summarize, self.map_concurrency)
+
     async def generate_solution(self, problem_description: str) -> Dict[str, Any]:
         """🔧 Генерация решения проблемы с помощью AI"""
         try:
+            cache_key = make_key("solution", [normalize(problem_description)])
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.logger.info(f"🗃️ Решение взято из кэша для: {problem_description[:50]}...")
+                return {**cached, 'problem': problem_description, 'cached': True}
+            
             prompt = f"""
             Ты DevOps эксперт с 15+ летним опытом работы с Linux серверами.
             
@@ -125,8 +250,7 @@ class YandexAIAssistant:
             if solution:
                 parsed_solution = await self._parse_solution_response(solution)
                 
-                self.logger.info(f"✅ Решение сгенерировано для: {problem_description[:50]}...")
-                return {
+                result = {
                     'success': True,
                     'generated_at': datetime.utcnow().isoformat(),
                     'problem': problem_description,
@@ -134,6 +258,11 @@ class YandexAIAssistant:
                     'estimated_time': parsed_solution.get('estimated_time', 'Неизвестно'),
                     'complexity': parsed_solution.get('complexity', 'Средняя')
                 }
+                if self.yandex_gpt_api_key:
+                    await asyncio.to_thread(self.cache.set, cache_key, result)
+                
+                self.logger.info(f"✅ Решение сгенерировано для: {problem_description[:50]}...")
+                return result
             else:
                 raise Exception("Не удалось сгенерировать решение")
                 
@@ -179,43 +308,35 @@ class YandexAIAssistant:
             }
 
     async def predictive_analysis(self, metrics_data: Dict[str, Any]) -> Dict[str, Any]:
-        """📈 Предиктивный анализ с машинным обучением"""
+        """📈 Предиктивный анализ: локальный статистический прогноз по истории метрик"""
         try:
-            prompt = f"""
-            Ты эксперт по предиктивной аналитике IT-инфраструктуры.
+            # Числа считаются локально и детерминированно, модель только формулирует вывод
+            forecast = self.forecaster.forecast(metrics_data)
+            
+            summary = None
+            if self.yandex_gpt_api_key:
+                prompt = f"""
+            Ты эксперт по эксплуатации IT-инфраструктуры.
             
-            МЕТРИКИ СИСТЕМЫ:
-            {json.dumps(metrics_data, indent=2, ensure_ascii=False)}
+            ПРОГНОЗ МЕТРИК НА {forecast['horizon_hours']:g} ЧАСОВ (рассчитан статистически):
+            {json.dumps(forecast, ensure_ascii=False)}
             
             ЗАДАЧА:
-            На основе текущих метрик предскажи:
-            1. 🔮 ВЕРОЯТНОСТЬ СБОЕВ в ближайшие 24 часа
-            2. 📊 ТРЕНДЫ ИСПОЛЬЗОВАНИЯ РЕСУРСОВ
-            3. 💰 ПРОГНОЗ ЗАТРАТ на следующий месяц
-            4. 🔧 ОПТИМАЛЬНОЕ ВРЕМЯ для обслуживания
-            5. ⚠️ ПОТЕНЦИАЛЬНЫЕ ПРОБЛЕМЫ и их вероятность
-            6. 📈 РЕКОМЕНДАЦИИ по масштабированию
-            
-            Используй статистический анализ и машинное обучение подходы.
-            Отвечай в формате JSON с числовыми прогнозами и процентами вероятности.
+            Кратко, в 3-5 строк, опиши для оператора главные риски и что сделать.
+            Не меняй и не придумывай числа - используй только приведенные.
             """
+                summary = await self._call_yandex_gpt(prompt)
             
-            prediction = await self._call_yandex_gpt(prompt)
-            
-            if prediction:
-                parsed_prediction = await self._parse_prediction_response(prediction)
-                
-                self.logger.info("📈 Предиктивный анализ завершен")
-                return {
-                    'success': True,
-                    'analysis_time': datetime.utcnow().isoformat(),
-                    'prediction_horizon': '24 hours',
-                    'predictions': parsed_prediction,
-                    'confidence_level': 0.78,
-                    'next_analysis': (datetime.utcnow().hour + 6) % 24
-                }
-            else:
-                raise Exception("Не удалось выполнить предиктивный анализ")
+            self.logger.info(f"📈 Предиктивный анализ завершен за {forecast['compute_ms']} мс")
+            return {
+                'success': True,
+                'analysis_time': datetime.utcnow().isoformat(),
+                'prediction_horizon': f"{forecast['horizon_hours']:g} hours",
+                'predictions': forecast,
+                'summary': summary or self.forecaster.describe(forecast),
+                'confidence_level': 0.95,
+                'next_analysis': (datetime.utcnow().hour + 6) % 24
+            }
                 
         except Exception as e:
             self.logger.error(f"❌ Ошибка предиктивного анализа: {e}")
@@ -320,6 +441,25 @@ class YandexAIAssistant:
 
     async def multilingual_support(self, text: str, target_language: str = 'en') -> Dict[str, Any]:
         """🌍 Многоязычная поддержка через Yandex Translate"""
+        result = await self.translate_batch([text], target_language)
+        if not result['success']:
+            return result
+        
+        return {
+            'success': True,
+            'source_text': text,
+            'target_language': target_language,
+            'translated_text': result['translations'][0],
+            'cached': result['cached'] == 1,
+            'confidence': 0.95
+        }
+
+    async def translate_batch(self, texts: List[str], target_language: str = 'en') -> Dict[str, Any]:
+        """🌍 Перевод списка строк: сначала кэш языка, промахи - одним запросом texts на каждые MAX_TRANSLATE_CHARS
+
+        cached - число разных строк, взятых из кэша. При ошибке части запросов
+        success False, удачные переводы возвращаются и кэшируются, остальные - None.
+        """
         try:
             if not self.yandex_translate_api_key:
                 # Локальная симуляция без API ключа
@@ -332,43 +472,73 @@ class YandexAIAssistant:
                 
                 return {
                     'success': True,
-                    'source_text': text,
                     'target_language': target_language,
-                    'translated_text': translations.get(target_language, text),
-                    'confidence': 0.95
+                    'translations': [translations.get(target_language, text) for text in texts],
+                    'cached': 0,
+                    'requests': 0,
+                    'failed': 0
                 }
             
-            # Реальный вызов Yandex Translate API
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    'Authorization': f'Api-Key {self.yandex_translate_api_key}',
-                    'Content-Type': 'application/json'
-                }
-                
-                data = {
-                    'targetLanguageCode': target_language,
-                    'texts': [text]
-                }
-                
-                async with session.post(
-                    f"{self.translate_base_url}/translate",
-                    headers=headers,
-                    json=data
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        translated_text = result['translations'][0]['text']
-                        
-                        self.logger.info(f"🌍 Текст переведен на {target_language}")
-                        return {
-                            'success': True,
-                            'source_text': text,
-                            'target_language': target_language,
-                            'translated_text': translated_text,
-                            'confidence': 0.95
-                        }
-                    else:
-                        raise Exception(f"API error: {response.status}")
+            # Повторяющиеся строки (статусы, шаблоны алертов) переводятся один раз
+            keys = {text: make_key(f"translate:{target_language}", [text]) for text in texts}
+            translated = {}
+            missing = []
+            cached = 0
+            for text, key in keys.items():
+                if not text.strip():
+                    translated[text] = text
+                    continue
+                hit = self.translation_cache.get(key)
+                if hit is not None:
+                    translated[text] = hit
+                    cached += 1
+                else:
+                    missing.append(text)
+            
+            # Строка длиннее лимита запроса переводится частями
+            parts = {text: split_translate_text(text) for text in missing}
+            batches = []
+            for text in missing:
+                for part in parts[text]:
+                    if not batches or sum(map(len, batches[-1])) + len(part) > MAX_TRANSLATE_CHARS:
+                        batches.append([])
+                    batches[-1].append(part)
+            
+            # Ошибка одного запроса не отменяет остальные: удачные части переводятся и кэшируются
+            results = await asyncio.gather(*(self._translate_texts(batch, target_language) for batch in batches),
+                                           return_exceptions=True)
+            translated_parts = {}
+            errors = []
+            for batch, batch_result in zip(batches, results):
+                if isinstance(batch_result, BaseException):
+                    errors.append(batch_result)
+                    continue
+                translated_parts.update(zip(batch, batch_result))
+            
+            fresh = {}
+            for text in missing:
+                if all(part in translated_parts for part in parts[text]):
+                    translated[text] = ''.join(translated_parts[part] for part in parts[text])
+                    fresh[keys[text]] = translated[text]
+            
+            if fresh:
+                await asyncio.to_thread(self.translation_cache.set_many, fresh)
+                self.logger.info(f"🌍 Переведено на {target_language}: {len(fresh)} строк за {len(batches)} запр.")
+            
+            result = {
+                'success': not errors,
+                'target_language': target_language,
+                # Непереведенные из-за ошибки запроса строки - None
+                'translations': [translated.get(text) for text in texts],
+                'cached': cached,
+                'requests': len(batches),
+                'failed': len(missing) - len(fresh)
+            }
+            if errors:
+                self.logger.error(f"❌ Ошибка перевода: {len(errors)} из {len(batches)} запросов, "
+                                  f"не переведено строк: {result['failed']}")
+                result['error'] = str(errors[0])
+            return result
                         
         except Exception as e:
             self.logger.error(f"❌ Ошибка перевода: {e}")
@@ -377,51 +547,162 @@ class YandexAIAssistant:
                 'error': str(e)
             }
 
+    async def _translate_texts(self, texts: List[str], target_language: str) -> List[str]:
+        """Один запрос Yandex Translate для списка строк, переводы в том же порядке"""
+        headers = {
+            'Authorization': f'Api-Key {self.yandex_translate_api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        data = {
+            'targetLanguageCode': target_language,
+            'texts': texts
+        }
+        
+        status, result = await self.translate_client.post(
+            f"{self.translate_base_url}/translate",
+            "translate",
+            headers=headers,
+            json=data
+        )
+        if status != 200:
+            raise Exception(f"API error: {status}")
+        return [item['text'] for item in result['translations']]
+
     async def _call_yandex_gpt(self, prompt: str) -> Optional[str]:
-        """🤖 Вызов YandexGPT API"""
+        """🤖 Вызов YandexGPT API (одинаковые одновременные запросы объединяются)"""
+        # Ключ - тело запроса с промптом без различий в пробелах: модель и параметры тоже учитываются
+        request = self._gpt_request(' '.join(prompt.split()), stream=False)['json']
+        key = hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+        return await self.gpt_flights.do(key, lambda: self._request_yandex_gpt(prompt))
+
+    async def _request_yandex_gpt(self, prompt: str) -> Optional[str]:
+        """🤖 Запрос к YandexGPT API"""
         try:
             if not self.yandex_gpt_api_key:
                 # Симуляция без API ключа для демонстрации
                 return await self._simulate_gpt_response(prompt)
             
             # Реальный вызов YandexGPT
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    'Authorization': f'Api-Key {self.yandex_gpt_api_key}',
-                    'Content-Type': 'application/json'
-                }
-                
-                data = {
-                    'modelUri': 'gpt://b1g4d1b2c3d4e5f6g7h8/yandexgpt-lite',
-                    'completionOptions': {
-                        'stream': False,
-                        'temperature': 0.3,
-                        'maxTokens': 2000
-                    },
-                    'messages': [
-                        {
-                            'role': 'user',
-                            'text': prompt
-                        }
-                    ]
-                }
+            status, result = await self.gpt_client.post(
+                f"{self.gpt_base_url}/completion",
+                "completion",
+                **self._gpt_request(prompt, stream=False)
+            )
+            if status == 200:
+                return result['result']['alternatives'][0]['message']['text']
+            else:
+                self.logger.error(f"YandexGPT API error: {status}")
+                return None
                 
-                async with session.post(
-                    f"{self.gpt_base_url}/completion",
-                    headers=headers,
-                    json=data
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result['result']['alternatives'][0]['message']['text']
-                    else:
-                        self.logger.error(f"YandexGPT API error: {response.status}")
-                        return None
-                        
+        except CircuitOpenError as e:
+            self.logger.warning(f"⚡ {e}")
+            return None
         except Exception as e:
             self.logger.error(f"❌ Ошибка вызова YandexGPT: {e}")
             return None
 
+    def _gpt_request(self, prompt: str, stream: bool) -> Dict[str, Any]:
+        """📦 Заголовки и тело запроса к YandexGPT"""
+        return {
+            'headers': {
+                'Authorization': f'Api-Key {self.yandex_gpt_api_key}',
+                'Content-Type': 'application/json'
+            },
+            'json': {
+                'modelUri': 'gpt://b1g4d1b2c3d4e5f6g7h8/yandexgpt-lite',
+                'completionOptions': {
+                    'stream': stream,
+                    'temperature': 0.3,
+                    'maxTokens': 2000
+                },
+                'messages': [
+                    {
+                        'role': 'user',
+                        'text': prompt
+                    }
+                ]
+            }
+        }
+
+    async def _stream_yandex_gpt(self, prompt: str) -> AsyncIterator[str]:
+        """🌊 Потоковый вызов YandexGPT: накопленный текст ответа по мере генерации"""
+        if not self.yandex_gpt_api_key:
+            # Симуляция: готовый ответ отдается частями
+            response = await self._simulate_gpt_response(prompt)
+            for end in range(80, len(response) + 80, 80):
+                yield response[:end]
+                await asyncio.sleep(0.05)
+            return
+        
+        # Каждая строка потока - JSON с текстом ответа, накопленным на этот момент
+        async for line in self.gpt_client.stream_lines(
+            'POST',
+            f"{self.gpt_base_url}/completion",
+            "completion_stream",
+            **self._gpt_request(prompt, stream=True)
+        ):
+            try:
+                alternatives = json.loads(line).get('result', {}).get('alternatives') or []
+            except ValueError:
+                continue
+            if alternatives:
+                yield alternatives[0]['message']['text']
+
+    async def stream_to_telegram(self, prompt: str, header: str = "🧠 YandexGPT:\n\n") -> Optional[str]:
+        """📡 Ответ YandexGPT с показом в одном сообщении Telegram по мере генерации
+
+        Оборванный поток возвращает None: частичный ответ не разбирается и не кэшируется.
+        """
+        live = None
+        if self.telegram_config['bot_token']:
+            live = TelegramLiveMessage(
+                self.telegram_client,
+                self.telegram_config['bot_token'],
+                self.telegram_config['chat_id'],
+                header=header,
+                min_interval=self.telegram_config['edit_interval']
+            )
+        
+        text = None
+        error = None
+        try:
+            async for text in self._stream_yandex_gpt(prompt):
+                if live:
+                    await live.update(text)
+        except CircuitOpenError as e:
+            self.logger.warning(f"⚡ {e}")
+            error = e
+        except Exception as e:
+            self.logger.error(f"❌ Ошибка потокового вызова YandexGPT: {e}")
+            error = e
+        
+        if error is not None:
+            if live and text:
+                await live.fail(text, str(error) or type(error).__name__)
+            return None
+        
+        if live and text:
+            await live.finish(text)
+        return text
+
+    def get_client_stats(self) -> Dict[str, Any]:
+        """📊 Задержки, ошибки и состояние предохранителей клиентов API"""
+        return {
+            'yandexgpt': self.gpt_client.get_stats(),
+            'translate': self.translate_client.get_stats(),
+            'telegram': self.telegram_client.get_stats(),
+            'single_flight': self.gpt_flights.get_stats(),
+            'cache': self.cache.get_stats(),
+            'translation_cache': self.translation_cache.get_stats()
+        }
+
+    async def close(self):
+        """🔌 Закрытие сессий клиентов API"""
+        await self.gpt_client.close()
+        await self.translate_client.close()
+        await self.telegram_client.close()
+
     async def _simulate_gpt_response(self, prompt: str) -> str:
         """🎭 Симуляция ответа GPT для демонстрации"""
         await asyncio.sleep(0.5)  # Имитация задержки API
@@ -448,18 +729,6 @@ class YandexAIAssistant:
                 "estimated_time": "5-10 минут",
                 "complexity": "Низкая"
             }"""
-        elif "предиктивный анализ" in prompt.lower():
-            return """{
-                "failure_probability": {"next_24h": 15, "next_week": 35},
-                "resource_trends": {"cpu": "stable", "memory": "increasing", "disk": "stable"},
-                "cost_forecast": {"next_month": 385.50, "trend": "+2.8%"},
-                "optimal_maintenance": "Sunday 03:00-04:00 UTC",
-                "potential_issues": [
-                    {"issue": "Memory leak в API", "probability": 25, "impact": "medium"},
-                    {"issue": "Disk space shortage", "probability": 10, "impact": "high"}
-                ],
-                "scaling_recommendations": "Увеличить RAM до 4GB при достижении 85% использования"
-            }"""
         else:
             return """{
                 "status": "AI симуляция работает",
@@ -517,13 +786,6 @@ class YandexAIAssistant:
         except json.JSONDecodeError:
             return {'raw_response': response, 'parsed': False}
 
-    async def _parse_prediction_response(self, response: str) -> Dict[str, Any]:
-        """📈 Парсинг предсказаний от AI"""
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError:
-            return {'raw_response': response, 'parsed': False}
-
     async def _parse_alert_response(self, response: str) -> Dict[str, Any]:
         """🚨 Парсинг алерта от AI"""
         try:
@@ -591,6 +853,10 @@ async def main():
         )
         print(json.dumps(translation, indent=2, ensure_ascii=False))
         
+        print("\n📊 Клиенты API:")
+        print(json.dumps(assistant.get_client_stats(), indent=2, ensure_ascii=False))
+        await assistant.close()
+        
         print("\n✅ Демонстрация AI ассистента завершена!")
         
     except Exception as e: